@@ -1,10 +1,12 @@
 from autogen_agentchat.agents import CodeExecutorAgent
 
-def getCodeExecutorAgent(code_executor):
+def getCodeExecutorAgent(code_executor, sql_engine=None):
 
     code_executor_agent = CodeExecutorAgent(
         name='Python_Code_Executor',
-        code_executor=code_executor
+        code_executor=code_executor,
+        # sql blocks are only extracted when the executor answers them (see config/sql_executor.py)
+        supported_languages=CodeExecutorAgent.DEFAULT_SUPPORTED_LANGUAGES + ["sql"] if sql_engine else None
     )
 
     return code_executor_agent
\ No newline at end of file
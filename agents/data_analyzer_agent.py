@@ -1,10 +1,13 @@
 from autogen_agentchat.agents import AssistantAgent
+from agents.model_context import CompactingChatCompletionContext
 # from prompts.data_analyzer_message import DATA_ANALYZER_SYSTEM_MESSAGE
 
 DATA_ANALYZER_SYSTEM_MESSAGE='''
 
 You are a Data analyst agent with expertise in Data analyst and python and working with csv data.
-You will be getting a file and will be in the working dir and a question related to this data from the user.
+You will be getting the path of a data file and a question related to this data from the user.
+The data file is read-only: always read it from the exact path you are given, and save every file you create (charts, tables) in the current working directory.
+If the data file ends with `.parquet`, it is a columnar copy of the uploaded CSV with column types preserved: load it with pd.read_parquet(path), never pd.read_csv.
 
 Your job is to write a python code to answer that question. 
 
@@ -18,7 +21,7 @@ IMPORTANT: Always start by loading the CSV and printing the column names to avoi
 Code should be like below, in a single block and no multiple block.
 ```python
 import pandas as pd
-df = pd.read_csv('filename.csv')
+df = pd.read_csv('<data file path you were given>')
 print("Available columns:", df.columns.tolist())
 # your-code-here using exact column names from the printed list
 ```
@@ -47,11 +50,55 @@ Once we have completed all the task, please mention 'STOP' after explaning in de
 Stick to these and ensure a smooth collaboration with Code_executor_agent.
 '''
 
-def getDataAnalyzerAgent(model_client):
+# Used when the executor keeps a stateful kernel with the dataset already loaded (see config/kernel_executor.py)
+DATA_ANALYZER_KERNEL_SYSTEM_MESSAGE = DATA_ANALYZER_SYSTEM_MESSAGE.replace(
+"""IMPORTANT: Always start by loading the CSV and printing the column names to avoid KeyError issues.
+Code should be like below, in a single block and no multiple block.
+```python
+import pandas as pd
+df = pd.read_csv('<data file path you were given>')
+print("Available columns:", df.columns.tolist())
+# your-code-here using exact column names from the printed list
+```
+""",
+"""IMPORTANT: Your code runs in a persistent Python session. The uploaded CSV is ALREADY loaded as a pandas DataFrame named `df` and `pd` is already imported.
+Do NOT call pd.read_csv on the given data file again; use `df` directly. Variables you define stay available to your later code blocks in this chat.
+If a variable other than `df` is reported as not defined, the session was restarted: recompute it from `df`.
+Avoid modifying `df` in place; assign filtered or transformed data to new variables.
+Code should be like below, in a single block and no multiple block.
+```python
+print("Available columns:", df.columns.tolist())
+# your-code-here using exact column names from the printed list
+```
+""")
+
+# Appended when sql blocks are answered by the embedded engine (see config/sql_executor.py)
+DATA_ANALYZER_SQL_MESSAGE = '''
+For plain aggregations, filters, group-bys and top-N questions, prefer one SQL query over Python code: it runs in an embedded {dialect} engine directly on the dataset and answers in well under a second even for very large files.
+The dataset is the table `data` with the same columns as the CSV. Write a single query in a ```sql block. The first lines may name the result file and ask for a chart of the result:
+```sql
+-- filename: survival_by_class.csv
+-- chart: bar x=pclass y=survival_rate
+SELECT pclass, AVG(survived) AS survival_rate FROM data GROUP BY pclass ORDER BY pclass
+```
+The full result is saved under that descriptive file name (`.csv` or `.parquet`) and its first rows are shown to you. Chart kinds are bar, barh, line, area, scatter and pie; `x` defaults to the first column and `y` to the other numeric columns; the chart is saved as a `.png` with the same name.
+Use Python for anything SQL cannot express (statistics, models, custom plots).
+'''
+
+SQL_DIALECTS = {"duckdb": "DuckDB", "sqlite": "SQLite"}
+
+def getDataAnalyzerAgent(model_client, stateful_kernel=False, stream=False, compact_context=False, sql_engine=None):
+    system_message = DATA_ANALYZER_KERNEL_SYSTEM_MESSAGE if stateful_kernel else DATA_ANALYZER_SYSTEM_MESSAGE
+    if sql_engine:
+        system_message += DATA_ANALYZER_SQL_MESSAGE.format(dialect=SQL_DIALECTS[sql_engine])
     data_analyzer_agent = AssistantAgent(
         name='Data_Analyzer_agent',
         model_client=model_client,
         description = 'An Agent that solves Data Analysis problem and gives the code as well',
-        system_message=DATA_ANALYZER_SYSTEM_MESSAGE
+        system_message=system_message,
+        # Emit ModelClientStreamingChunkEvent tokens while the reply is generated
+        model_client_stream=stream,
+        # Keep the prompt within a token budget by summarizing older turns (see agents/model_context.py)
+        model_context=CompactingChatCompletionContext(model_client) if compact_context else None
     )
     return data_analyzer_agent
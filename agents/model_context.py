@@ -0,0 +1,145 @@
+from autogen_core.model_context import ChatCompletionContext
+from autogen_core.models import SystemMessage, UserMessage
+
+from config.constants import (
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_RECENT_MESSAGES,
+    CONTEXT_SUMMARY_MAX_TOKENS,
+    CONTEXT_OUTPUT_MAX_CHARS,
+)
+from telemetry.tracing import get_tracer
+
+# Source name of the message holding the compacted memory of earlier turns
+SUMMARY_SOURCE = "context_summary"
+# Rough characters-per-token ratio used for budgeting (no tokenizer round trip per turn)
+CHARS_PER_TOKEN = 4
+# How much of each older message the summarizer gets to see
+SUMMARY_INPUT_MAX_CHARS = 2000
+
+SUMMARY_SYSTEM_MESSAGE = '''
+You compress the earlier part of a data analysis conversation into a short memory for the analyst.
+Keep: the questions asked, the exact column names and data facts discovered, variables and files created
+(with their names), libraries installed, errors hit and how they were fixed, and the key numeric results.
+Drop: raw tables, tracebacks, repeated code and anything that does not matter for later questions.
+Answer with concise bullet points only.
+'''
+
+
+def estimate_tokens(messages):
+    """Approximate the prompt tokens of a list of LLM messages."""
+    return sum(len(str(message.content)) // CHARS_PER_TOKEN + 4 for message in messages)
+
+
+def clip_text(text, max_chars):
+    """Keep the head and tail of a long text, noting how much was cut from the middle."""
+    if len(text) <= max_chars:
+        return text
+    head = text[:max_chars * 2 // 3]
+    tail = text[-(max_chars // 3):]
+    omitted = text[len(head):len(text) - len(tail)]
+    return f"{head}\n... [{omitted.count(chr(10)) + 1} lines / {len(omitted)} characters omitted] ...\n{tail}"
+
+
+class CompactingChatCompletionContext(ChatCompletionContext):
+    """
+    Model context that keeps the analyzer's prompt within a token budget.
+
+    Long executor outputs (printed DataFrames, tracebacks) are clipped to their head and
+    tail as they arrive. Once the history exceeds ``token_budget``, everything except the
+    ``recent_messages`` most recent messages and the current task is replaced by a single
+    summary produced by the model (an earlier summary is folded into the new one), so the
+    prompt size per turn stays roughly constant over long chats. The compacted history is
+    what ``save_state`` returns, so saved team state stays bounded as well.
+    """
+
+    def __init__(self, model_client, token_budget=CONTEXT_TOKEN_BUDGET, recent_messages=CONTEXT_RECENT_MESSAGES,
+                 summary_max_tokens=CONTEXT_SUMMARY_MAX_TOKENS, output_max_chars=CONTEXT_OUTPUT_MAX_CHARS,
+                 initial_messages=None):
+        """
+        Args:
+            model_client: Client used for the summarization pass
+            token_budget: Estimated prompt tokens (excluding the system message) that trigger compaction
+            recent_messages: Number of most recent messages always kept verbatim
+            summary_max_tokens: Upper bound on the size of the compacted memory
+            output_max_chars: Longest message from another agent kept in full
+            initial_messages: Messages to start with
+        """
+        super().__init__(initial_messages)
+        self._model_client = model_client
+        self._token_budget = token_budget
+        self._recent_messages = recent_messages
+        self._summary_max_tokens = summary_max_tokens
+        self._output_max_chars = output_max_chars
+
+    async def add_message(self, message):
+        if isinstance(message, UserMessage) and isinstance(message.content, str) and message.source != "user":
+            message = message.model_copy(update={"content": clip_text(message.content, self._output_max_chars)})
+        self._messages.append(message)
+
+    async def get_messages(self):
+        if estimate_tokens(self._messages) > self._token_budget:
+            await self._compact()
+        return list(self._messages)
+
+    async def _compact(self):
+        messages = self._messages
+        split = max(0, len(messages) - self._recent_messages)
+        # The task being worked on stays verbatim even when it has scrolled out of the window.
+        task_index = max((i for i, m in enumerate(messages) if getattr(m, "source", None) == "user"), default=None)
+        older = [m for i, m in enumerate(messages[:split]) if i != task_index]
+        if all(getattr(m, "source", None) == SUMMARY_SOURCE for m in older):
+            # Nothing new to fold in; the recent window alone is over budget.
+            return
+
+        with get_tracer().span("context.compact", messages=len(older), tokens_before=estimate_tokens(messages)) as span:
+            summary = UserMessage(
+                content=f"Summary of the earlier conversation in this chat:\n{await self._summarize(older)}",
+                source=SUMMARY_SOURCE,
+            )
+            task = [messages[task_index]] if task_index is not None and task_index < split else []
+            self._messages = [summary] + task + messages[split:]
+            span.set(tokens_after=estimate_tokens(self._messages))
+
+    async def _summarize(self, messages):
+        """Ask the model for a short memory of ``messages``, falling back to an extractive one."""
+        transcript = "\n\n".join(
+            f"[{getattr(m, 'source', 'assistant')}]: {clip_text(str(m.content), SUMMARY_INPUT_MAX_CHARS)}"
+            for m in messages
+        )
+        max_chars = self._summary_max_tokens * CHARS_PER_TOKEN
+        try:
+            result = await self._model_client.create([
+                SystemMessage(content=SUMMARY_SYSTEM_MESSAGE),
+                UserMessage(content=transcript, source="user"),
+            ])
+            if isinstance(result.content, str) and result.content.strip():
+                return clip_text(result.content.strip(), max_chars)
+        except Exception as e:
+            print(f"Context compaction: summarization failed, keeping an extract instead: {e}")
+        extract = "\n".join(
+            f"- [{getattr(m, 'source', 'assistant')}] {str(m.content).strip().splitlines()[0][:200]}"
+            for m in messages if str(m.content).strip()
+        )
+        return clip_text(extract, max_chars)
+
+
+def trim_team_state(team_state, keep_messages=CONTEXT_RECENT_MESSAGES):
+    """
+    Bound the group chat manager's message thread in a saved team state.
+
+    The round-robin manager keeps every message of the chat in its state although it never
+    reads them back to pick a speaker; only the most recent ones are kept so the saved
+    state does not grow with the chat (the analyzer's own memory lives in its model context).
+
+    Args:
+        team_state: Dict returned by ``team.save_state()``
+        keep_messages: Number of most recent thread messages to keep
+
+    Returns:
+        The same dict, trimmed in place
+    """
+    for agent_state in team_state.get("agent_states", {}).values():
+        thread = agent_state.get("message_thread") if isinstance(agent_state, dict) else None
+        if thread is not None and len(thread) > keep_messages:
+            agent_state["message_thread"] = thread[-keep_messages:]
+    return team_state
@@ -1,14 +1,70 @@
-import pandas as pd
+import asyncio
+import hashlib
 import json
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from autogen_agentchat.agents import AssistantAgent
+from cache.disk_cache import DiskCache
+from config.constants import CACHE_DIR, SUGGESTION_CACHE_MAX_ENTRIES, SUGGESTION_CACHE_TTL
+from data.columnar import find_columnar_copy
+from data.profiler import profile_dataset
+
+SUGGESTION_CACHE_FILE = os.path.join(CACHE_DIR, "suggestions.sqlite")
+
+_refinement_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="suggestions")
+
+_suggestion_cache = None
+_suggestion_cache_lock = threading.Lock()
+
+
+def get_suggestion_cache():
+    """
+    Return the process-wide, disk-backed cache of generated query suggestions.
+    
+    Returns:
+        DiskCache with LRU eviction and a TTL
+    """
+    global _suggestion_cache
+    with _suggestion_cache_lock:
+        if _suggestion_cache is None:
+            _suggestion_cache = DiskCache(
+                SUGGESTION_CACHE_FILE,
+                max_entries=SUGGESTION_CACHE_MAX_ENTRIES,
+                ttl_seconds=SUGGESTION_CACHE_TTL
+            )
+        return _suggestion_cache
+
+
+def suggestion_cache_key(query: str, csv_info: dict) -> str:
+    """
+    Build the cache key for a suggestion request.
+    
+    Queries that differ only in case, punctuation or spacing share a key; the column
+    set is order-independent and the sample rows are hashed.
+    
+    Args:
+        query: User's query string
+        csv_info: Dictionary containing CSV metadata (columns, sample_data, shape)
+        
+    Returns:
+        Hex digest identifying the request
+    """
+    normalized_query = " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+    columns = sorted(str(column) for column in csv_info['columns'])
+    sample_hash = hashlib.sha256(str(csv_info['sample_data']).encode("utf-8")).hexdigest()
+    return hashlib.sha256(json.dumps([normalized_query, columns, sample_hash]).encode("utf-8")).hexdigest()
+
 
 class QueryClarityAgent:
     """
     Agent that generates contextual query suggestions for any user query.
     """
     
-    def __init__(self, model_client, name="Query_Suggestions_Agent"):
+    def __init__(self, model_client, name="Query_Suggestions_Agent", cache=None):
         self.model_client = model_client
+        self.cache = cache if cache is not None else get_suggestion_cache()
         self.agent = AssistantAgent(
             name=name,
             model_client=model_client,
@@ -66,18 +122,52 @@ ALWAYS respond with JSON containing suggestions:
 """
         )
     
-    async def generate_query_suggestions(self, query: str, csv_info: dict) -> dict:
+    def get_cached_suggestions(self, query: str, csv_info: dict):
+        """
+        Return previously generated suggestions for this query and data, if still cached.
+        
+        Args:
+            query: User's query string
+            csv_info: Dictionary containing CSV metadata (columns, sample_data, shape)
+            
+        Returns:
+            List of suggestions or None
+        """
+        return self.cache.get(suggestion_cache_key(query, csv_info))
+    
+    def refine_suggestions_in_background(self, query: str, csv_info: dict) -> Future:
+        """
+        Run ``generate_query_suggestions`` on a worker thread so the caller is never blocked.
+        
+        Args:
+            query: User's query string
+            csv_info: Dictionary containing CSV metadata (columns, sample_data, shape)
+            
+        Returns:
+            Future resolving to the same dictionary ``generate_query_suggestions`` returns
+        """
+        # The caller has just checked the cache, so skip the lookup to keep the hit/miss counters honest
+        return _refinement_executor.submit(asyncio.run, self.generate_query_suggestions(query, csv_info, check_cache=False))
+    
+    async def generate_query_suggestions(self, query: str, csv_info: dict, check_cache: bool = True) -> dict:
         """
         Generate contextual query suggestions based on user query and CSV data.
         
         Args:
             query: User's query string
             csv_info: Dictionary containing CSV metadata (columns, sample_data, shape)
+            check_cache: Look the request up in the suggestion cache before calling the model
             
         Returns:
-            Dictionary with suggestions
+            Dictionary with suggestions (``cached`` is True when served from the suggestion cache)
         """
         
+        # Repeat clicks and common queries are answered without a model round trip
+        cache_key = suggestion_cache_key(query, csv_info)
+        cached_suggestions = self.get_cached_suggestions(query, csv_info) if check_cache else None
+        if cached_suggestions:
+            return {"suggestions": cached_suggestions, "cached": True}
+        
         # Prepare context about the CSV data
         context = f"""
 AVAILABLE DATA COLUMNS: {csv_info['columns']}
@@ -106,6 +196,8 @@ Generate 5 similar query suggestions that are closely related to the user's orig
                     response_text = response_text.replace("```", "").strip()
                 
                 parsed_result = json.loads(response_text)
+                if parsed_result.get("suggestions"):
+                    self.cache.set(cache_key, parsed_result["suggestions"])
                 return parsed_result
             else:
                 # If no messages, return error indication
@@ -162,6 +254,11 @@ def get_csv_info(file_path: str) -> dict:
     """
     Extract relevant information from CSV file for query suggestions.
     
+    Uses the streaming profiler, so the file is parsed at most once per content
+    hash and repeat calls are served from the profile cache. The dataset's Parquet
+    copy is parsed instead of the CSV once it is available, but the profile stays
+    keyed on the CSV, so ``file_hash`` and ``sample_data`` do not change with it.
+    
     Args:
         file_path: Path to the CSV file
         
@@ -169,13 +266,15 @@ def get_csv_info(file_path: str) -> dict:
         Dictionary with CSV metadata
     """
     try:
-        df = pd.read_csv(file_path)
+        profile = profile_dataset(file_path, read_path=find_columnar_copy(file_path))
         
         # Get basic info
         csv_info = {
-            'columns': df.columns.tolist(),
-            'shape': df.shape,
-            'sample_data': df.head(3).to_string(index=False)
+            'columns': profile['columns'],
+            'shape': (profile['rows'], len(profile['columns'])),
+            'sample_data': profile['sample_data'],
+            'column_profiles': profile['column_profiles'],
+            'file_hash': profile['file_hash']
         }
         
         return csv_info
@@ -184,9 +283,156 @@ def get_csv_info(file_path: str) -> dict:
         return {
             'columns': [],
             'shape': (0, 0),
-            'sample_data': f"Error reading CSV: {str(e)}"
+            'sample_data': f"Error reading CSV: {str(e)}",
+            'column_profiles': {},
+            'file_hash': None
         }
 
+# Query keywords that hint at the kind of analysis the user wants
+INTENT_KEYWORDS = {
+    "trend": ("trend", "trends", "time", "over", "monthly", "daily", "weekly", "yearly", "growth", "change", "timeline"),
+    "distribution": ("distribution", "histogram", "spread", "range", "outlier", "outliers", "variance"),
+    "compare": ("compare", "comparison", "by", "per", "each", "across", "breakdown", "group", "versus", "vs"),
+    "correlation": ("correlation", "correlate", "relationship", "related", "relation", "impact", "affect", "depend"),
+    "top": ("top", "most", "highest", "best", "largest", "lowest", "least", "worst", "rank", "ranking"),
+    "count": ("count", "many", "number", "frequency", "frequent"),
+    "missing": ("missing", "null", "nulls", "empty", "nan", "quality"),
+    "summary": ("summary", "summarize", "overview", "describe", "statistics", "stats", "insight", "insights"),
+}
+DEFAULT_INTENTS = ("compare", "distribution", "summary", "top", "trend")
+LOW_CARDINALITY = 50
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", str(text).lower())
+
+
+def _word_matches(query_word, column_word):
+    if len(query_word) < 3 or len(column_word) < 3:
+        return query_word == column_word
+    if query_word in column_word or column_word in query_word:
+        return True
+    # Shared stem, e.g. "survival" / "survived"
+    prefix = os.path.commonprefix([query_word, column_word])
+    return len(prefix) >= 5
+
+
+def _column_roles(csv_info):
+    """Split columns into numeric, categorical and datetime candidates using the profile."""
+    profiles = csv_info.get('column_profiles') or {}
+    rows = csv_info['shape'][0] if csv_info.get('shape') else 0
+    numeric, categorical, datetime, coded = [], [], [], []
+    for column in csv_info['columns']:
+        profile = profiles.get(column, {})
+        kind = profile.get("kind", "categorical")
+        distinct = profile.get("distinct_estimate", 0)
+        # Unique integer columns are row identifiers, not measures worth aggregating
+        unique_integers = str(profile.get("dtype", "")).startswith("int") and distinct >= 0.98 * rows
+        identifier = "id" in _words(column) or (rows > LOW_CARDINALITY and unique_integers)
+        if kind == "datetime":
+            datetime.append(column)
+        elif kind == "numeric":
+            if 1 < distinct <= 10:
+                # Coded numbers (flags, classes) group well and, when asked about, average into rates
+                categorical.append(column)
+                coded.append(column)
+            elif not identifier:
+                numeric.append(column)
+        elif kind in ("categorical", "boolean") and 1 < distinct <= LOW_CARDINALITY:
+            categorical.append(column)
+    return numeric + coded, categorical, datetime
+
+
+def generate_local_suggestions(query: str, csv_info: dict, limit: int = 5) -> list:
+    """
+    Build query suggestions from the column profile alone, without calling a model.
+    
+    Columns mentioned in the query and the analysis intent implied by its keywords
+    (trend, comparison, distribution, ...) are combined with the columns' kinds to fill
+    suggestion templates. Deterministic and fast enough to render immediately while the
+    model-generated suggestions are still on their way.
+    
+    Args:
+        query: User's query string
+        csv_info: Dictionary containing CSV metadata (columns, sample_data, shape, column_profiles)
+        limit: Maximum number of suggestions
+        
+    Returns:
+        List of suggestion strings
+    """
+    query_words = _words(query)
+    numeric, categorical, datetime = _column_roles(csv_info)
+
+    def mentioned(column):
+        return any(_word_matches(q, c) for q in query_words for c in _words(column))
+
+    def pick(columns, skip=()):
+        candidates = [c for c in columns if c not in skip]
+        preferred = [c for c in candidates if mentioned(c)]
+        return (preferred or candidates or [None])[0]
+
+    num = pick(numeric)
+    num2 = pick(numeric, skip=(num,))
+    cat = pick(categorical, skip=(num,))
+    cat2 = pick(categorical, skip=(num, cat))
+    dt = pick(datetime)
+    any_mentioned = next((c for c in csv_info['columns'] if mentioned(c)), None)
+
+    intents = [intent for intent, keywords in INTENT_KEYWORDS.items() if any(w in keywords for w in query_words)]
+    intents += [intent for intent in DEFAULT_INTENTS if intent not in intents]
+
+    templates = {
+        "trend": [
+            (num and dt) and f"Show the trend of '{num}' over '{dt}'",
+            (num and dt and cat) and f"Compare '{num}' trends over '{dt}' for each '{cat}'",
+            (dt and not num) and f"Show the number of rows per month using '{dt}'",
+        ],
+        "distribution": [
+            num and f"Show the distribution of '{num}' as a histogram",
+            (num and cat) and f"Compare the distribution of '{num}' across '{cat}' with a box plot",
+        ],
+        "compare": [
+            (num and cat) and f"Compare the average '{num}' by '{cat}'",
+            (cat and cat2) and f"Show a breakdown of '{cat}' by '{cat2}'",
+            cat and f"Show the number of rows for each '{cat}'",
+        ],
+        "correlation": [
+            (num and num2) and f"Show the correlation between '{num}' and '{num2}' with a scatter plot",
+            (num and num2) and "Plot a correlation heatmap of the numeric columns",
+        ],
+        "top": [
+            (num and cat) and f"Show the top 10 '{cat}' values by total '{num}'",
+            num and f"List the 10 rows with the highest '{num}'",
+        ],
+        "count": [
+            cat and f"Count the number of rows for each '{cat}'",
+            (cat and cat2) and f"Count rows for each combination of '{cat}' and '{cat2}'",
+        ],
+        "missing": [
+            "Show the number of missing values in each column",
+            any_mentioned and f"Show the rows where '{any_mentioned}' is missing",
+        ],
+        "summary": [
+            num and f"Show summary statistics (mean, median, min, max) for '{num}'",
+            "Give an overview of the dataset with summary statistics for every column",
+        ],
+    }
+
+    suggestions = []
+    for intent in intents:
+        for suggestion in templates[intent]:
+            if suggestion and suggestion not in suggestions:
+                suggestions.append(suggestion)
+                break
+    # Second pass: fill remaining slots with the other templates of the matched intents
+    for intent in intents:
+        for suggestion in templates[intent]:
+            if len(suggestions) >= limit:
+                return suggestions
+            if suggestion and suggestion not in suggestions:
+                suggestions.append(suggestion)
+    return suggestions[:limit]
+
 def create_query_clarity_agent(model_client):
     """
     Factory function to create a Query Suggestions Agent.
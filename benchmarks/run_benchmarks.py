@@ -0,0 +1,220 @@
+"""
+End-to-end benchmark of one analysis run per synthetic dataset, with no network access.
+
+The analyzer is driven by a scripted model client and code runs in a local executor
+(or a real pooled container with ``--docker``). Every phase is timed and the results
+are written as JSON so runs on two commits can be diffed.
+
+Usage:
+    python -m benchmarks.run_benchmarks --preset small --output benchmark_results.json
+    python -m benchmarks.run_benchmarks --case 1000000x10 --case 1000x2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from autogen_ext.code_executors.local import LocalCommandLineCodeExecutor
+
+from benchmarks.stubs import ScriptedModelClient, TimedCodeExecutor, scripted_turns
+from benchmarks.synthetic import synthetic_csv
+from config.artifact_manifest import ManifestCodeExecutor, ManifestRecorder
+from data.profiler import build_profile, profile_dataset
+from data.session_files import create_export_zip
+from teams.analyzer_gpt import getDataAnalyzerTeam
+
+PRESETS = {
+    "smoke": [(1_000, 10)],
+    "small": [(1_000, 10), (100_000, 10), (1_000, 2_000)],
+    "medium": [(1_000, 10), (100_000, 10), (1_000, 2_000), (1_000_000, 10), (100_000, 200)],
+    "full": [(1_000, 10), (100_000, 10), (1_000, 2_000), (1_000_000, 10), (100_000, 200),
+             (10_000_000, 10), (100_000, 2_000)],
+}
+
+
+def _max_rss_bytes(who):
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss * scale
+
+
+class PhaseTimer:
+    """Collects wall time and peak traced Python memory for named phases."""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = {
+                "seconds": round(time.perf_counter() - started, 6),
+                "peak_bytes": tracemalloc.get_traced_memory()[1] if self.trace_memory else None,
+            }
+
+
+async def _start_executor(use_docker):
+    """Return (executor, work_dir, cleanup coroutine function) for the chosen sandbox."""
+    if use_docker:
+        from config.container_pool import ContainerPool
+
+        pool = ContainerPool(min_size=0, max_size=1)
+        pool.start()
+        docker = await pool.acquire()
+
+        async def cleanup():
+            await pool.release(docker, discard=True)
+            await asyncio.to_thread(pool.shutdown)
+        return docker, str(docker.work_dir), cleanup
+
+    work_dir = tempfile.mkdtemp(prefix="analyzer-bench-")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        executor = LocalCommandLineCodeExecutor(work_dir=work_dir, timeout=3600)
+    await executor.start()
+
+    async def cleanup():
+        await executor.stop()
+    return executor, work_dir, cleanup
+
+
+async def run_case(rows, cols, use_docker=False, trace_memory=True):
+    """
+    Benchmark one synthetic dataset end to end.
+
+    Returns:
+        JSON-serializable dict with the dataset shape and per-phase timings
+    """
+    generate_started = time.perf_counter()
+    csv_path = synthetic_csv(rows, cols)
+    generate_seconds = time.perf_counter() - generate_started
+
+    timer = PhaseTimer(trace_memory)
+    with timer.phase("profile"):
+        build_profile(csv_path)
+    profile_dataset(csv_path)
+    with timer.phase("profile_cached"):
+        profile_dataset(csv_path)
+
+    with timer.phase("container_start"):
+        inner, work_dir, cleanup = await _start_executor(use_docker)
+
+    try:
+        data_path = os.path.abspath(csv_path)
+        if use_docker:
+            from data.dataset_store import store_file
+            data_path = store_file(csv_path)["container_path"]
+
+        model_client = ScriptedModelClient(scripted_turns(data_path))
+        recorder = ManifestRecorder(ManifestCodeExecutor(inner))
+        executor = TimedCodeExecutor(recorder)
+        team = getDataAnalyzerTeam(executor, model_client, stream=True)
+
+        with timer.phase("team_run"):
+            async for _ in team.run_stream(task=f"Using the data from '{data_path}', summarize value by group"):
+                pass
+
+        with timer.phase("artifact_discovery"):
+            session_files = [entry["name"] for entry in recorder.artifacts]
+        with timer.phase("export_zip"):
+            zip_path = create_export_zip(work_dir, session_files)
+        with timer.phase("export_zip_cached"):
+            create_export_zip(work_dir, session_files)
+    finally:
+        await cleanup()
+
+    return {
+        "rows": rows,
+        "cols": cols,
+        "file_bytes": os.path.getsize(csv_path),
+        "generate_seconds": round(generate_seconds, 6),
+        "phases": timer.phases,
+        "model_turns": [{k: (round(v, 6) if v is not None else None) for k, v in turn.items()}
+                        for turn in model_client.turns],
+        "executions": [dict(e, seconds=round(e["seconds"], 6)) for e in executor.executions],
+        "artifacts": sorted(session_files),
+        "export_zip_bytes": os.path.getsize(zip_path) if zip_path else 0,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_case(value):
+    rows, _, cols = value.lower().partition("x")
+    return int(rows.replace("_", "")), int(cols.replace("_", ""))
+
+
+async def run_benchmarks(cases, use_docker=False, trace_memory=True):
+    """Run every (rows, cols) case and return the full report."""
+    if trace_memory:
+        tracemalloc.start()
+    results = []
+    for rows, cols in cases:
+        print(f"Benchmarking {rows:,} rows x {cols:,} columns...", flush=True)
+        result = await run_case(rows, cols, use_docker=use_docker, trace_memory=trace_memory)
+        results.append(result)
+        phases = ", ".join(f"{name} {phase['seconds']:.3f}s" for name, phase in result["phases"].items())
+        print(f"  {phases}", flush=True)
+    if trace_memory:
+        tracemalloc.stop()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "executor": "docker" if use_docker else "local",
+            "trace_memory": trace_memory,
+        },
+        "cases": results,
+        "max_rss_bytes": _max_rss_bytes(resource.RUSAGE_SELF) if resource else None,
+        "max_rss_children_bytes": _max_rss_bytes(resource.RUSAGE_CHILDREN) if resource else None,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark with a scripted model and synthetic data")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="smoke", help="Predefined set of dataset sizes")
+    parser.add_argument("--case", action="append", type=_parse_case, metavar="ROWSxCOLS",
+                        help="Dataset size to run instead of the preset (repeatable)")
+    parser.add_argument("--docker", action="store_true", help="Run code in a pooled Docker container instead of locally")
+    parser.add_argument("--no-trace-memory", action="store_true", help="Skip tracemalloc (lower overhead, no peak_bytes)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON report")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(run_benchmarks(args.case or PRESETS[args.preset], use_docker=args.docker,
+                                        trace_memory=not args.no_trace_memory))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
@@ -0,0 +1,87 @@
+import time
+
+from autogen_core.code_executor import CodeExecutor
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+SCRIPTED_MODEL_INFO = {
+    "json_output": False,
+    "function_calling": False,
+    "vision": False,
+    "family": "unknown",
+    "structured_output": False,
+}
+
+
+def scripted_turns(data_path):
+    """
+    Deterministic analyzer replies for one benchmark run: plan + code, then the final analysis.
+
+    Args:
+        data_path: Path of the dataset as the executor sees it
+
+    Returns:
+        List of completion strings in the order the analyzer produces them
+    """
+    code = f"""import pandas as pd
+df = pd.read_csv({data_path!r})
+print("Available columns:", df.columns.tolist()[:20])
+summary = df.groupby('group')['value'].agg(['count', 'mean']).reset_index()
+summary.to_csv('group_summary.csv', index=False)
+df.describe().to_json('describe.json')
+print(summary.to_string(index=False))"""
+    plan = f"I will load the data, summarize `value` per `group` and save the result.\n\n```python\n{code}\n```"
+    analysis = (
+        "## Analysis\n\nThe per-group summary was saved to `group_summary.csv` and descriptive "
+        "statistics to `describe.json`. Values are centred around 100 in every group.\n\nSTOP"
+    )
+    return [plan, analysis]
+
+
+class ScriptedModelClient(ReplayChatCompletionClient):
+    """Replay client that also records how long each model turn took (and its first token)."""
+
+    def __init__(self, chat_completions, model_info=None):
+        super().__init__(chat_completions, model_info=model_info or SCRIPTED_MODEL_INFO)
+        self.turns = []
+
+    async def create(self, messages, **kwargs):
+        started = time.perf_counter()
+        result = await super().create(messages, **kwargs)
+        self.turns.append({"seconds": time.perf_counter() - started, "first_token_seconds": None})
+        return result
+
+    async def create_stream(self, messages, **kwargs):
+        started = time.perf_counter()
+        first_token = None
+        async for chunk in super().create_stream(messages, **kwargs):
+            if first_token is None and isinstance(chunk, str):
+                first_token = time.perf_counter() - started
+            yield chunk
+        self.turns.append({"seconds": time.perf_counter() - started, "first_token_seconds": first_token})
+
+
+class TimedCodeExecutor(CodeExecutor):
+    """Executor wrapper recording the wall time of every ``execute_code_blocks`` call."""
+
+    def __init__(self, executor):
+        self._executor = executor
+        self.executions = []
+
+    async def execute_code_blocks(self, code_blocks, cancellation_token):
+        started = time.perf_counter()
+        result = await self._executor.execute_code_blocks(code_blocks, cancellation_token)
+        self.executions.append({
+            "seconds": time.perf_counter() - started,
+            "blocks": len(code_blocks),
+            "exit_code": result.exit_code,
+        })
+        return result
+
+    async def start(self):
+        await self._executor.start()
+
+    async def stop(self):
+        await self._executor.stop()
+
+    async def restart(self):
+        await self._executor.restart()
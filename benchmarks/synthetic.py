@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from config.constants import CACHE_DIR
+
+SYNTHETIC_DIR = os.path.join(CACHE_DIR, "benchmarks")
+# Cells generated per chunk, so even 10M-row files are written with bounded memory.
+CHUNK_CELLS = 2_000_000
+GROUPS = np.array(["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"])
+
+
+def _chunk(rng, start, rows, cols):
+    """One block of rows: ``group``/``value`` plus a repeating mix of int, float, category and date columns."""
+    data = {
+        "group": GROUPS[rng.integers(0, len(GROUPS), rows)],
+        "value": rng.normal(100.0, 15.0, rows).round(3),
+    }
+    for i in range(2, cols):
+        kind = i % 4
+        if kind == 0:
+            data[f"int_{i}"] = rng.integers(0, 1_000_000, rows)
+        elif kind == 1:
+            data[f"float_{i}"] = rng.random(rows).round(5)
+        elif kind == 2:
+            data[f"cat_{i}"] = GROUPS[rng.integers(0, len(GROUPS), rows)]
+        else:
+            data[f"date_{i}"] = pd.to_datetime(1_600_000_000 + start + np.arange(rows), unit="s").strftime("%Y-%m-%d")
+    return pd.DataFrame(data)
+
+
+def synthetic_csv(rows, cols, seed=0):
+    """
+    Return the path of a deterministic synthetic CSV, generating it on first use.
+
+    Args:
+        rows: Number of data rows
+        cols: Number of columns (at least 2: ``group`` and ``value`` come first)
+        seed: Random seed; the same (rows, cols, seed) always yields the same file
+
+    Returns:
+        Path to the CSV under ``CACHE_DIR/benchmarks``
+    """
+    cols = max(2, cols)
+    path = os.path.join(SYNTHETIC_DIR, f"synthetic_{rows}x{cols}_s{seed}.csv")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(SYNTHETIC_DIR, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    chunk_rows = max(1, CHUNK_CELLS // cols)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        for start in range(0, rows, chunk_rows):
+            chunk = _chunk(rng, start, min(chunk_rows, rows - start), cols)
+            chunk.to_csv(f, index=False, header=start == 0)
+    os.replace(tmp_path, path)
+    return path
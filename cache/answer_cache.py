@@ -0,0 +1,290 @@
+import base64
+import hashlib
+import os
+import re
+import threading
+import time
+
+from cache.disk_cache import DiskCache
+from config.constants import (
+    CACHE_DIR,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_MAX_BYTES,
+    ANSWER_CACHE_MAX_ARTIFACT_BYTES,
+    ANSWER_CACHE_OFFER_THRESHOLD,
+)
+
+ANSWER_CACHE_FILE = os.path.join(CACHE_DIR, "answers.sqlite")
+ARTIFACT_EXTENSIONS = {".png", ".jpg", ".jpeg", ".svg", ".csv", ".json"}
+# Share of the score that comes from the columns a question refers to; the rest is the remaining wording.
+COLUMN_WEIGHT = 0.6
+
+STOPWORDS = {
+    "a", "an", "the", "of", "for", "by", "in", "on", "to", "and", "or", "with", "per", "from", "me",
+    "my", "i", "you", "your", "is", "are", "was", "were", "be", "it", "its", "this", "that", "these",
+    "what", "which", "how", "can", "could", "would", "please", "show", "give", "get", "find", "tell",
+    "data", "dataset", "file", "csv", "across", "each", "all", "as", "do", "does", "at", "there", "who",
+}
+SYNONYMS = {
+    "avg": "average", "mean": "average", "no": "number", "num": "number", "count": "number",
+    "graph": "chart", "plot": "chart", "visualize": "chart", "visualise": "chart",
+    "vs": "versus", "against": "versus", "total": "sum", "largest": "top", "highest": "top",
+    "biggest": "top", "lowest": "bottom", "smallest": "bottom", "pct": "percent", "percentage": "percent",
+}
+SUFFIXES = ("ations", "ation", "ings", "ing", "ies", "ied", "es", "ed", "al", "s")
+# Stemmed words that flip a filter; always kept as wording, never read as a column
+NEGATIONS = {"not", "without", "except", "exclud", "never", "none", "non", "only"}
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def _stem(word):
+    word = SYNONYMS.get(word, word)
+    if word.isdigit() or word.endswith("ss"):
+        return word
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)] + ("y" if suffix in ("ies", "ied") else "")
+    return word
+
+
+def _tokens(text):
+    # Split camelCase and snake_case so column names like "SibSp" or "fare_paid" break into words.
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(text))
+    return [_stem(w) for w in re.findall(r"[a-z0-9]+", text.lower()) if w not in STOPWORDS]
+
+
+def _refers_to(token, column_tokens, compact):
+    """True if a query token names the column (``class`` -> ``Pclass``, ``survival`` -> ``Survived``)."""
+    if token in column_tokens or token == compact:
+        return True
+    return len(token) >= 4 and (compact.endswith(token) or compact.startswith(token))
+
+
+def query_features(query, columns):
+    """
+    Reduce a question to the columns it refers to and the rest of its wording.
+
+    Args:
+        query: User's question
+        columns: Dataset column names
+
+    Returns:
+        Dict with sorted ``columns`` referenced, remaining stemmed ``terms`` and ``numbers``
+    """
+    query_tokens = _tokens(query)
+    column_keys = []
+    for column in columns:
+        column_tokens = _tokens(column)
+        # Identifier columns ("PassengerId") are only meant when the question says "id".
+        if len(column_tokens) > 1 and column_tokens[-1] == "id" and "id" not in query_tokens:
+            continue
+        column_keys.append((column, set(column_tokens), _stem("".join(column_tokens))))
+    referenced, terms, numbers = set(), set(), set()
+    for token in query_tokens:
+        if token.isdigit():
+            numbers.add(token)
+            continue
+        if token in NEGATIONS:
+            terms.add(token)
+            continue
+        matches = [column for column, column_tokens, compact in column_keys if _refers_to(token, column_tokens, compact)]
+        if matches:
+            referenced.update(str(column) for column in matches)
+        else:
+            terms.add(token)
+    return {"columns": sorted(referenced), "terms": sorted(terms), "numbers": sorted(numbers)}
+
+
+def _jaccard(a, b):
+    a, b = set(a), set(b)
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def similarity(features, other):
+    """
+    Score two questions about the same dataset between 0 and 1.
+
+    Column overlap carries most of the weight; the rest is the remaining wording,
+    numbers included. Questions that name no column at all are compared on their
+    wording alone, so two unrelated ones ("plot a correlation heatmap" / "how many
+    missing values") do not start from a full column match. The score only ranks
+    candidates and decides whether one is offered (see ``same_question`` for serving).
+    """
+    wording = set(features["terms"]) | set(features["numbers"])
+    other_wording = set(other["terms"]) | set(other["numbers"])
+    if not features["columns"] and not other["columns"]:
+        return _jaccard(wording, other_wording)
+    return COLUMN_WEIGHT * _jaccard(features["columns"], other["columns"]) + \
+        (1 - COLUMN_WEIGHT) * _jaccard(wording, other_wording)
+
+
+def same_question(features, other):
+    """
+    True when two questions ask the same thing, up to stopwords, synonyms and word forms.
+
+    Columns, remaining terms and numbers must all match: a single different filter word
+    ("male" / "female", "first" / "third", a negation) changes the answer.
+    """
+    return all(features[part] == other[part] for part in ("columns", "terms", "numbers"))
+
+
+class AnswerCache:
+    """
+    Local similarity index of finished analyses, keyed by dataset content hash.
+
+    Each stored run keeps the question, its column/term features, the final analyzer
+    message and the artifacts (charts, CSV/JSON outputs) it produced. Near-identical
+    questions on the same dataset ("survival by class" / "survived by pclass") can then be
+    answered without another model + sandbox run. Matching is purely lexical and
+    column-aware; no embedding service is involved. Only the same question is served
+    directly; similar ones are offered for the user to accept.
+
+    A follow-up ("now do the same for 2nd class") only makes sense in its chat, so it is
+    stored and looked up under that chat (``context``); a chat's first question is
+    shared by all chats on the dataset.
+    """
+
+    def __init__(self, cache=None):
+        self._cache = cache if cache is not None else DiskCache(
+            ANSWER_CACHE_FILE,
+            max_entries=ANSWER_CACHE_MAX_ENTRIES,
+            max_bytes=ANSWER_CACHE_MAX_BYTES
+        )
+        self.served = 0
+        self.offered = 0
+        self.misses = 0
+
+    def find(self, dataset_hash, query, columns, context=None):
+        """
+        Find the closest earlier answer for a question on the same dataset.
+
+        Args:
+            dataset_hash: Content hash of the dataset
+            query: User's question
+            columns: Dataset column names
+            context: Chat id when the question is a follow-up in that chat, else None
+
+        Returns:
+            Dict with ``score``, ``action`` ("serve" for the same question, else "offer")
+            and the stored ``query``, ``final_message`` and ``artifacts``; None when
+            nothing is close enough
+        """
+        features = query_features(query, columns)
+        best, best_key, best_same = (False, 0.0), None, False
+        for index_key, entry in self._cache.items(f"index:{dataset_hash}:"):
+            if entry.get("context") != context:
+                continue
+            same = same_question(features, entry["features"])
+            rank = (same, similarity(features, entry["features"]))
+            if rank > best:
+                best, best_key, best_same = rank, index_key, same
+        best_score = best[1]
+        if best_key is None or best_score < ANSWER_CACHE_OFFER_THRESHOLD:
+            self.misses += 1
+            return None
+
+        answer_key = "answer:" + best_key[len("index:"):]
+        answer = self._cache.get(answer_key)
+        if answer is None:
+            # The answer was evicted before its index entry.
+            self._cache.delete(best_key)
+            self.misses += 1
+            return None
+        # Keep the index entry as fresh as the answer it points to.
+        self._cache.get(best_key)
+
+        action = "serve" if best_same else "offer"
+        if action == "serve":
+            self.served += 1
+        else:
+            self.offered += 1
+        return dict(answer, score=best_score, action=action)
+
+    def store(self, dataset_hash, query, columns, final_message, artifact_paths, context=None):
+        """
+        Remember a finished analysis.
+
+        Args:
+            dataset_hash: Content hash of the dataset
+            query: User's question
+            columns: Dataset column names
+            final_message: Final analyzer message shown to the user
+            artifact_paths: Files the run produced; only charts and CSV/JSON outputs are kept
+            context: Chat id when the question was a follow-up in that chat, else None
+
+        Returns:
+            True if stored, False if the artifacts were too large to keep
+        """
+        artifacts = {}
+        total = 0
+        for path in artifact_paths:
+            name = os.path.basename(path)
+            if os.path.splitext(name)[1].lower() not in ARTIFACT_EXTENSIONS or not os.path.isfile(path):
+                continue
+            total += os.path.getsize(path)
+            if total > ANSWER_CACHE_MAX_ARTIFACT_BYTES:
+                return False
+            with open(path, "rb") as f:
+                artifacts[name] = base64.b64encode(f.read()).decode("ascii")
+
+        normalized_query = " ".join(_tokens(query))
+        if context is not None:
+            normalized_query = f"{context}\0{normalized_query}"
+        entry_id = f"{dataset_hash}:{hashlib.sha256(normalized_query.encode('utf-8')).hexdigest()[:16]}"
+        self._cache.set(f"answer:{entry_id}", {
+            "query": query,
+            "final_message": final_message,
+            "artifacts": artifacts,
+            "created_at": time.time(),
+        })
+        self._cache.set(f"index:{entry_id}", {"query": query, "features": query_features(query, columns),
+                                              "context": context})
+        return True
+
+    def stats(self):
+        """Return the number of stored answers plus this process's served/offered/missed lookups."""
+        lookups = self.served + self.offered + self.misses
+        return {
+            "answers": len(self._cache.items("index:")),
+            "served": self.served,
+            "offered": self.offered,
+            "misses": self.misses,
+            "reuse_rate": (self.served + self.offered) / lookups if lookups else 0.0,
+        }
+
+
+def restore_artifacts(answer, target_dir):
+    """
+    Write a cached answer's artifacts into ``target_dir``.
+
+    Returns:
+        Names of the restored files
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    names = []
+    for name, content in answer["artifacts"].items():
+        path = os.path.join(target_dir, name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(base64.b64decode(content))
+        os.replace(tmp_path, path)
+        names.append(name)
+    return names
+
+
+def get_answer_cache():
+    """
+    Return the process-wide answer cache.
+
+    Returns:
+        AnswerCache backed by a size-bounded DiskCache
+    """
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = AnswerCache()
+        return _answer_cache
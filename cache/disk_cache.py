@@ -0,0 +1,130 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class DiskCache:
+    """
+    Small persistent key/value cache backed by SQLite with LRU eviction and a TTL.
+
+    Values must be JSON-serializable. The database is safe to share between threads and
+    between processes (WAL mode), so every Streamlit session and replica on a host can
+    reuse the same entries. Hit/miss counters are kept per process.
+    """
+
+    def __init__(self, path, max_entries=1000, ttl_seconds=None, max_bytes=None):
+        """
+        Args:
+            path: SQLite file to store entries in
+            max_entries: Least recently used entries beyond this count are evicted
+            ttl_seconds: Entries older than this are treated as missing (None = never expire)
+            max_bytes: Optional bound on the total size of stored values
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key, default=None):
+        """Return the cached value for ``key`` (refreshing its LRU position) or ``default``."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl_seconds is not None and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return default
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """Store ``value`` under ``key`` and evict entries beyond the configured bounds."""
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def keys(self):
+        """Return all live keys, most recently used first."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM entries ORDER BY accessed_at DESC").fetchall()
+        return [row[0] for row in rows]
+
+    def items(self, prefix=""):
+        """
+        Return live ``(key, value)`` pairs whose key starts with ``prefix``.
+
+        Used for scans such as similarity lookups; does not touch LRU order or the hit/miss counters.
+        """
+        pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value, created_at FROM entries WHERE key LIKE ? ESCAPE '\\'", (pattern,)
+            ).fetchall()
+        now = time.time()
+        return [
+            (key, json.loads(value)) for key, value, created_at in rows
+            if self.ttl_seconds is None or now - created_at <= self.ttl_seconds
+        ]
+
+    def stats(self):
+        """Return entry count, stored bytes and this process's hit/miss counters."""
+        with self._lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _evict(self):
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        if self.max_bytes is not None:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                # Walk from the least recently used entry, dropping until the total fits again.
+                for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    total -= size
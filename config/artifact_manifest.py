@@ -0,0 +1,184 @@
+import json
+import os
+import uuid
+from dataclasses import dataclass, field
+from typing import List
+
+from autogen_core.code_executor import CodeBlock, CodeExecutor, CodeResult
+
+from sessions.workspaces import in_work_subdir
+
+TRACKER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifact_tracker.py")
+# Where plain Docker runs leave their manifest in the work dir (hidden, so never reported itself)
+MANIFEST_DIR_NAME = ".manifests"
+PYTHON_LANGUAGES = {"python", "py", "python3"}
+
+# Runs the block under the tracker in the sandbox; the block keeps its own line numbers
+# and a traceback does not show the wrapper frame.
+RUNNER_TEMPLATE = '''{filename_comment}{tracker_source}
+def _run_tracked(_code, _work_dir, _manifest_path):
+    import traceback as _traceback
+    os.chdir(_work_dir)
+    _root = os.getcwd()
+    start()
+    try:
+        exec(compile(_code, "<code_block>", "exec"), {{"__name__": "__main__"}})
+    except SystemExit:
+        raise
+    except BaseException:
+        _type, _value, _tb = sys.exc_info()
+        _traceback.print_exception(_type, _value, _tb.tb_next)
+        sys.exit(1)
+    finally:
+        write_manifest(_manifest_path, stop(_root))
+
+
+_run_tracked({code!r}, {work_dir!r}, {manifest_path!r})
+'''
+
+
+@dataclass
+class ManifestCodeResult(CodeResult):
+    """CodeResult that also lists the files the execution created or modified."""
+
+    artifacts: List[dict] = field(default_factory=list)
+
+
+def merge_manifests(*manifests):
+    """Combine manifests in order; a file written again keeps its first position and its latest entry."""
+    merged = {}
+    for manifest in manifests:
+        for entry in manifest or []:
+            merged[entry["name"]] = entry
+    return list(merged.values())
+
+
+def result_artifacts(result):
+    """Artifacts reported with an execution result, or None if the executor does not report any."""
+    return result.artifacts if isinstance(result, ManifestCodeResult) else None
+
+
+def reports_manifest(executor):
+    """Whether an executor declares (``reports_manifest = True``) that it returns ManifestCodeResults."""
+    return bool(getattr(executor, "reports_manifest", False))
+
+
+class ManifestCodeExecutor(CodeExecutor):
+    """
+    Command line executor wrapper (Docker or local) that reports the files each Python block writes.
+
+    Python blocks are wrapped so they run under the sandbox-side tracker
+    (config/artifact_tracker.py), which leaves a manifest in a hidden directory of the
+    work dir; the host reads and removes that one file instead of scanning the directory.
+    Shell blocks run unchanged and report nothing. With ``work_subdir`` every block runs
+    in that directory of the work dir (the chat's workspace, see sessions/workspaces.py).
+    """
+
+    reports_manifest = True
+
+    def __init__(self, docker, work_subdir=None):
+        """
+        Args:
+            docker: Started DockerCommandLineCodeExecutor whose work dir is mounted from the host
+                (a LocalCommandLineCodeExecutor works the same way)
+            work_subdir: Directory relative to the work dir that blocks run in
+        """
+        self._docker = docker
+        self._work_subdir = work_subdir
+        with open(TRACKER_FILE, encoding="utf-8") as f:
+            self._tracker_source = f.read()
+
+    @property
+    def docker(self):
+        """The wrapped Docker executor."""
+        return self._docker
+
+    async def execute_code_blocks(self, code_blocks, cancellation_token):
+        """
+        Execute code blocks and collect the manifest of every Python block.
+
+        Returns:
+            ManifestCodeResult with the combined output, the exit code of the last block run and the written files
+        """
+        outputs = []
+        artifacts = []
+        exit_code = 0
+        for code_block in code_blocks:
+            if code_block.language.lower() not in PYTHON_LANGUAGES:
+                result = await self._docker.execute_code_blocks([in_work_subdir(code_block, self._work_subdir)], cancellation_token)
+                outputs.append(result.output)
+                exit_code = result.exit_code
+            else:
+                manifest_name = f"{MANIFEST_DIR_NAME}/{uuid.uuid4().hex}.json"
+                result = await self._docker.execute_code_blocks([self._tracked_block(code_block, manifest_name)], cancellation_token)
+                outputs.append(result.output)
+                exit_code = result.exit_code
+                artifacts = merge_manifests(artifacts, self._read_manifest(manifest_name))
+            if exit_code != 0:
+                break
+        return ManifestCodeResult(exit_code=exit_code, output="".join(outputs), artifacts=artifacts)
+
+    async def start(self):
+        await self._docker.start()
+
+    async def stop(self):
+        await self._docker.stop()
+
+    async def restart(self):
+        await self._docker.restart()
+
+    def _tracked_block(self, code_block, manifest_name):
+        first_line = code_block.code.lstrip().split("\n", 1)[0]
+        # Keep a "# filename: ..." directive where the Docker executor looks for it.
+        filename_comment = f"{first_line}\n" if first_line.startswith("# filename:") else ""
+        code = RUNNER_TEMPLATE.format(
+            filename_comment=filename_comment,
+            tracker_source=self._tracker_source,
+            code=code_block.code,
+            work_dir=self._work_subdir or ".",
+            manifest_path=manifest_name,
+        )
+        return CodeBlock(code=code, language="python")
+
+    def _read_manifest(self, manifest_name):
+        path = os.path.join(str(self._docker.work_dir), self._work_subdir or "", manifest_name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            os.remove(path)
+            return manifest
+        except (OSError, ValueError):
+            # Killed before the manifest was written (timeout, cancellation)
+            return []
+
+
+class ManifestRecorder(CodeExecutor):
+    """Executor wrapper accumulating the artifact manifests of every execution in one analysis run."""
+
+    def __init__(self, executor):
+        self._executor = executor
+        self._artifacts = []
+
+    @property
+    def executor(self):
+        """The wrapped executor."""
+        return self._executor
+
+    @property
+    def artifacts(self):
+        """Files written during the run (latest entry per file), in the order they were first written."""
+        return list(self._artifacts)
+
+    async def execute_code_blocks(self, code_blocks, cancellation_token):
+        result = await self._executor.execute_code_blocks(code_blocks, cancellation_token)
+        self._artifacts = merge_manifests(self._artifacts, result_artifacts(result))
+        return result
+
+    async def start(self):
+        await self._executor.start()
+
+    async def stop(self):
+        await self._executor.stop()
+
+    async def restart(self):
+        await self._executor.restart()
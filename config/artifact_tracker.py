@@ -0,0 +1,93 @@
+"""
+Records the files a code block creates or modifies, from inside the sandbox.
+
+A Python audit hook sees every ``open`` (builtins, ``io`` and ``os.open``) and rename made
+by the interpreter, which covers pandas, matplotlib, PIL and friends. The resulting
+manifest lists exactly the files the block wrote, costs O(files written) and is not
+confused by other sessions writing into the same directory. Files written by child
+processes (e.g. ``pip``) are not seen.
+
+Only the standard library is used: config/kernel_server.py imports this file from its
+kernel directory, and ManifestCodeExecutor (config/artifact_manifest.py) inlines it in
+front of plain Docker runs.
+"""
+import hashlib
+import json
+import os
+import sys
+
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+HASH_CHUNK_BYTES = 1024 * 1024
+
+_written = None      # paths written while tracking, None when not tracking
+_installed = False
+
+
+def _audit(event, args):
+    if _written is None:
+        return
+    if event == "open":
+        path, mode, flags = args
+        if path is None or isinstance(path, int):
+            return
+        writes = any(c in mode for c in "wax+") if isinstance(mode, str) else bool(flags & WRITE_FLAGS)
+        if writes:
+            _written.add(os.path.abspath(os.fsdecode(path)))
+    elif event == "os.rename":
+        source, destination = os.fsdecode(args[0]), os.fsdecode(args[1])
+        _written.discard(os.path.abspath(source))
+        _written.add(os.path.abspath(destination))
+
+
+def start():
+    """Begin recording writes (installs the audit hook on first use; hooks cannot be removed)."""
+    global _written, _installed
+    if not _installed:
+        sys.addaudithook(_audit)
+        _installed = True
+    _written = set()
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stop(root):
+    """
+    Stop recording and describe the files written under ``root``.
+
+    Hidden paths (kernel and manifest bookkeeping such as ``.kernels/``) are left out.
+
+    Returns:
+        List of ``{"name", "size", "sha256", "mtime"}`` dicts, names relative to ``root``
+    """
+    global _written
+    written, _written = _written or set(), None
+    root = os.path.abspath(root)
+    manifest = []
+    for path in sorted(written):
+        name = os.path.relpath(path, root)
+        if name.startswith("..") or any(part.startswith(".") for part in name.split(os.sep)):
+            continue
+        try:
+            stat = os.stat(path)
+            if not os.path.isfile(path):
+                continue
+            manifest.append({"name": name, "size": stat.st_size, "sha256": _sha256(path), "mtime": stat.st_mtime})
+        except OSError:
+            # Created and deleted again within the block (temporary file)
+            continue
+    return manifest
+
+
+def write_manifest(path, manifest):
+    """Write a manifest atomically for the host to pick up."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
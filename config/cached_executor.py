@@ -0,0 +1,401 @@
+import ast
+import base64
+import builtins
+import hashlib
+import json
+import os
+import posixpath
+import threading
+from collections import OrderedDict
+
+from autogen_core.code_executor import CodeExecutor, CodeResult
+
+from cache.disk_cache import DiskCache
+from config.artifact_manifest import ManifestCodeResult, merge_manifests, reports_manifest, result_artifacts
+from config.constants import (
+    CACHE_DIR,
+    DATASET_MOUNT_DOCKER,
+    EXECUTION_CACHE_MAX_ENTRIES,
+    EXECUTION_CACHE_MAX_BYTES,
+    EXECUTION_CACHE_MAX_ARTIFACT_BYTES,
+)
+from data.dataset_store import DATASET_STORE_DIR
+from data.hashing import file_digest
+from telemetry.tracing import get_tracer
+
+EXECUTION_CACHE_FILE = os.path.join(CACHE_DIR, "executions.sqlite")
+# Bump when the key or entry layout changes so stale results are never replayed.
+EXECUTION_CACHE_VERSION = 1
+PYTHON_LANGUAGES = {"python", "py", "python3"}
+ARTIFACT_EXTENSIONS = {".png", ".jpg", ".jpeg", ".svg", ".csv", ".json"}
+# Names a kernel block may use without defining them itself (see config/kernel_server.py).
+KERNEL_PRELOADED_NAMES = {"df", "pd", "__name__"}
+# Calls whose first argument is a file the block writes rather than reads.
+WRITE_METHODS = {"savefig", "to_csv", "to_json", "to_excel", "to_parquet", "to_html", "write_image", "write_html"}
+
+# Kernel namespaces whose history is tracked across runs (a chat's kernel outlives each run)
+MAX_TRACKED_NAMESPACES = 256
+
+_execution_cache = None
+_execution_cache_lock = threading.Lock()
+_namespaces = OrderedDict()     # kernel namespace id -> _Namespace
+_namespaces_lock = threading.Lock()
+
+
+def get_execution_cache():
+    """
+    Return the process-wide, disk-backed cache of code execution results.
+
+    Returns:
+        DiskCache bounded by entry count and total stored bytes
+    """
+    global _execution_cache
+    with _execution_cache_lock:
+        if _execution_cache is None:
+            _execution_cache = DiskCache(
+                EXECUTION_CACHE_FILE,
+                max_entries=EXECUTION_CACHE_MAX_ENTRIES,
+                max_bytes=EXECUTION_CACHE_MAX_BYTES
+            )
+        return _execution_cache
+
+
+def normalize_code(code):
+    """
+    Canonical form of a Python block: formatting and comments do not change the key.
+
+    Falls back to the stripped source when the block does not parse.
+    """
+    try:
+        return ast.dump(ast.parse(code))
+    except SyntaxError:
+        return "\n".join(line.rstrip() for line in code.strip().splitlines())
+
+
+def _bound_and_free_names(tree):
+    """Names a block binds and names it reads without binding (flat, scope-insensitive)."""
+    bound, loaded = set(), set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            (loaded if isinstance(node.ctx, ast.Load) else bound).add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.alias):
+            bound.add((node.asname or node.name).split(".")[0])
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            bound.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            bound.update(node.names)
+    return bound, loaded - bound - set(dir(builtins))
+
+
+def _written_paths(tree):
+    """String paths a block writes to (``plt.savefig('x.png')``, ``open('x.json', 'w')``, ...)."""
+    written = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call) or not node.args:
+            continue
+        target = node.args[0]
+        if not (isinstance(target, ast.Constant) and isinstance(target.value, str)):
+            continue
+        if isinstance(node.func, ast.Attribute) and node.func.attr in WRITE_METHODS:
+            written.add(target.value)
+        elif isinstance(node.func, ast.Name) and node.func.id == "open":
+            mode = node.args[1] if len(node.args) > 1 else next(
+                (k.value for k in node.keywords if k.arg == "mode"), None)
+            if isinstance(mode, ast.Constant) and isinstance(mode.value, str) and set(mode.value) & set("wax"):
+                written.add(target.value)
+    return written
+
+
+class _Namespace:
+    """What has run in one interpreter namespace, as far as the cache knows."""
+
+    def __init__(self, tainted=False):
+        self.history = []        # normalized blocks run (or replayed) in the namespace
+        self.bound = set()       # names defined by those blocks
+        self.pending = []        # cache hits not yet replayed into the kernel
+        self.tainted = tainted   # a block depended on state we cannot see; stop caching
+
+
+def _tracked_namespace(namespace_id, launched):
+    """
+    Shared state of a kernel namespace, created on first use.
+
+    A namespace first seen here that this process did not launch (``launched`` is False,
+    e.g. a kernel left running by an earlier app process) holds unknown state, so its
+    blocks are never cached.
+    """
+    with _namespaces_lock:
+        namespace = _namespaces.get(namespace_id)
+        if namespace is None:
+            namespace = _namespaces[namespace_id] = _Namespace(tainted=not launched)
+            while len(_namespaces) > MAX_TRACKED_NAMESPACES:
+                _namespaces.popitem(last=False)
+        _namespaces.move_to_end(namespace_id)
+        return namespace
+
+
+class CachingCodeExecutor(CodeExecutor):
+    """
+    Code executor wrapper that replays stored results for code it has already run.
+
+    Python blocks are keyed on their normalized source plus the content hashes of the
+    files they read (string literals resolving to files in the work dir or the dataset
+    store, and the dataset preloaded into a kernel). On a hit the stored output, exit
+    code and the artifacts the block wrote (PNG/CSV/JSON, ...) are restored without
+    touching the sandbox. Only successful runs are stored, so code re-sent after a
+    ``pip install`` fix still executes. Shell blocks always run. When the wrapped
+    executor reports artifact manifests (its ``reports_manifest``, see
+    config/artifact_manifest.py) they decide what is stored, and restored files are
+    reported the same way, even when every block of a run is a hit; otherwise the work
+    dir is compared before and after the run.
+
+    For a stateful kernel a block's result also depends on what ran before it in the
+    namespace. Such a block is only cached when every name it reads is defined by the
+    blocks before it in the namespace (or preloaded by the kernel), and its key includes
+    those earlier blocks. The kernel outlives a run, so this history is kept per kernel
+    namespace (``namespace_id`` of the wrapped executor) across runs: a follow-up turn
+    after ``df = df[df.age > 30]`` does not get the key of the same code on the
+    preloaded ``df``. Blocks served from the cache are replayed into the kernel before the
+    next block that actually has to execute, so the namespace matches what the
+    analyzer expects.
+    """
+
+    def __init__(self, executor, work_dir, stateful=False, dataset_file=None, cache=None):
+        """
+        Args:
+            executor: Executor that actually runs the code (Docker or kernel)
+            work_dir: Host path of the sandbox work dir, where blocks write their artifacts
+            stateful: True when ``executor`` keeps variables between blocks
+            dataset_file: Dataset path (as seen from the sandbox) that a kernel preloads
+            cache: Cache to use instead of the shared ``get_execution_cache()``
+        """
+        self._executor = executor
+        self._work_dir = str(work_dir)
+        self._stateful = stateful
+        self._dataset_file = dataset_file
+        self._cache = cache if cache is not None else get_execution_cache()
+        self._own_namespace = _Namespace()    # used when the executor does not identify its namespace
+        self._reports_manifest = reports_manifest(executor)
+
+    @property
+    def executor(self):
+        """The wrapped executor."""
+        return self._executor
+
+    @property
+    def reports_manifest(self):
+        """Results list the written (or restored) files whenever the wrapped executor's do."""
+        return self._reports_manifest
+
+    async def execute_code_blocks(self, code_blocks, cancellation_token):
+        """
+        Execute code blocks, serving Python blocks from the cache where possible.
+
+        Args:
+            code_blocks: Blocks extracted from the analyzer's message
+            cancellation_token: Token used to abort a running block
+
+        Returns:
+            CodeResult with the combined output and the exit code of the last block run
+            (a ManifestCodeResult when the wrapped executor reports artifacts)
+        """
+        outputs = []
+        artifacts = []
+        exit_code = 0
+        for code_block in code_blocks:
+            output, exit_code, written = await self._execute_block(code_block, cancellation_token)
+            outputs.append(output)
+            artifacts = merge_manifests(artifacts, written)
+            if exit_code != 0:
+                break
+        if self._reports_manifest:
+            return ManifestCodeResult(exit_code=exit_code, output="".join(outputs), artifacts=artifacts)
+        return CodeResult(exit_code=exit_code, output="".join(outputs))
+
+    async def start(self):
+        await self._executor.start()
+
+    async def stop(self):
+        await self._executor.stop()
+
+    async def restart(self):
+        # A restarted kernel reports a new namespace id
+        self._own_namespace = _Namespace()
+        await self._executor.restart()
+
+    @property
+    def _namespace(self):
+        namespace_id = getattr(self._executor, "namespace_id", None) if self._stateful else None
+        if namespace_id is None:
+            return self._own_namespace
+        return _tracked_namespace(namespace_id, getattr(self._executor, "launched_namespace", None) == namespace_id)
+
+    async def _execute_block(self, code_block, cancellation_token):
+        with get_tracer().span("execution.block", language=code_block.language.lower(), cache_hit=False) as span:
+            output, exit_code, artifacts = await self._execute_traced_block(code_block, cancellation_token, span)
+            span.set(exit_code=exit_code, artifacts=len(artifacts or []))
+        return output, exit_code, artifacts
+
+    async def _execute_traced_block(self, code_block, cancellation_token, span):
+        if code_block.language.lower() not in PYTHON_LANGUAGES:
+            return await self._run([code_block], cancellation_token)
+
+        key = self._cache_key(code_block.code)
+        span.set(cacheable=key is not None)
+        if key is not None:
+            entry = self._cache.get(key)
+            if entry is not None and self._restore_artifacts(entry["artifacts"]):
+                self._record(code_block)
+                if self._stateful:
+                    self._namespace.pending.append(code_block)
+                span.set(cache_hit=True)
+                return entry["output"], entry["exit_code"], self._restored_manifest(entry["artifacts"])
+
+        # The directory is only compared when the executor cannot say what it wrote.
+        before = self._snapshot() if not self._reports_manifest else None
+        output, exit_code, written = await self._run([code_block], cancellation_token)
+        if self._stateful:
+            if key is None:
+                self._namespace.tainted = True
+            else:
+                self._record(code_block)
+        if key is not None and exit_code == 0:
+            if written is not None:
+                artifacts = self._read_artifacts([entry["name"] for entry in written])
+            else:
+                artifacts = self._collect_artifacts(before)
+            if artifacts is not None:
+                self._cache.set(key, {"output": output, "exit_code": exit_code, "artifacts": artifacts})
+        return output, exit_code, written
+
+    async def _run(self, code_blocks, cancellation_token):
+        namespace = self._namespace
+        if namespace.pending:
+            # Rebuild the namespace the skipped blocks would have left behind.
+            pending, namespace.pending = namespace.pending, []
+            result = await self._executor.execute_code_blocks(pending, cancellation_token)
+            if result.exit_code != 0:
+                namespace.tainted = True
+        result = await self._executor.execute_code_blocks(code_blocks, cancellation_token)
+        return result.output, result.exit_code, result_artifacts(result)
+
+    def _record(self, code_block):
+        namespace = self._namespace
+        namespace.history.append(normalize_code(code_block.code))
+        try:
+            namespace.bound |= _bound_and_free_names(ast.parse(code_block.code))[0]
+        except SyntaxError:
+            pass
+
+    def _cache_key(self, code):
+        """Key for a Python block, or None when its result cannot be safely reused."""
+        namespace = self._namespace
+        if namespace.tainted:
+            return None
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return None
+        if self._stateful:
+            free = _bound_and_free_names(tree)[1] - namespace.bound - KERNEL_PRELOADED_NAMES
+            if free:
+                return None
+
+        inputs = {}
+        # Outputs are left out so a chart overwritten by the previous run does not change the key.
+        written = _written_paths(tree)
+        paths = [node.value for node in ast.walk(tree)
+                 if isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value not in written]
+        if self._stateful and self._dataset_file:
+            paths.append(self._dataset_file)
+        for path in paths:
+            host_path = self._host_path(path)
+            if host_path is not None:
+                inputs[path] = file_digest(host_path)
+
+        material = {
+            "version": EXECUTION_CACHE_VERSION,
+            "stateful": self._stateful,
+            # Everything that ran in the namespace before, across runs: a rebound ``df`` changes the key
+            "history": namespace.history if self._stateful else [],
+            "code": ast.dump(tree),
+            "inputs": inputs,
+        }
+        return hashlib.sha256(json.dumps(material, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _host_path(self, path):
+        """Map a path as written in sandbox code to an existing host file, if any."""
+        if len(path) > 4096 or "\n" in path:
+            return None
+        if path.startswith(DATASET_MOUNT_DOCKER + "/"):
+            host_path = os.path.join(DATASET_STORE_DIR, posixpath.basename(path))
+        elif os.path.isabs(path):
+            return None
+        else:
+            host_path = os.path.join(self._work_dir, path)
+        return host_path if os.path.isfile(host_path) else None
+
+    def _snapshot(self):
+        snapshot = {}
+        try:
+            entries = list(os.scandir(self._work_dir))
+        except OSError:
+            return snapshot
+        for entry in entries:
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in ARTIFACT_EXTENSIONS:
+                stat = entry.stat()
+                snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def _collect_artifacts(self, before):
+        """Artifacts written since ``before`` as {name: base64}, or None if they are too large to keep."""
+        return self._read_artifacts([name for name, signature in self._snapshot().items() if before.get(name) != signature])
+
+    def _read_artifacts(self, names):
+        """Read files of the work dir as {name: base64}, or None if they are too large to keep."""
+        artifacts = {}
+        total = 0
+        for name in names:
+            path = os.path.join(self._work_dir, name)
+            try:
+                total += os.path.getsize(path)
+                if total > EXECUTION_CACHE_MAX_ARTIFACT_BYTES:
+                    return None
+                with open(path, "rb") as f:
+                    artifacts[name] = base64.b64encode(f.read()).decode("ascii")
+            except OSError:
+                return None
+        return artifacts
+
+    def _restored_manifest(self, artifacts):
+        """Manifest entries for artifacts restored from the cache (None if the executor reports none)."""
+        if not self._reports_manifest:
+            return None
+        manifest = []
+        for name, content in artifacts.items():
+            data = base64.b64decode(content)
+            manifest.append({
+                "name": name,
+                "size": len(data),
+                "sha256": hashlib.sha256(data).hexdigest(),
+                "mtime": os.path.getmtime(os.path.join(self._work_dir, name)),
+            })
+        return manifest
+
+    def _restore_artifacts(self, artifacts):
+        """Write cached artifacts back into the work dir; False if that failed (run the code instead)."""
+        try:
+            os.makedirs(self._work_dir, exist_ok=True)
+            for name, content in artifacts.items():
+                path = os.path.join(self._work_dir, name)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(base64.b64decode(content))
+                os.replace(tmp_path, path)
+        except OSError:
+            return False
+        return True
@@ -1,3 +1,121 @@
 TIMEOUT_DOCKER=300
 WORK_DIR_DOCKER='temp'
+# Where the content-addressed dataset store is mounted (read-only) inside the sandbox
+DATASET_MOUNT_DOCKER='/datasets'
+IMAGE_DOCKER='analyzer-gpt-enhanced:latest'
+# Keep a long-lived kernel per chat with the dataset preloaded as `df`
+STATEFUL_KERNEL_DOCKER=True
 MODEL_GEMINI = 'gemini-2.5-pro'
+# Where recorded model traffic (cassettes) is kept, see models/record_replay_client.py
+MODEL_CASSETTE_DIR='.cache/cassettes'
+# Stream the analyzer's reply token by token to the UI and CLI
+STREAM_MODEL_OUTPUT=True
+
+# Bounded analyzer context: older turns are summarized once the prompt passes the budget
+COMPACT_MODEL_CONTEXT=True
+CONTEXT_TOKEN_BUDGET=12_000
+CONTEXT_RECENT_MESSAGES=6
+CONTEXT_SUMMARY_MAX_TOKENS=800
+CONTEXT_OUTPUT_MAX_CHARS=6_000
+
+# Warm container pool
+POOL_MIN_SIZE_DOCKER=1
+POOL_MAX_SIZE_DOCKER=4
+POOL_MAX_IDLE_DOCKER=600
+POOL_HEALTH_CHECK_INTERVAL_DOCKER=30
+
+# Per-chat work directories under WORK_DIR_DOCKER (see sessions/workspaces.py)
+WORKSPACE_QUOTA_BYTES=512 * 1024 * 1024
+# Disk budget of all workspaces together; least recently used ones are removed beyond it
+WORKSPACE_MAX_TOTAL_BYTES=10 * 1024 * 1024 * 1024
+# Collection frees space down to this fraction of the budget
+WORKSPACE_GC_TARGET_RATIO=0.8
+WORKSPACE_GC_INTERVAL=60
+
+# Local caches (profiles, results, ...) kept outside the sandbox work dir
+CACHE_DIR='.cache'
+
+# Durable chat storage shared by app replicas: <backend>://<location> (see sessions/session_store.py)
+SESSION_STORE_URL='sqlite:///.cache/sessions.sqlite'
+SESSION_STORE_COMPRESSION_LEVEL=6
+# Chat state kept in memory (see sessions/memory_budget.py); least recently viewed chats are released beyond it
+SESSION_MEMORY_BUDGET_BYTES=256 * 1024 * 1024
+PROCESS_MEMORY_BUDGET_BYTES=2 * 1024 * 1024 * 1024
+# Browser sessions without a run for this long no longer count against the process budget
+SESSION_MEMORY_IDLE_SECONDS=3600
+
+# CSV previews kept in memory by content hash (see data/csv_reader.py)
+CSV_CACHE_MAX_BYTES=512 * 1024 * 1024
+
+# Dataset profiler
+PROFILE_CHUNK_CELLS=5_000_000
+PROFILE_TOP_VALUES=5
+
+# One-time Parquet conversion of uploads
+COLUMNAR_WORKERS=2
+COLUMNAR_WAIT_SECONDS=30
+
+# Export ZIPs, built once per set of chat files (see data/session_files.py)
+EXPORT_WORKERS=2
+EXPORT_CSV_CHUNK_ROWS=50_000
+EXPORT_CACHE_MAX_BYTES=1024 * 1024 * 1024
+
+# Chart images served by reference from the static image cache (see data/image_cache.py)
+IMAGE_THUMBNAIL_MAX_PX=800
+IMAGE_CACHE_MAX_BYTES=512 * 1024 * 1024
+
+# Result tables kept on disk as Parquet and shown a page at a time (see data/result_tables.py)
+RESULT_TABLE_PAGE_ROWS=100
+RESULT_TABLE_ROW_GROUP_ROWS=10_000
+# Bound for tables no stored chat references any more; referenced tables are always kept
+RESULT_TABLE_CACHE_MAX_BYTES=2 * 1024 * 1024 * 1024
+# Tables younger than this are kept too (their analysis may not be saved yet)
+RESULT_TABLE_PRUNE_GRACE_SECONDS=3600
+# Replicas sharing a session store must share this directory too ($RESULT_TABLE_DIR overrides it)
+RESULT_TABLE_DIR='.cache/tables'
+
+# In-process SQL engine for aggregate/filter questions (see data/sql_engine.py):
+# "duckdb", "sqlite", "auto" (DuckDB when installed, else sqlite3) or None to disable
+SQL_ENGINE='auto'
+SQL_TIMEOUT_SECONDS=30
+# DuckDB only; SQLite keeps its small page cache
+SQL_MEMORY_LIMIT='2GB'
+SQL_BATCH_ROWS=100_000
+# Result rows shown to the analyzer, and plotted at most by a chart directive
+SQL_PREVIEW_ROWS=20
+SQL_CHART_MAX_ROWS=1_000
+
+# Query suggestion cache
+SUGGESTION_CACHE_MAX_ENTRIES=2000
+SUGGESTION_CACHE_TTL=7 * 24 * 3600
+
+# Code execution result cache
+EXECUTION_CACHE_MAX_ENTRIES=5000
+EXECUTION_CACHE_MAX_BYTES=512 * 1024 * 1024
+EXECUTION_CACHE_MAX_ARTIFACT_BYTES=32 * 1024 * 1024
+
+# Answer cache for near-identical questions on the same dataset
+ANSWER_CACHE_MAX_ENTRIES=4000
+ANSWER_CACHE_MAX_BYTES=256 * 1024 * 1024
+ANSWER_CACHE_MAX_ARTIFACT_BYTES=16 * 1024 * 1024
+# Similarity above which a previous answer is offered (only the same question is served directly)
+ANSWER_CACHE_OFFER_THRESHOLD=0.6
+
+# Background analysis jobs
+JOB_MAX_CONCURRENT=4
+JOB_HISTORY_LIMIT=200
+# Seconds between UI polls of a running job (also how often streamed text is redrawn)
+JOB_POLL_INTERVAL=0.5
+
+# Tracing and metrics
+TRACE_DIR='.cache/traces'
+TRACE_FILE_MAX_BYTES=50 * 1024 * 1024
+# Recent runs kept in memory for the "Run stats" panel
+TRACE_HISTORY_LIMIT=100
+# Recent traces of work outside any run (pool warm-up, container resets and spawns)
+TRACE_BACKGROUND_HISTORY_LIMIT=50
+TRACE_LATENCY_BUCKETS=(0.005, 0.025, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Port of the Prometheus text endpoint (/metrics); 0 disables it
+METRICS_PORT=9464
+# Interface the endpoint binds; set "0.0.0.0" to let other hosts scrape it
+METRICS_HOST='127.0.0.1'
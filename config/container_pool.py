@@ -0,0 +1,402 @@
+import asyncio
+import atexit
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from autogen_core import CancellationToken
+from autogen_core.code_executor import CodeBlock
+
+from config.constants import (
+    POOL_MIN_SIZE_DOCKER,
+    POOL_MAX_SIZE_DOCKER,
+    POOL_MAX_IDLE_DOCKER,
+    POOL_HEALTH_CHECK_INTERVAL_DOCKER,
+    WORK_DIR_DOCKER,
+)
+from config.docker_utils import getDockerCommandLineExecutor, start_docker_container, stop_docker_container
+from config.kernel_executor import KERNEL_DIR_NAME
+from telemetry.tracing import get_tracer
+
+# Private work dirs of containers leased without a workspace, one per container
+SCRATCH_DIR = os.path.join(WORK_DIR_DOCKER, ".scratch")
+# Mount of containers with a private scratch work dir and the whole dataset store
+SCRATCH_MOUNT = (None, None)
+
+# Clears container-local scratch space left behind by the previous lease and
+# doubles as a liveness probe for the interpreter inside the container. A mounted
+# workspace is not touched: the container only ever serves that workspace's chat.
+RESET_BLOCK = CodeBlock(code="rm -rf /tmp/* 2>/dev/null; python -c 'pass'", language="sh")
+# The same for a container with a private scratch work dir, which is emptied as well
+# (except the kernel state kept for the next lease with the same affinity).
+RESET_SCRATCH_BLOCK = CodeBlock(
+    code=f"find . -mindepth 1 -maxdepth 1 ! -name {KERNEL_DIR_NAME} -exec rm -rf {{}} + 2>/dev/null; "
+         "rm -rf /tmp/* 2>/dev/null; python -c 'pass'",
+    language="sh",
+)
+
+
+def _mount_key(work_dir, datasets):
+    """
+    What a container has mounted: its work dir (by inode, so a workspace removed and
+    created again is a different mount) and the dataset files.
+    """
+    if work_dir is None and datasets is None:
+        return SCRATCH_MOUNT
+    directory = None
+    if work_dir is not None:
+        stat = os.stat(work_dir)
+        directory = (os.path.abspath(work_dir), stat.st_dev, stat.st_ino)
+    return directory, None if datasets is None else tuple(sorted(os.path.abspath(path) for path in datasets))
+
+
+class ContainerPool:
+    """
+    Keeps a number of started Docker code executors warm and leases them out per analysis run.
+
+    All pool state is owned by a private event loop running on a daemon thread, so
+    executors can be leased from any caller loop (every Streamlit rerun and every
+    ``asyncio.run`` in the CLI creates a fresh one) without containers being torn
+    down when that caller loop closes.
+
+    A container's mounts are fixed when it starts, so a lease for a workspace (a chat's
+    directory, see sessions/workspaces.py) only gets a container started with that
+    workspace as its work dir and nothing else of the host's but the run's dataset files,
+    read-only. Code in one chat therefore cannot see another chat's files. Such containers
+    stay idle for their chat's next run (and its kernel); when the pool is full, the
+    least recently used idle container of another workspace is stopped to make room.
+    The ``min_size`` warm containers have a private scratch work dir that is emptied
+    whenever they are returned; they serve leases without a workspace.
+    """
+
+    def __init__(self, min_size=POOL_MIN_SIZE_DOCKER, max_size=POOL_MAX_SIZE_DOCKER,
+                 max_idle=POOL_MAX_IDLE_DOCKER, health_check_interval=POOL_HEALTH_CHECK_INTERVAL_DOCKER):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.health_check_interval = health_check_interval
+
+        self._idle = []        # list of (executor, last_used) pairs, most recently used last
+        self._leased = set()
+        self._affinity = {}    # executor -> affinity key of its last lease (e.g. the chat whose kernel it hosts)
+        self._mounts = {}      # executor -> mount key (see ``_mount_key``)
+        self._starting = 0
+        self._checking = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._loop = None
+        self._thread = None
+        self._available = None
+        self._maintenance_task = None
+        self._start_lock = threading.Lock()
+
+    # --- Lifecycle ---
+    def start(self):
+        """Start the pool loop thread and begin warming ``min_size`` containers in the background."""
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="container-pool", daemon=True)
+            self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._init_on_loop(), self._loop).result()
+
+    def shutdown(self):
+        """Stop every pooled container and the pool loop. Safe to call more than once."""
+        if self._loop is None or self._closed:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown_on_loop(), self._loop).result()
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+    # --- Leasing ---
+    async def acquire(self, affinity=None, work_dir=None, datasets=None):
+        """
+        Lease a started executor, waiting for one to become free if the pool is at ``max_size``.
+
+        Args:
+            affinity: Optional key (e.g. chat id); an idle executor last released with the
+                same key is preferred so in-container state such as a kernel can be reused
+            work_dir: Host directory mounted as the container's work dir (a chat's workspace);
+                only a container started with this mount is leased. None leases one with a
+                private scratch work dir
+            datasets: Dataset store files mounted read-only (the run's dataset); None mounts
+                the whole store
+
+        Returns:
+            A started DockerCommandLineCodeExecutor owned by the caller until released
+        """
+        mount = _mount_key(work_dir, datasets)
+        with get_tracer().span("container.acquire", affinity=affinity is not None,
+                               workspace=work_dir is not None) as span:
+            docker = await self._call(self._acquire_on_loop(affinity, mount, work_dir, datasets))
+            span.set(reused_affinity=affinity is not None and self._affinity.get(docker) == affinity)
+        return docker
+
+    async def release(self, docker, discard=False, affinity=None):
+        """
+        Return a leased executor to the pool.
+
+        Args:
+            docker: Executor previously returned by ``acquire``
+            discard: Stop the container instead of returning it (e.g. after a fatal error)
+            affinity: Key to remember for the next ``acquire`` with the same affinity
+        """
+        with get_tracer().span("container.release", discard=discard):
+            await self._call(self._release_on_loop(docker, discard, affinity))
+
+    @asynccontextmanager
+    async def lease(self, affinity=None, work_dir=None, datasets=None):
+        """Async context manager wrapping ``acquire``/``release``."""
+        docker = await self.acquire(affinity, work_dir, datasets)
+        try:
+            yield docker
+        finally:
+            await self.release(docker, affinity=affinity)
+
+    def stats(self):
+        """Return a snapshot of the pool occupancy."""
+        return {
+            "idle": len(self._idle),
+            "leased": len(self._leased),
+            "starting": self._starting,
+            "checking": self._checking,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+        }
+
+    # --- Internals (run on the pool loop) ---
+    async def _call(self, coro):
+        if self._loop is None:
+            self.start()
+        if self._closed:
+            coro.close()
+            raise RuntimeError("Container pool has been shut down")
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    def _size(self):
+        return len(self._idle) + len(self._leased) + self._starting + self._checking
+
+    async def _init_on_loop(self):
+        self._available = asyncio.Condition()
+        for _ in range(self.min_size):
+            asyncio.ensure_future(self._spawn())
+        self._maintenance_task = asyncio.ensure_future(self._maintenance())
+
+    def _new_executor(self, work_dir=None, datasets=None):
+        if work_dir is None:
+            work_dir = os.path.join(SCRATCH_DIR, uuid.uuid4().hex)
+        return getDockerCommandLineExecutor(work_dir=work_dir, datasets=datasets,
+                                            stop_container=False, delete_tmp_files=True)
+
+    async def _stop(self, docker):
+        """Stop a container the pool no longer tracks, removing its scratch work dir."""
+        self._affinity.pop(docker, None)
+        mount = self._mounts.pop(docker, None)
+        await stop_docker_container(docker)
+        if mount == SCRATCH_MOUNT:
+            shutil.rmtree(docker.work_dir, ignore_errors=True)
+
+    async def _spawn(self):
+        """Start one container with a scratch work dir and park it in the idle list."""
+        self._starting += 1
+        docker = None
+        try:
+            docker = self._new_executor()
+            self._mounts[docker] = SCRATCH_MOUNT
+            await start_docker_container(docker)
+        except Exception as e:
+            print(f"Container pool: failed to start container: {e}")
+            if docker is not None:
+                self._mounts.pop(docker, None)
+            docker = None
+        finally:
+            self._starting -= 1
+
+        async with self._available:
+            if docker is not None:
+                if self._closed:
+                    await self._stop(docker)
+                else:
+                    self._idle.append((docker, time.monotonic()))
+            self._available.notify_all()
+        return docker
+
+    def _pick_idle(self, mount, affinity):
+        """
+        Pop the best idle executor with this mount: same affinity first, then one nobody
+        claims, then the most recent. None if no idle executor has the mount.
+        """
+        candidates = [i for i, (docker, _) in enumerate(self._idle) if self._mounts.get(docker) == mount]
+        if not candidates:
+            return None
+        index = candidates[-1]
+        unclaimed = None
+        for i in reversed(candidates):
+            key = self._affinity.get(self._idle[i][0])
+            if affinity is not None and key == affinity:
+                index = i
+                break
+            if key is None and unclaimed is None:
+                unclaimed = i
+        else:
+            if unclaimed is not None:
+                index = unclaimed
+        docker, _ = self._idle.pop(index)
+        return docker
+
+    async def _acquire_on_loop(self, affinity, mount, work_dir, datasets):
+        victim = None
+        async with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Container pool has been shut down")
+                docker = self._pick_idle(mount, affinity)
+                if docker is not None:
+                    self._leased.add(docker)
+                    return docker
+                # Warm containers on their way only serve scratch leases; a workspace needs its own.
+                covered = mount == SCRATCH_MOUNT and self._starting + self._checking > self._waiting
+                if not covered and self._size() < self.max_size:
+                    break
+                if not covered and self._idle:
+                    # Full: free the slot of the least recently used container mounted for something else
+                    victim, _ = self._idle.pop(0)
+                    break
+                self._waiting += 1
+                try:
+                    await self._available.wait()
+                finally:
+                    self._waiting -= 1
+            # Cold start: nothing idle with this mount and room to grow.
+            self._starting += 1
+
+        if victim is not None:
+            await self._stop(victim)
+        try:
+            docker = self._new_executor(work_dir, datasets)
+            await start_docker_container(docker)
+        except Exception:
+            async with self._available:
+                self._starting -= 1
+                self._available.notify_all()
+            raise
+        async with self._available:
+            self._starting -= 1
+            self._mounts[docker] = mount
+            self._leased.add(docker)
+        return docker
+
+    async def _release_on_loop(self, docker, discard, affinity):
+        healthy = not discard and not self._closed and await self._reset(docker)
+        async with self._available:
+            self._leased.discard(docker)
+            self._affinity.pop(docker, None)
+            if healthy:
+                if affinity is not None:
+                    self._affinity[docker] = affinity
+                self._idle.append((docker, time.monotonic()))
+            self._available.notify_all()
+        if not healthy:
+            await self._stop(docker)
+            if not self._closed and self._size() < self.min_size:
+                asyncio.ensure_future(self._spawn())
+
+    async def _reset(self, docker):
+        """Wipe container scratch space between leases; returns False if the container is unusable."""
+        block = RESET_SCRATCH_BLOCK if self._mounts.get(docker) == SCRATCH_MOUNT else RESET_BLOCK
+        with get_tracer().span("container.reset") as span:
+            try:
+                result = await asyncio.wait_for(
+                    docker.execute_code_blocks([block], CancellationToken()),
+                    timeout=self.health_check_interval,
+                )
+                healthy = result.exit_code == 0
+            except Exception:
+                healthy = False
+            span.set(healthy=healthy)
+        return healthy
+
+    async def _maintenance(self):
+        """Periodically evict idle-too-long or unhealthy containers and top the pool back up."""
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            now = time.monotonic()
+
+            async with self._available:
+                keep, evict = [], []
+                # Oldest first, so the least recently used containers are evicted before fresher ones.
+                for docker, last_used in self._idle:
+                    expired = now - last_used > self.max_idle
+                    if expired and self._size() - len(evict) > self.min_size:
+                        evict.append(docker)
+                    else:
+                        keep.append((docker, last_used))
+                checking = keep
+                self._idle = []
+                self._checking = len(checking)
+
+            # Health-check idle containers outside the lock so leases are not blocked on probes.
+            healthy = []
+            for docker, last_used in checking:
+                if await self._reset(docker):
+                    healthy.append((docker, last_used))
+                else:
+                    evict.append(docker)
+
+            async with self._available:
+                self._checking = 0
+                self._idle = healthy + self._idle
+                self._available.notify_all()
+
+            for docker in evict:
+                await self._stop(docker)
+
+            for _ in range(self.min_size - self._size()):
+                asyncio.ensure_future(self._spawn())
+
+    async def _shutdown_on_loop(self):
+        self._closed = True
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+        async with self._available:
+            idle = [docker for docker, _ in self._idle]
+            leased = list(self._leased)
+            self._idle = []
+            self._leased.clear()
+            self._available.notify_all()
+        for docker in idle + leased:
+            await self._stop(docker)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_container_pool():
+    """
+    Return the process-wide container pool, starting it on first use.
+
+    Returns:
+        ContainerPool shared by every chat and run in this process
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ContainerPool()
+            _pool.start()
+            atexit.register(_pool.shutdown)
+            get_tracer().register_gauge(
+                "analyzer_containers", "Pooled sandbox containers by state.",
+                lambda: {(("state", state),): _pool.stats()[state] for state in ("idle", "leased", "starting", "checking")},
+            )
+        return _pool
@@ -1,12 +1,16 @@
 from autogen_ext.code_executors.docker import DockerCommandLineCodeExecutor
 
-from config.constants import WORK_DIR_DOCKER,TIMEOUT_DOCKER
+from config.constants import WORK_DIR_DOCKER,TIMEOUT_DOCKER,IMAGE_DOCKER
+from data.dataset_store import get_dataset_volume
+from telemetry.tracing import get_tracer
 
-def getDockerCommandLineExecutor():
+def getDockerCommandLineExecutor(work_dir=WORK_DIR_DOCKER, datasets=None, **kwargs):
     docker=DockerCommandLineCodeExecutor(
-        image="analyzer-gpt-enhanced:latest",  # Use custom image with pre-installed packages
-        work_dir=WORK_DIR_DOCKER,
-        timeout=TIMEOUT_DOCKER
+        image=IMAGE_DOCKER,  # Use custom image with pre-installed packages
+        work_dir=work_dir,  # The only host directory the code can write to
+        timeout=TIMEOUT_DOCKER,
+        extra_volumes=get_dataset_volume(datasets),  # Uploaded datasets, read-only at DATASET_MOUNT_DOCKER
+        **kwargs
     )
 
     return docker
@@ -14,11 +18,13 @@ def getDockerCommandLineExecutor():
 
 async def start_docker_container(docker):
     print("Starting Docker Container")
-    await docker.start()
+    with get_tracer().span("container.start"):
+        await docker.start()
     print("Docker Container Started")
 
 async def stop_docker_container(docker):
     print("Stopping Docker Container")
-    await docker.stop()
+    with get_tracer().span("container.stop"):
+        await docker.stop()
     print("Docker Container Stopped")
 
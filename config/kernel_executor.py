@@ -0,0 +1,197 @@
+import asyncio
+import json
+import os
+import shlex
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+from autogen_core import CancellationToken
+from autogen_core.code_executor import CodeBlock, CodeExecutor
+
+from config.artifact_manifest import ManifestCodeResult, merge_manifests
+from config.constants import TIMEOUT_DOCKER
+from sessions.workspaces import in_work_subdir
+from telemetry.tracing import get_tracer
+
+KERNEL_SERVER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kernel_server.py")
+ARTIFACT_TRACKER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifact_tracker.py")
+KERNEL_DIR_NAME = ".kernels"
+PYTHON_LANGUAGES = {"python", "py", "python3"}
+POLL_INTERVAL = 0.05
+HEARTBEAT_TIMEOUT = 10
+
+
+class KernelCodeExecutor(CodeExecutor):
+    """
+    Code executor that runs Python blocks in a long-lived kernel inside a started Docker executor.
+
+    The kernel preloads the chat's dataset as ``df`` once; every later block (retries and
+    follow-up turns alike) reuses the same in-memory namespace. Non-Python blocks such as
+    ``pip install`` are delegated to the wrapped Docker executor unchanged.
+
+    The kernel lives as long as its container. When the same chat leases the same container
+    again (see ``ContainerPool.acquire(affinity=...)``) the running kernel is reused; a kernel
+    owned by another chat or dataset is replaced.
+    """
+
+    reports_manifest = True
+
+    def __init__(self, docker, session_id, dataset_file=None, timeout=TIMEOUT_DOCKER, work_subdir=None):
+        """
+        Args:
+            docker: Started DockerCommandLineCodeExecutor hosting the kernel
+            session_id: Chat id owning the kernel
+            dataset_file: Dataset path relative to the executor work dir, preloaded as ``df``
+            timeout: Seconds a single block may run before the kernel is killed
+            work_subdir: Directory relative to the work dir that blocks run in (the chat's workspace)
+        """
+        self._docker = docker
+        self._timeout = timeout
+        self._work_subdir = work_subdir or "."
+        self._owner = {"session_id": session_id, "dataset_file": dataset_file or "", "work_dir": self._work_subdir}
+        self._kernel_dir = Path(docker.work_dir) / KERNEL_DIR_NAME / docker.container_name
+        # Kernel directory as seen from the container, whose working directory is the work dir.
+        self._kernel_dir_in_container = f"{KERNEL_DIR_NAME}/{docker.container_name}"
+        # Namespace id of the last kernel this executor launched itself (its state is known to be pristine)
+        self.launched_namespace = None
+
+    @property
+    def docker(self):
+        """The wrapped Docker executor (what gets returned to the container pool)."""
+        return self._docker
+
+    @property
+    def namespace_id(self):
+        """Id of the running kernel; it changes whenever the namespace is lost (new or restarted kernel)."""
+        return self._read_text("namespace_id") or None
+
+    async def start(self):
+        """Reuse this chat's running kernel or launch a fresh one with the dataset preloaded."""
+        with get_tracer().span("kernel.start", preloaded=bool(self._owner["dataset_file"])) as span:
+            reused = self._is_alive() and self._read_owner() == self._owner
+            span.set(reused=reused)
+            if reused:
+                return
+            await self._kill()
+            shutil.rmtree(self._kernel_dir, ignore_errors=True)
+            self._kernel_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(KERNEL_SERVER_FILE, self._kernel_dir / "kernel_server.py")
+            shutil.copyfile(ARTIFACT_TRACKER_FILE, self._kernel_dir / "artifact_tracker.py")
+            (self._kernel_dir / "owner.json").write_text(json.dumps(self._owner))
+            self.launched_namespace = uuid.uuid4().hex
+            (self._kernel_dir / "namespace_id").write_text(self.launched_namespace)
+
+            args = [f"{self._kernel_dir_in_container}/kernel_server.py", self._kernel_dir_in_container, self._work_subdir]
+            if self._owner["dataset_file"]:
+                args.append(self._owner["dataset_file"])
+            command = (
+                f"setsid nohup python {' '.join(shlex.quote(a) for a in args)} "
+                f"> {shlex.quote(self._kernel_dir_in_container + '/kernel.log')} 2>&1 &"
+            )
+            result = await self._docker.execute_code_blocks([CodeBlock(code=command, language="sh")], CancellationToken())
+            if result.exit_code != 0:
+                raise RuntimeError(f"Failed to start kernel: {result.output}")
+
+    async def stop(self):
+        """Ask the kernel to exit and remove its directory."""
+        if self._kernel_dir.exists():
+            (self._kernel_dir / "shutdown").write_text("")
+        await self._kill()
+        shutil.rmtree(self._kernel_dir, ignore_errors=True)
+
+    async def restart(self):
+        await self.stop()
+        await self.start()
+
+    async def execute_code_blocks(self, code_blocks, cancellation_token):
+        """
+        Execute code blocks, sending Python to the kernel and everything else to Docker.
+
+        Args:
+            code_blocks: Blocks extracted from the analyzer's message
+            cancellation_token: Token used to abort a running block
+
+        Returns:
+            ManifestCodeResult with the combined output, the exit code of the last block run
+            and the files the Python blocks wrote
+        """
+        outputs = []
+        artifacts = []
+        exit_code = 0
+        for code_block in code_blocks:
+            if code_block.language.lower() in PYTHON_LANGUAGES:
+                output, exit_code, written = await self._execute_in_kernel(code_block.code, cancellation_token)
+                artifacts = merge_manifests(artifacts, written)
+            else:
+                result = await self._docker.execute_code_blocks([in_work_subdir(code_block, self._work_subdir)], cancellation_token)
+                output, exit_code = result.output, result.exit_code
+            outputs.append(output)
+            if exit_code != 0:
+                break
+        return ManifestCodeResult(exit_code=exit_code, output="".join(outputs), artifacts=artifacts)
+
+    async def _execute_in_kernel(self, code, cancellation_token):
+        if not self._is_alive():
+            await self.start()
+
+        request_id = f"{time.time_ns()}_{uuid.uuid4().hex[:8]}"
+        request_path = self._kernel_dir / f"req_{request_id}.py"
+        response_path = self._kernel_dir / f"resp_{request_id}.json"
+        tmp_path = self._kernel_dir / f"req_{request_id}.tmp"
+        tmp_path.write_text(code, encoding="utf-8")
+        os.replace(tmp_path, request_path)
+
+        deadline = time.monotonic() + self._timeout
+        try:
+            while not response_path.exists():
+                if cancellation_token.is_cancelled():
+                    await self._kill()
+                    return "Code execution was cancelled.", 1, []
+                if time.monotonic() > deadline:
+                    await self._kill()
+                    return "\n Timeout", 124, []
+                if not self._is_alive():
+                    log = self._read_text("kernel.log")
+                    await self._kill()
+                    return f"Kernel died while executing the code block.\n{log}", 1, []
+                await asyncio.sleep(POLL_INTERVAL)
+        except asyncio.CancelledError:
+            # The run itself was cancelled (e.g. a cancelled job); stop the block it left running
+            await self._kill()
+            raise
+
+        response = json.loads(response_path.read_text(encoding="utf-8"))
+        response_path.unlink()
+        return response["output"], response["exit_code"], response.get("artifacts", [])
+
+    def _is_alive(self):
+        # A kernel launched moments ago may not have written its first heartbeat yet.
+        for name in ("heartbeat", "owner.json"):
+            try:
+                return time.time() - (self._kernel_dir / name).stat().st_mtime < HEARTBEAT_TIMEOUT
+            except FileNotFoundError:
+                continue
+        return False
+
+    def _read_owner(self):
+        try:
+            return json.loads(self._read_text("owner.json"))
+        except ValueError:
+            return None
+
+    def _read_text(self, name):
+        try:
+            return (self._kernel_dir / name).read_text(encoding="utf-8")
+        except OSError:
+            return ""
+
+    async def _kill(self):
+        pid_file = shlex.quote(f"{self._kernel_dir_in_container}/kernel.pid")
+        if not (self._kernel_dir / "kernel.pid").exists():
+            return
+        command = f'kill -9 "$(cat {pid_file})" 2>/dev/null; true'
+        await self._docker.execute_code_blocks([CodeBlock(code=command, language="sh")], CancellationToken())
+        for name in ("kernel.pid", "heartbeat", "owner.json", "namespace_id"):
+            (self._kernel_dir / name).unlink(missing_ok=True)
@@ -0,0 +1,121 @@
+"""
+Long-lived Python kernel that runs inside the sandbox container.
+
+KernelCodeExecutor copies this file into a per-container kernel directory under the
+work dir and starts it in the background. Code blocks are exchanged as files in that
+directory: the host drops ``req_<id>.py`` and the kernel answers with ``resp_<id>.json``.
+All blocks execute in one shared namespace, so the dataset is parsed a single time and
+exposed to every later block as ``df``. Each response carries the manifest of files the
+block wrote (see artifact_tracker.py, copied next to this file).
+
+Usage: python kernel_server.py <kernel_dir> <work_dir> [dataset_file]
+
+Blocks run with ``work_dir`` (the chat's workspace) as the current directory.
+"""
+import contextlib
+import importlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+
+import artifact_tracker
+
+POLL_INTERVAL = 0.02
+HEARTBEAT_INTERVAL = 1.0
+
+
+def write_atomic(path, content):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def heartbeat(path):
+    """Touch the heartbeat file so the host can tell a busy kernel from a dead one."""
+    while True:
+        try:
+            write_atomic(path, str(time.time()))
+        except OSError:
+            return
+        time.sleep(HEARTBEAT_INTERVAL)
+
+
+def preload(namespace, dataset_file):
+    """Load the chat's dataset into ``df``; returns an error message instead of raising."""
+    if not dataset_file:
+        return ""
+    try:
+        import pandas as pd
+        namespace["pd"] = pd
+        if dataset_file.endswith(".parquet"):
+            namespace["df"] = pd.read_parquet(dataset_file)
+        else:
+            namespace["df"] = pd.read_csv(dataset_file)
+        return ""
+    except Exception:
+        return f"Failed to preload '{dataset_file}' as df:\n{traceback.format_exc()}\n"
+
+
+def run(code, namespace, work_dir):
+    """Execute one code block in the shared namespace, capturing stdout, stderr and the files it wrote."""
+    buffer = io.StringIO()
+    exit_code = 0
+    # Packages pip-installed by an earlier block must be importable without a restart.
+    importlib.invalidate_caches()
+    artifact_tracker.start()
+    with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+        try:
+            exec(compile(code, "<code_block>", "exec"), namespace)
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+    return buffer.getvalue(), exit_code, artifact_tracker.stop(work_dir)
+
+
+def main():
+    kernel_dir = os.path.abspath(sys.argv[1])
+    dataset_file = os.path.abspath(sys.argv[3]) if len(sys.argv) > 3 else ""
+    # Artifacts are reported relative to the workspace.
+    os.chdir(sys.argv[2])
+    work_dir = os.getcwd()
+
+    write_atomic(os.path.join(kernel_dir, "kernel.pid"), str(os.getpid()))
+    threading.Thread(target=heartbeat, args=(os.path.join(kernel_dir, "heartbeat"),), daemon=True).start()
+
+    namespace = {"__name__": "__main__"}
+    preload_error = preload(namespace, dataset_file)
+    write_atomic(os.path.join(kernel_dir, "ready"), "")
+
+    while True:
+        try:
+            names = sorted(n for n in os.listdir(kernel_dir) if n.startswith("req_") and n.endswith(".py"))
+        except FileNotFoundError:
+            # Kernel directory was cleaned up on the host; nothing left to serve.
+            return
+        if os.path.exists(os.path.join(kernel_dir, "shutdown")):
+            return
+        if not names:
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        for name in names:
+            request_path = os.path.join(kernel_dir, name)
+            with open(request_path, encoding="utf-8") as f:
+                code = f.read()
+            os.remove(request_path)
+
+            output, exit_code, artifacts = run(code, namespace, work_dir)
+            output, preload_error = preload_error + output, ""
+            response_path = os.path.join(kernel_dir, f"resp_{name[len('req_'):-len('.py')]}.json")
+            write_atomic(response_path, json.dumps({"output": output, "exit_code": exit_code, "artifacts": artifacts}))
+
+
+if __name__ == "__main__":
+    main()
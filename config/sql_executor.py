@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+
+from autogen_core.code_executor import CodeExecutor
+
+from config.artifact_manifest import ManifestCodeResult, merge_manifests, result_artifacts
+from config.constants import SQL_PREVIEW_ROWS, SQL_CHART_MAX_ROWS
+from data.hashing import file_digest
+from data.sql_engine import RESULT_EXTENSIONS, SqlError, prepare_database, run_query
+from telemetry.tracing import get_tracer
+
+SQL_LANGUAGES = {"sql"}
+CHART_KINDS = {"bar", "barh", "line", "area", "scatter", "pie"}
+# "-- filename: name.csv" and "-- chart: bar x=col y=col1,col2" lines at the top of a block
+DIRECTIVE = re.compile(r"^\s*--\s*(filename|chart)\s*:\s*(.*?)\s*$", re.IGNORECASE)
+
+
+def parse_sql_block(code):
+    """
+    Split a SQL block into its directives and the query.
+
+    Returns:
+        Tuple of (file name or None, chart spec dict or None, query text)
+    """
+    filename, chart = None, None
+    lines = code.strip().splitlines()
+    while lines and (DIRECTIVE.match(lines[0]) or not lines[0].strip()):
+        match = DIRECTIVE.match(lines[0])
+        lines.pop(0)
+        if match is None:
+            continue
+        name, value = match.group(1).lower(), match.group(2)
+        if name == "filename":
+            filename = value
+        else:
+            words = value.split()
+            chart = {"kind": words[0].lower() if words else "bar", "x": None, "y": None}
+            for word in words[1:]:
+                key, _, option = word.partition("=")
+                if key in ("x", "y") and option:
+                    chart[key] = option if key == "x" else option.split(",")
+    return filename, chart, "\n".join(lines).strip().rstrip(";")
+
+
+def render_chart(table, chart, path):
+    """
+    Plot (the first rows of) a query result to a PNG file.
+
+    Args:
+        table: Arrow table with the result rows
+        chart: Spec from ``parse_sql_block``: ``kind`` plus optional ``x`` and ``y`` columns
+        path: PNG file to write
+    """
+    # Figure without pyplot: no global state shared with other threads
+    from matplotlib.figure import Figure
+
+    frame = table.to_pandas()
+    x = chart["x"] or frame.columns[0]
+    y = chart["y"] or [c for c in frame.select_dtypes("number").columns if c != x]
+    missing = [c for c in [x, *y] if c not in frame.columns]
+    if missing or not y:
+        raise ValueError(f"cannot plot columns {missing or y}; result columns are {frame.columns.tolist()}")
+    figure = Figure(figsize=(10, 6))
+    axes = figure.subplots()
+    if chart["kind"] == "pie":
+        frame.set_index(x)[y[0]].plot(kind="pie", ax=axes, autopct="%1.1f%%", ylabel="")
+    elif chart["kind"] == "scatter":
+        frame.plot(kind="scatter", x=x, y=y[0], ax=axes)
+    else:
+        frame.plot(kind=chart["kind"], x=x, y=y, ax=axes)
+    figure.tight_layout()
+    figure.savefig(path, dpi=100)
+
+
+def _manifest_entry(work_dir, name):
+    path = os.path.join(work_dir, name)
+    stat = os.stat(path)
+    return {"name": name, "size": stat.st_size, "sha256": file_digest(path), "mtime": stat.st_mtime}
+
+
+class SqlCodeExecutor(CodeExecutor):
+    """
+    Executor wrapper answering ``sql`` blocks with an embedded engine instead of the sandbox.
+
+    The dataset is loaded once per content into a DuckDB (or SQLite) database next to it in
+    the dataset store, queried as table ``data``. A query runs in the app process on a
+    sandboxed read-only connection (see data/sql_engine.py), so plain group-bys, filters
+    and top-N cost no interpreter start and no container round trip. The full result is
+    streamed to the file named by ``-- filename:`` in the chat's workspace, the first rows
+    are returned as output and ``-- chart:`` plots them. Files are reported like the
+    sandbox's own (config/artifact_manifest.py). Other blocks go to the wrapped executor.
+    """
+
+    reports_manifest = True
+
+    def __init__(self, executor, dataset, work_dir, engine):
+        """
+        Args:
+            executor: Executor for every non-SQL block
+            dataset: Dict returned by the dataset store
+            work_dir: Host path of the chat's workspace, where results and charts are written
+            engine: "duckdb" or "sqlite" (see ``sql_engine_name``)
+        """
+        self._executor = executor
+        self._dataset = dataset
+        self._work_dir = str(work_dir)
+        self._engine = engine
+
+    @property
+    def executor(self):
+        """The wrapped executor."""
+        return self._executor
+
+    async def execute_code_blocks(self, code_blocks, cancellation_token):
+        """
+        Execute code blocks, running SQL in-process and delegating everything else.
+
+        Returns:
+            ManifestCodeResult with the combined output, the exit code of the last block run and the written files
+        """
+        outputs = []
+        artifacts = []
+        exit_code = 0
+        for code_block in code_blocks:
+            if code_block.language.lower() in SQL_LANGUAGES:
+                output, exit_code, written = await self._execute_sql(code_block.code, cancellation_token)
+            else:
+                result = await self._executor.execute_code_blocks([code_block], cancellation_token)
+                output, exit_code, written = result.output, result.exit_code, result_artifacts(result)
+            outputs.append(output)
+            artifacts = merge_manifests(artifacts, written)
+            if exit_code != 0:
+                break
+        return ManifestCodeResult(exit_code=exit_code, output="".join(outputs), artifacts=artifacts)
+
+    async def start(self):
+        await self._executor.start()
+
+    async def stop(self):
+        await self._executor.stop()
+
+    async def restart(self):
+        await self._executor.restart()
+
+    async def _execute_sql(self, code, cancellation_token):
+        filename, chart, query = parse_sql_block(code)
+        if not query:
+            return "Error: the sql block contains no query.\n", 1, []
+        filename = filename or f"query_{hashlib.sha256(query.encode('utf-8')).hexdigest()[:8]}.csv"
+        if os.path.basename(filename) != filename or filename.startswith(".") \
+                or os.path.splitext(filename)[1].lower() not in RESULT_EXTENSIONS:
+            return f"Error: '-- filename: {filename}' must be a plain file name ending in .csv or .parquet.\n", 1, []
+        if chart is not None and chart["kind"] not in CHART_KINDS:
+            return f"Error: unknown chart kind '{chart['kind']}'; use one of {', '.join(sorted(CHART_KINDS))}.\n", 1, []
+
+        with get_tracer().span("sql.query", engine=self._engine) as span:
+            output, exit_code, written = await asyncio.to_thread(
+                self._run_sql, filename, chart, query, cancellation_token, span)
+            span.set(exit_code=exit_code, artifacts=len(written))
+        return output, exit_code, written
+
+    def _run_sql(self, filename, chart, query, cancellation_token, span):
+        db_path = prepare_database(self._dataset, self._engine)
+        done = False
+
+        def interrupt_on_cancel(interrupt):
+            def cancel():
+                if not done:
+                    interrupt()
+            cancellation_token.add_callback(cancel)
+
+        started = time.perf_counter()
+        try:
+            table, rows = run_query(db_path, self._engine, query, os.path.join(self._work_dir, filename),
+                                    keep_rows=max(SQL_PREVIEW_ROWS, SQL_CHART_MAX_ROWS if chart else 0),
+                                    on_connect=interrupt_on_cancel)
+        except SqlError as e:
+            return f"SQL error ({self._engine}): {e}\n", 1, []
+        finally:
+            done = True
+        seconds = time.perf_counter() - started
+        span.set(rows=rows, seconds=round(seconds, 4))
+
+        lines = [
+            f"Query returned {rows} rows x {table.num_columns} columns in {seconds:.2f}s ({self._engine}); "
+            f"full result saved to {filename}",
+            table.slice(0, SQL_PREVIEW_ROWS).to_pandas().to_string(index=False),
+        ]
+        if rows > SQL_PREVIEW_ROWS:
+            lines.append(f"... {rows - SQL_PREVIEW_ROWS} more rows in {filename}")
+        written = [_manifest_entry(self._work_dir, filename)]
+
+        if chart is not None:
+            chart_name = f"{os.path.splitext(filename)[0]}.png"
+            try:
+                render_chart(table, chart, os.path.join(self._work_dir, chart_name))
+                written.append(_manifest_entry(self._work_dir, chart_name))
+                note = f" (first {SQL_CHART_MAX_ROWS} rows)" if rows > SQL_CHART_MAX_ROWS else ""
+                lines.append(f"Chart saved to {chart_name}{note}")
+            except ImportError:
+                lines.append("Chart skipped: matplotlib is not installed; plot the result in Python instead")
+            except Exception as e:
+                lines.append(f"Chart failed: {e}")
+        return "\n".join(lines) + "\n", 0, written
@@ -0,0 +1,114 @@
+import os
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config.constants import COLUMNAR_WORKERS, COLUMNAR_WAIT_SECONDS
+from data.csv_reader import open_csv, read_table
+
+COLUMNAR_EXTENSION = ".parquet"
+
+_executor = ThreadPoolExecutor(max_workers=COLUMNAR_WORKERS, thread_name_prefix="columnar")
+_conversions = {}
+_conversions_lock = threading.Lock()
+
+
+def columnar_path_for(file_path):
+    """Path of the Parquet copy that sits next to a stored CSV."""
+    return os.path.splitext(file_path)[0] + COLUMNAR_EXTENSION
+
+
+def find_columnar_copy(file_path):
+    """
+    Return the finished Parquet copy of a CSV if one exists, else None.
+
+    Args:
+        file_path: Path to the CSV file
+
+    Returns:
+        Path to the Parquet file or None
+    """
+    if file_path.endswith(COLUMNAR_EXTENSION):
+        return file_path
+    parquet_path = columnar_path_for(file_path)
+    return parquet_path if os.path.exists(parquet_path) else None
+
+
+def convert_csv_to_parquet(csv_path, parquet_path, row_group_size=None):
+    """
+    Convert a CSV file to Parquet once, keeping the inferred column types.
+
+    Streams record batches so memory stays bounded; if a later block disagrees with the
+    types inferred from the first one, falls back to a multithreaded whole-file read.
+    Dates and timestamps are stored typed (see data/csv_reader.py for the shared parse options).
+    ``row_group_size`` caps the rows per row group (smaller groups make windowed reads cheaper).
+    """
+    tmp_path = f"{parquet_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        try:
+            reader = open_csv(csv_path, parse_dates=True)
+            with pq.ParquetWriter(tmp_path, reader.schema) as writer:
+                for batch in reader:
+                    writer.write_batch(batch, row_group_size=row_group_size)
+        except pa.ArrowInvalid:
+            pq.write_table(read_table(csv_path, parse_dates=True), tmp_path, row_group_size=row_group_size)
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, parquet_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return parquet_path
+
+
+def schedule_conversion(dataset):
+    """
+    Start the one-time columnar conversion of a stored dataset in the background.
+
+    Args:
+        dataset: Dict returned by ``data.dataset_store.store_upload``/``store_file``
+
+    Returns:
+        Future resolving to the Parquet path
+    """
+    parquet_path = columnar_path_for(dataset["path"])
+    with _conversions_lock:
+        future = _conversions.get(parquet_path)
+        if future is None:
+            if os.path.exists(parquet_path):
+                future = _executor.submit(lambda: parquet_path)
+            else:
+                future = _executor.submit(convert_csv_to_parquet, dataset["path"], parquet_path)
+            _conversions[parquet_path] = future
+    return future
+
+
+def ensure_columnar(dataset, timeout=COLUMNAR_WAIT_SECONDS):
+    """
+    Attach the Parquet copy to a dataset, waiting up to ``timeout`` for its conversion.
+
+    Args:
+        dataset: Dict returned by the dataset store
+        timeout: Seconds to wait for an in-flight conversion before giving up
+
+    Returns:
+        Copy of ``dataset`` with ``columnar_path`` and ``columnar_container_path``
+        set, or set to None when no columnar copy is available (the CSV is used instead)
+    """
+    dataset = dict(dataset, columnar_path=None, columnar_container_path=None)
+    if not dataset["path"].endswith(".csv"):
+        return dataset
+    try:
+        parquet_path = schedule_conversion(dataset).result(timeout=timeout)
+    except TimeoutError:
+        return dataset
+    except Exception as e:
+        print(f"Columnar conversion failed for {dataset['name']}: {e}")
+        return dataset
+    dataset["columnar_path"] = parquet_path
+    dataset["columnar_container_path"] = posixpath.join(
+        posixpath.dirname(dataset["container_path"]), os.path.basename(parquet_path)
+    )
+    return dataset
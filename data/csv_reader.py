@@ -0,0 +1,185 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from config.constants import CSV_CACHE_MAX_BYTES
+from data.hashing import file_digest
+
+# Large blocks give the streaming reader enough rows to infer stable column types.
+CSV_BLOCK_SIZE = 16 * 1024 * 1024
+# Previews only need the first rows; a small block keeps them to a single cheap read.
+CSV_SAMPLE_BLOCK_SIZE = 1024 * 1024
+
+_frames = OrderedDict()    # (content hash, sample rows) -> (DataFrame, bytes)
+_frames_bytes = 0
+_frames_lock = threading.Lock()
+
+
+def _convert_options(csv_path, read_options, parse_dates):
+    """
+    Conversion options matching ``pd.read_csv``: empty fields become nulls, and unless
+    ``parse_dates`` is set, columns inferred as dates or timestamps are kept as text.
+    """
+    column_types = {}
+    if not parse_dates:
+        # Types are inferred from the first block; opening the stream parses just that block.
+        reader = pa_csv.open_csv(csv_path, read_options=read_options)
+        column_types = {field.name: pa.string() for field in reader.schema if pa.types.is_temporal(field.type)}
+        reader.close()
+    return pa_csv.ConvertOptions(strings_can_be_null=True, column_types=column_types)
+
+
+def open_csv(csv_path, parse_dates=False, block_size=CSV_BLOCK_SIZE):
+    """
+    Open a streaming Arrow reader over a CSV.
+
+    Args:
+        csv_path: Path to the CSV file
+        parse_dates: Keep date and timestamp columns typed instead of as text
+        block_size: Bytes per record batch (column types are inferred from the first one)
+
+    Returns:
+        pyarrow RecordBatchReader
+    """
+    read_options = pa_csv.ReadOptions(block_size=block_size)
+    return pa_csv.open_csv(csv_path, read_options=read_options,
+                           convert_options=_convert_options(csv_path, read_options, parse_dates))
+
+
+def read_table(csv_path, parse_dates=False):
+    """
+    Parse a whole CSV into an Arrow table on all cores (not cached).
+
+    Args:
+        csv_path: Path to the CSV file
+        parse_dates: Keep date and timestamp columns typed instead of as text
+
+    Returns:
+        pyarrow Table
+    """
+    read_options = pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE, use_threads=True)
+    return pa_csv.read_csv(csv_path, read_options=read_options,
+                           convert_options=_convert_options(csv_path, read_options, parse_dates))
+
+
+def read_csv_columns(csv_path):
+    """Column names of a CSV, read from its header and first block only."""
+    reader = pa_csv.open_csv(csv_path, read_options=pa_csv.ReadOptions(block_size=CSV_SAMPLE_BLOCK_SIZE))
+    names = reader.schema.names
+    reader.close()
+    return names
+
+
+def read_csv_sample(csv_path, rows):
+    """
+    Return the first ``rows`` rows of a CSV without parsing the rest of the file.
+
+    Samples are kept in memory keyed by content hash (reruns show the same preview
+    without reading the file again); the least recently used are dropped beyond
+    ``CSV_CACHE_MAX_BYTES``. The returned frame is a shallow copy of the cached one.
+
+    Args:
+        csv_path: Path to the CSV file
+        rows: Number of rows wanted
+
+    Returns:
+        pandas DataFrame with at most ``rows`` rows
+    """
+    key = (file_digest(csv_path), rows)
+    frame = _cached(key)
+    if frame is not None:
+        return frame.copy(deep=False)
+
+    batches = []
+    read = 0
+    try:
+        reader = open_csv(csv_path, block_size=CSV_SAMPLE_BLOCK_SIZE)
+        try:
+            for batch in reader:
+                batches.append(batch)
+                read += batch.num_rows
+                if read >= rows:
+                    break
+        except pa.ArrowInvalid:
+            # A later block disagrees with the types of the first; the rows read so far suffice
+            if not batches:
+                raise
+        frame = pa.Table.from_batches(batches, schema=reader.schema).slice(0, rows).to_pandas()
+        reader.close()
+    except pa.ArrowInvalid:
+        frame = pd.read_csv(csv_path, nrows=rows)
+    _remember(key, frame, int(frame.memory_usage(deep=True).sum()))
+    return frame.copy(deep=False)
+
+
+def iter_csv_chunks(csv_path, chunk_rows):
+    """
+    Stream a CSV as DataFrames of ``chunk_rows`` rows with bounded memory (not cached).
+
+    Column types are inferred once from the first block and kept for the whole file. If
+    a later block disagrees with them, pandas' chunked parser reads the file again from
+    the start and the rows already yielded are skipped by count (quoted fields may span
+    several lines, so lines cannot be skipped).
+
+    Args:
+        csv_path: Path to the CSV file
+        chunk_rows: Rows per chunk (the last chunk may be shorter)
+
+    Yields:
+        pandas DataFrames
+    """
+    yielded = 0
+    try:
+        reader = open_csv(csv_path)
+        pending = []
+        pending_rows = 0
+        for batch in reader:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows < chunk_rows:
+                continue
+            table = pa.Table.from_batches(pending, schema=reader.schema)
+            offset = 0
+            while pending_rows - offset >= chunk_rows:
+                yield table.slice(offset, chunk_rows).to_pandas()
+                offset += chunk_rows
+                yielded += chunk_rows
+            pending = table.slice(offset).to_batches()
+            pending_rows -= offset
+        if pending_rows:
+            yield pa.Table.from_batches(pending, schema=reader.schema).to_pandas()
+            yielded += pending_rows
+        reader.close()
+    except pa.ArrowInvalid:
+        skip = yielded
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, low_memory=False):
+            if skip >= len(chunk):
+                skip -= len(chunk)
+                continue
+            yield chunk.iloc[skip:]
+            skip = 0
+
+
+def _cached(key):
+    with _frames_lock:
+        entry = _frames.get(key)
+        if entry is None:
+            return None
+        _frames.move_to_end(key)
+        return entry[0]
+
+
+def _remember(key, frame, size):
+    global _frames_bytes
+    if size > CSV_CACHE_MAX_BYTES:
+        return
+    with _frames_lock:
+        if key in _frames:
+            _frames_bytes -= _frames.pop(key)[1]
+        _frames[key] = (frame, size)
+        _frames_bytes += size
+        while _frames_bytes > CSV_CACHE_MAX_BYTES:
+            _frames_bytes -= _frames.popitem(last=False)[1][1]
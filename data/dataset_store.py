@@ -0,0 +1,112 @@
+import os
+import posixpath
+import shutil
+import threading
+from collections import OrderedDict
+
+from config.constants import CACHE_DIR, DATASET_MOUNT_DOCKER
+from data.hashing import bytes_digest, file_digest, seed_digest
+
+DATASET_STORE_DIR = os.path.join(CACHE_DIR, "datasets")
+MAX_MEMOIZED_UPLOADS = 256
+
+# Streamlit upload id -> content digest, so reruns of the same upload are never re-hashed.
+_upload_digests = OrderedDict()
+_upload_digests_lock = threading.Lock()
+
+
+def _describe(digest, extension, name):
+    file_name = f"{digest}{extension}"
+    return {
+        "digest": digest,
+        "name": name,
+        "path": os.path.join(DATASET_STORE_DIR, file_name),
+        "container_path": posixpath.join(DATASET_MOUNT_DOCKER, file_name),
+    }
+
+
+def _write_object(path, data):
+    """Write a store object atomically and mark it read-only."""
+    os.makedirs(DATASET_STORE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.chmod(tmp_path, 0o444)
+    os.replace(tmp_path, path)
+
+
+def store_upload(uploaded_file):
+    """
+    Add a Streamlit upload to the content-addressed dataset store.
+
+    Identical content is stored once no matter how many chats or users upload it,
+    and a rerun with the same upload costs a dictionary lookup plus an ``exists`` check.
+
+    Args:
+        uploaded_file: Streamlit UploadedFile
+
+    Returns:
+        Dict with ``digest``, ``name``, host ``path`` and read-only ``container_path``
+    """
+    extension = os.path.splitext(uploaded_file.name)[1].lower() or ".csv"
+    file_id = getattr(uploaded_file, "file_id", None)
+    with _upload_digests_lock:
+        digest = _upload_digests.get(file_id) if file_id else None
+
+    buffer = None
+    if digest is None:
+        buffer = uploaded_file.getbuffer()
+        digest = bytes_digest(buffer)
+        if file_id:
+            with _upload_digests_lock:
+                _upload_digests[file_id] = digest
+                while len(_upload_digests) > MAX_MEMOIZED_UPLOADS:
+                    _upload_digests.popitem(last=False)
+
+    dataset = _describe(digest, extension, uploaded_file.name)
+    if not os.path.exists(dataset["path"]):
+        _write_object(dataset["path"], buffer if buffer is not None else uploaded_file.getbuffer())
+    seed_digest(dataset["path"], digest)
+    return dataset
+
+
+def store_file(file_path, name=None):
+    """
+    Add a file from disk to the dataset store (CLI and batch entry points).
+
+    Args:
+        file_path: Path of the file to add
+        name: Display name; defaults to the file's base name
+
+    Returns:
+        Same dict as ``store_upload``
+    """
+    name = name or os.path.basename(file_path)
+    extension = os.path.splitext(name)[1].lower() or ".csv"
+    dataset = _describe(file_digest(file_path), extension, name)
+    if not os.path.exists(dataset["path"]):
+        os.makedirs(DATASET_STORE_DIR, exist_ok=True)
+        tmp_path = f"{dataset['path']}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(file_path, tmp_path)
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, dataset["path"])
+    seed_digest(dataset["path"], dataset["digest"])
+    return dataset
+
+
+def get_dataset_volume(paths=None):
+    """
+    Docker volume spec mounting store files read-only under ``DATASET_MOUNT_DOCKER``.
+
+    Args:
+        paths: Store files to mount (e.g. a run's dataset and its Parquet copy), each at its
+            ``container_path``; None mounts the whole store
+
+    Returns:
+        Dict for ``extra_volumes``
+    """
+    if paths is None:
+        os.makedirs(DATASET_STORE_DIR, exist_ok=True)
+        return {os.path.abspath(DATASET_STORE_DIR): {"bind": DATASET_MOUNT_DOCKER, "mode": "ro"}}
+    return {os.path.abspath(path): {"bind": posixpath.join(DATASET_MOUNT_DOCKER, os.path.basename(path)), "mode": "ro"}
+            for path in paths}
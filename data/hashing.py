@@ -0,0 +1,58 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+MAX_MEMOIZED_DIGESTS = 1024
+
+_digests = OrderedDict()
+_digests_lock = threading.Lock()
+
+
+def bytes_digest(data):
+    """Content hash of an in-memory buffer (same scheme as ``file_digest``)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _remember(key, hex_digest):
+    with _digests_lock:
+        _digests[key] = hex_digest
+        _digests.move_to_end(key)
+        while len(_digests) > MAX_MEMOIZED_DIGESTS:
+            _digests.popitem(last=False)
+
+
+def _stat_key(file_path):
+    stat = os.stat(file_path)
+    return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+def seed_digest(file_path, hex_digest):
+    """Record an already-known digest for a file (e.g. one just written from a hashed buffer)."""
+    _remember(_stat_key(file_path), hex_digest)
+
+
+def file_digest(file_path):
+    """
+    Content hash of a file, memoized on (path, size, mtime) so unchanged files are hashed once.
+
+    Args:
+        file_path: Path to the file
+
+    Returns:
+        Hex sha256 digest of the file contents
+    """
+    key = _stat_key(file_path)
+    with _digests_lock:
+        if key in _digests:
+            _digests.move_to_end(key)
+            return _digests[key]
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    hex_digest = digest.hexdigest()
+    _remember(key, hex_digest)
+    return hex_digest
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+from config.constants import IMAGE_THUMBNAIL_MAX_PX, IMAGE_CACHE_MAX_BYTES
+
+# Streamlit serves ./static next to the app script at app/static/ (server.enableStaticServing,
+# see .streamlit/config.toml), so cached images reach the browser by URL instead of inline.
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+IMAGE_CACHE_DIR = os.path.join(STATIC_DIR, "charts")
+IMAGE_CACHE_URL = "app/static/charts"
+# Resolved images remembered in memory, so a rerun only stats the source files
+IMAGE_REF_CACHE_SIZE = 4096
+
+_refs = OrderedDict()    # (path, mtime_ns, size) -> image ref
+_refs_lock = threading.Lock()
+
+
+def _publish(source, target):
+    """Copy ``source`` to ``target`` atomically (a copy, so rewriting the chart in place cannot change it)."""
+    tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def _make_thumbnail(source, target, max_px):
+    """Write a downscaled PNG copy of ``source``; returns False when it is small enough already."""
+    from PIL import Image
+
+    with Image.open(source) as image:
+        if max(image.size) <= max_px:
+            return False
+        image.thumbnail((max_px, max_px))
+        tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, format="PNG", optimize=True)
+    os.replace(tmp_path, target)
+    return True
+
+
+def get_image_ref(path, max_px=IMAGE_THUMBNAIL_MAX_PX):
+    """
+    Return URLs under which a chart image and its thumbnail are served.
+
+    Images are keyed by path, mtime and size: an unchanged chart is never read or
+    encoded again, and a regenerated one gets new URLs (browsers may cache them forever).
+
+    Args:
+        path: Image file on disk
+        max_px: Longest side of the thumbnail
+
+    Returns:
+        Dict with ``url`` (full resolution) and ``thumbnail_url``, or None if the file does not exist
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _refs_lock:
+        ref = _refs.get(key)
+        if ref is not None:
+            _refs.move_to_end(key)
+            return ref
+
+    digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:32]
+    extension = os.path.splitext(path)[1].lower() or ".png"
+    os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+    full_name = f"{digest}{extension}"
+    thumbnail_name = f"{digest}.thumb.png"
+    if not os.path.exists(os.path.join(IMAGE_CACHE_DIR, full_name)):
+        _publish(path, os.path.join(IMAGE_CACHE_DIR, full_name))
+    has_thumbnail = os.path.exists(os.path.join(IMAGE_CACHE_DIR, thumbnail_name))
+    if not has_thumbnail:
+        try:
+            has_thumbnail = _make_thumbnail(path, os.path.join(IMAGE_CACHE_DIR, thumbnail_name), max_px)
+        except Exception:
+            # Not an image Pillow can read (or Pillow missing): serve the original
+            has_thumbnail = False
+
+    ref = {
+        "url": f"{IMAGE_CACHE_URL}/{full_name}",
+        "thumbnail_url": f"{IMAGE_CACHE_URL}/{thumbnail_name if has_thumbnail else full_name}",
+    }
+    with _refs_lock:
+        _refs[key] = ref
+        while len(_refs) > IMAGE_REF_CACHE_SIZE:
+            _refs.popitem(last=False)
+    _prune_images()
+    return ref
+
+
+def _prune_images():
+    """Delete the oldest cached images once the cache exceeds ``IMAGE_CACHE_MAX_BYTES``."""
+    entries = []
+    total = 0
+    for entry in os.scandir(IMAGE_CACHE_DIR):
+        if entry.is_file() and not entry.name.endswith(".tmp"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    if total <= IMAGE_CACHE_MAX_BYTES:
+        return
+    for _, size, path in sorted(entries):
+        if total <= IMAGE_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            continue
+    # Evicted images are published again on their next use.
+    with _refs_lock:
+        _refs.clear()
@@ -0,0 +1,250 @@
+import json
+import os
+import threading
+import warnings
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from config.constants import CACHE_DIR, PROFILE_CHUNK_CELLS, PROFILE_TOP_VALUES
+from data.columnar import COLUMNAR_EXTENSION
+from data.csv_reader import iter_csv_chunks, read_csv_columns
+from data.hashing import file_digest
+
+# Bump when the profile layout changes so stale cached profiles are recomputed.
+PROFILE_VERSION = 2
+PROFILE_DIR = os.path.join(CACHE_DIR, "profiles")
+SAMPLE_ROWS = 3
+MIN_CHUNK_ROWS = 1_000
+# Candidate values kept per column while streaming; only the most frequent survive each merge.
+TOP_VALUES_TRACKED = 1_000
+HLL_PRECISION = 12
+MAX_MEMORY_PROFILES = 64
+
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+class HyperLogLog:
+    """Fixed-memory distinct-count estimator (~1.6% error at the default precision)."""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, series):
+        if series.empty:
+            return
+        hashes = pd.util.hash_pandas_object(series, index=False).to_numpy(dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        width = 64 - self.precision
+        # Rank = position of the leftmost 1-bit in the remaining bits (width + 1 when they are all zero).
+        bit_length = np.zeros(len(remainder), dtype=np.int64)
+        nonzero = remainder > 0
+        bit_length[nonzero] = np.floor(np.log2(remainder[nonzero].astype(np.float64))).astype(np.int64) + 1
+        rank = (width - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+
+def _to_json_value(value):
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _merge_dtype(current, new):
+    """Promote a column dtype across chunks the way a full-file read would."""
+    if current is None or current == new:
+        return new
+    numeric = {"int64", "float64"}
+    if current in numeric and new in numeric:
+        return "float64"
+    return "object"
+
+
+def _parse_datetimes(series):
+    # The format is inferred from the first value and applied vectorized to the rest.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return pd.to_datetime(series, errors="coerce")
+
+
+def _looks_like_datetime(series):
+    sample = series.dropna().astype(str).head(200)
+    if sample.empty or not sample.str.contains(r"\d").all():
+        return False
+    return _parse_datetimes(sample).notna().mean() >= 0.9
+
+
+class _ColumnStats:
+    def __init__(self):
+        self.dtype = None
+        self.is_datetime = None
+        self.null_count = 0
+        self.min = None
+        self.max = None
+        self.top = Counter()
+        self.hll = HyperLogLog()
+
+    def update(self, series):
+        self.dtype = _merge_dtype(self.dtype, str(series.dtype))
+        self.null_count += int(series.isna().sum())
+        values = series.dropna()
+        if values.empty:
+            return
+
+        is_text = pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+        is_datetime_dtype = pd.api.types.is_datetime64_any_dtype(series.dtype)
+        if self.is_datetime is None:
+            self.is_datetime = is_datetime_dtype or (is_text and _looks_like_datetime(values))
+
+        comparable = values
+        if self.is_datetime and not is_datetime_dtype:
+            comparable = _parse_datetimes(values).dropna()
+        elif is_text:
+            comparable = values.astype(str)
+        if not comparable.empty:
+            chunk_min, chunk_max = comparable.min(), comparable.max()
+            if self.min is None:
+                self.min, self.max = chunk_min, chunk_max
+            else:
+                try:
+                    self.min, self.max = min(self.min, chunk_min), max(self.max, chunk_max)
+                except TypeError:
+                    # Column turned from numeric to text in a later chunk; compare as text like the full read would.
+                    self.min = min(str(self.min), str(chunk_min))
+                    self.max = max(str(self.max), str(chunk_max))
+
+        self.hll.add(values)
+        self.top.update(values.value_counts().head(TOP_VALUES_TRACKED).to_dict())
+        if len(self.top) > 2 * TOP_VALUES_TRACKED:
+            self.top = Counter(dict(self.top.most_common(TOP_VALUES_TRACKED)))
+
+    def summary(self, rows):
+        if self.is_datetime:
+            kind = "datetime"
+        elif self.dtype in ("int64", "float64"):
+            kind = "numeric"
+        elif self.dtype == "bool":
+            kind = "boolean"
+        else:
+            kind = "categorical"
+
+        distinct = min(self.hll.estimate(), rows - self.null_count)
+        # For low-cardinality columns every distinct value is tracked, so the count is exact.
+        if len(self.top) < TOP_VALUES_TRACKED:
+            distinct = len(self.top)
+
+        return {
+            "dtype": "datetime64[ns]" if self.is_datetime else (self.dtype or "object"),
+            "kind": kind,
+            "null_count": self.null_count,
+            "distinct_estimate": distinct,
+            "min": _to_json_value(self.min),
+            "max": _to_json_value(self.max),
+            "top_values": [[_to_json_value(v), int(c)] for v, c in self.top.most_common(PROFILE_TOP_VALUES)],
+        }
+
+
+def _read_columns(file_path):
+    if file_path.endswith(COLUMNAR_EXTENSION):
+        return pq.ParquetFile(file_path).schema_arrow.names
+    return read_csv_columns(file_path)
+
+
+def _iter_chunks(file_path, chunk_rows):
+    if file_path.endswith(COLUMNAR_EXTENSION):
+        for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from iter_csv_chunks(file_path, chunk_rows)
+
+
+def build_profile(file_path):
+    """
+    Profile a CSV (or its Parquet copy) in a single streaming pass with bounded memory.
+
+    Args:
+        file_path: Path to the CSV or Parquet file
+
+    Returns:
+        JSON-serializable dict with row count, columns, sample rows and per-column statistics
+    """
+    columns = _read_columns(file_path)
+    chunk_rows = max(MIN_CHUNK_ROWS, PROFILE_CHUNK_CELLS // max(1, len(columns)))
+
+    stats = {column: _ColumnStats() for column in columns}
+    rows = 0
+    sample_data = ""
+    for chunk in _iter_chunks(file_path, chunk_rows):
+        if rows == 0:
+            sample_data = chunk.head(SAMPLE_ROWS).to_string(index=False)
+        rows += len(chunk)
+        for column in columns:
+            stats[column].update(chunk[column])
+
+    return {
+        "version": PROFILE_VERSION,
+        "rows": rows,
+        "columns": columns,
+        "sample_data": sample_data or pd.DataFrame(columns=columns).to_string(index=False),
+        "column_profiles": {column: stats[column].summary(rows) for column in columns},
+    }
+
+
+def profile_dataset(file_path, read_path=None):
+    """
+    Return the profile of a CSV or Parquet file, computing it at most once per file content.
+
+    Profiles are keyed by the file's content hash and kept both in memory and on disk
+    under ``CACHE_DIR``, so repeat calls for an unchanged file skip parsing entirely.
+
+    Args:
+        file_path: Path to the CSV or Parquet file the profile is keyed on
+        read_path: Faster copy of the same data to parse instead (e.g. the CSV's Parquet
+            copy); the profile, ``file_hash`` included, stays that of ``file_path``
+
+    Returns:
+        Profile dict (see ``build_profile``) with the content hash under ``file_hash``
+    """
+    digest = file_digest(file_path)
+    key = f"{digest}_v{PROFILE_VERSION}"
+    with _profiles_lock:
+        if key in _profiles:
+            _profiles.move_to_end(key)
+            return _profiles[key]
+
+    cache_path = os.path.join(PROFILE_DIR, f"{key}.json")
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        profile = build_profile(read_path or file_path)
+        profile["file_hash"] = digest
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(profile, f)
+        os.replace(tmp_path, cache_path)
+
+    with _profiles_lock:
+        _profiles[key] = profile
+        while len(_profiles) > MAX_MEMORY_PROFILES:
+            _profiles.popitem(last=False)
+    return profile
@@ -0,0 +1,115 @@
+import os
+import time
+
+import pyarrow.parquet as pq
+
+from config.constants import (
+    RESULT_TABLE_DIR as DEFAULT_RESULT_TABLE_DIR,
+    RESULT_TABLE_ROW_GROUP_ROWS,
+    RESULT_TABLE_CACHE_MAX_BYTES,
+    RESULT_TABLE_PRUNE_GRACE_SECONDS,
+)
+from data.columnar import convert_csv_to_parquet
+from data.hashing import file_digest
+from sessions.session_store import get_session_store
+
+RESULT_TABLE_DIR = os.getenv("RESULT_TABLE_DIR", DEFAULT_RESULT_TABLE_DIR)
+
+
+def store_result_table(csv_path):
+    """
+    Keep a generated CSV as a Parquet table that can be read a page at a time.
+
+    Tables are content-addressed, so a result produced again is converted only once. The
+    returned reference is all a chat keeps in memory or in the session store, which also
+    counts the references so tables of stored chats are never pruned.
+
+    Args:
+        csv_path: CSV written by an analysis
+
+    Returns:
+        Dict with the table ``path``, its ``rows`` and its ``columns``
+    """
+    os.makedirs(RESULT_TABLE_DIR, exist_ok=True)
+    path = os.path.join(RESULT_TABLE_DIR, f"{file_digest(csv_path)}.parquet")
+    if os.path.exists(path):
+        # Mark as recently used for pruning
+        os.utime(path)
+    else:
+        convert_csv_to_parquet(csv_path, path, row_group_size=RESULT_TABLE_ROW_GROUP_ROWS)
+        _prune_tables(keep=path)
+    return dict(table_info(path), path=path)
+
+
+def table_path(table):
+    """Where a referenced table lives on this host (references store the file name that matters)."""
+    return os.path.join(RESULT_TABLE_DIR, os.path.basename(table["path"]))
+
+
+def table_info(path):
+    """Row count and column names of a stored table, read from the Parquet footer only."""
+    metadata = pq.ParquetFile(path).metadata
+    return {"rows": metadata.num_rows, "columns": metadata.schema.to_arrow_schema().names}
+
+
+def read_table_page(table, page, page_rows):
+    """
+    Read one page of a stored table, touching only the row groups it overlaps.
+
+    Args:
+        table: Reference returned by ``store_result_table``
+        page: Zero-based page number
+        page_rows: Rows per page
+
+    Returns:
+        DataFrame indexed by the rows' positions in the whole table
+    """
+    parquet_file = pq.ParquetFile(table_path(table))
+    start = page * page_rows
+    stop = min(start + page_rows, parquet_file.metadata.num_rows)
+    groups = []
+    first_row = None
+    offset = 0
+    for index in range(parquet_file.num_row_groups):
+        group_rows = parquet_file.metadata.row_group(index).num_rows
+        if offset < stop and offset + group_rows > start:
+            groups.append(index)
+            if first_row is None:
+                first_row = offset
+        offset += group_rows
+    if not groups:
+        return parquet_file.schema_arrow.empty_table().to_pandas()
+    frame = parquet_file.read_row_groups(groups).slice(start - first_row, stop - start).to_pandas()
+    frame.index = range(start, start + len(frame))
+    return frame
+
+
+def _prune_tables(keep):
+    """
+    Delete the least recently used unreferenced tables once they exceed ``RESULT_TABLE_CACHE_MAX_BYTES``.
+
+    Tables a stored chat references and tables written in the last
+    ``RESULT_TABLE_PRUNE_GRACE_SECONDS`` (their analysis may not be saved yet) are kept.
+    """
+    referenced = None
+    tables = []
+    total = 0
+    grace_cutoff = time.time() - RESULT_TABLE_PRUNE_GRACE_SECONDS
+    for entry in os.scandir(RESULT_TABLE_DIR):
+        if entry.name.endswith(".parquet"):
+            stat = entry.stat()
+            if entry.path == keep or stat.st_mtime > grace_cutoff:
+                continue
+            if referenced is None:
+                referenced = get_session_store().referenced_tables()
+            if entry.name not in referenced:
+                total += stat.st_size
+                tables.append((stat.st_mtime, stat.st_size, entry.path))
+    for _, size, path in sorted(tables):
+        if total <= RESULT_TABLE_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            continue
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from config.constants import CACHE_DIR, EXPORT_WORKERS, EXPORT_CSV_CHUNK_ROWS, EXPORT_CACHE_MAX_BYTES
+from data.csv_reader import iter_csv_chunks
+
+EXPORT_DIR = os.path.join(CACHE_DIR, "exports")
+# Bump when the archive layout changes so stale archives are not served.
+EXPORT_VERSION = 2
+
+# Whole archives are built on one pool and their CSV conversions on another, so a build
+# never waits for a worker of its own pool.
+_build_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")
+_convert_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export-convert")
+_builds = {}
+_builds_lock = threading.Lock()
+
+
+def _converts_to_json(file_name):
+    return file_name.endswith('.csv') and not file_name.startswith('tmp_') and not file_name.endswith('_full.csv')
+
+
+def export_key(temp_dir, session_files):
+    """
+    Key of the export archive for the current state of the session files.
+
+    Returns:
+        Hex digest over the names, sizes and mtimes of the files that exist, or None if none do
+    """
+    digest = hashlib.sha256(f"v{EXPORT_VERSION}".encode())
+    found = False
+    for file_name in sorted(set(session_files)):
+        try:
+            stat = os.stat(os.path.join(temp_dir, file_name))
+        except OSError:
+            continue
+        found = True
+        digest.update(f"\0{file_name}\0{stat.st_size}\0{stat.st_mtime_ns}".encode())
+    return digest.hexdigest() if found else None
+
+
+def convert_csv_to_json(csv_path, json_path, chunk_rows=EXPORT_CSV_CHUNK_ROWS):
+    """
+    Write a CSV as a JSON array of records, one chunk of rows at a time.
+
+    The output matches ``df.to_json(orient='records', indent=2)`` of the whole file while
+    only ``chunk_rows`` rows are held in memory.
+    """
+    with open(json_path, "w", encoding="utf-8") as out:
+        out.write("[\n")
+        first = True
+        for chunk in iter_csv_chunks(csv_path, chunk_rows):
+            # Drop the "[\n" and "\n]" around each chunk's records and join them with commas.
+            body = chunk.to_json(orient='records', indent=2)[2:-2]
+            if not body:
+                continue
+            if not first:
+                out.write(",\n")
+            out.write(body)
+            first = False
+        out.write("\n]")
+    return json_path
+
+
+def build_export_zip(temp_dir, session_files, zip_path):
+    """
+    Build the export archive of a chat's files on disk.
+
+    CSV files are converted to JSON in parallel into a scratch directory and then added
+    to the archive; if a conversion fails the original CSV is included instead. Other
+    files (PNG, JSON, ...) are added as-is. Nothing is held in memory but one CSV chunk
+    per conversion.
+
+    Returns:
+        ``zip_path``
+    """
+    os.makedirs(os.path.dirname(zip_path), exist_ok=True)
+    scratch = tempfile.mkdtemp(dir=os.path.dirname(zip_path), prefix="export-")
+    tmp_path = f"{zip_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        files = [f for f in dict.fromkeys(session_files) if os.path.exists(os.path.join(temp_dir, f))]
+        conversions = {
+            file_name: _convert_executor.submit(
+                convert_csv_to_json, os.path.join(temp_dir, file_name), os.path.join(scratch, f"{index}.json")
+            )
+            for index, file_name in enumerate(files) if _converts_to_json(file_name)
+        }
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for file_name in files:
+                file_path = os.path.join(temp_dir, file_name)
+                if file_name in conversions:
+                    try:
+                        zip_file.write(conversions[file_name].result(), file_name.replace('.csv', '.json'))
+                    except Exception:
+                        # If conversion fails, include original CSV file
+                        zip_file.write(file_path, file_name)
+                else:
+                    zip_file.write(file_path, file_name)
+        os.replace(tmp_path, zip_path)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    _prune_exports(keep=zip_path)
+    return zip_path
+
+
+def _prune_exports(keep):
+    """Delete the least recently used archives once the export cache exceeds its size bound."""
+    archives = []
+    for entry in os.scandir(EXPORT_DIR):
+        if entry.name.endswith(".zip") and entry.path != keep:
+            stat = entry.stat()
+            archives.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in archives) + os.path.getsize(keep)
+    for _, size, path in sorted(archives):
+        if total <= EXPORT_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            continue
+
+
+def schedule_export_zip(temp_dir, session_files):
+    """
+    Start building a chat's export archive in the background, unless it is built already.
+
+    Args:
+        temp_dir: Chat work directory holding the files
+        session_files: Names of the files to export, relative to ``temp_dir``
+
+    Returns:
+        Future resolving to the archive path, or None when there is nothing to export
+    """
+    key = export_key(temp_dir, session_files)
+    if key is None:
+        return None
+    zip_path = os.path.join(EXPORT_DIR, f"{key}.zip")
+    with _builds_lock:
+        for path in [path for path, build in _builds.items() if build.done()]:
+            del _builds[path]
+        future = _builds.get(zip_path)
+        if future is None:
+            if os.path.exists(zip_path):
+                future = _build_executor.submit(lambda: zip_path)
+            else:
+                future = _build_executor.submit(build_export_zip, temp_dir, list(session_files), zip_path)
+            _builds[zip_path] = future
+    return future
+
+
+def find_export_zip(temp_dir, session_files):
+    """
+    Return the finished export archive for the current session files, or None.
+
+    Only file metadata is read, so this is cheap enough to call on every rerun.
+    """
+    key = export_key(temp_dir, session_files)
+    if key is None:
+        return None
+    zip_path = os.path.join(EXPORT_DIR, f"{key}.zip")
+    try:
+        # Mark as recently used for pruning
+        os.utime(zip_path)
+    except OSError:
+        return None
+    return zip_path
+
+
+def create_export_zip(temp_dir, session_files):
+    """
+    Create (or reuse) a ZIP file containing session files, converting CSV files to JSON format.
+
+    Returns:
+        Path of the archive on disk, or None when there is nothing to export
+    """
+    zip_path = find_export_zip(temp_dir, session_files)
+    if zip_path is not None:
+        return zip_path
+    future = schedule_export_zip(temp_dir, session_files)
+    return future.result() if future is not None else None
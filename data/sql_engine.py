@@ -0,0 +1,294 @@
+import os
+import sqlite3
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from config.constants import SQL_ENGINE, SQL_TIMEOUT_SECONDS, SQL_MEMORY_LIMIT, SQL_BATCH_ROWS
+from data.columnar import COLUMNAR_EXTENSION, find_columnar_copy
+from data.csv_reader import iter_csv_chunks
+
+try:
+    import duckdb
+except ImportError:
+    # Optional: the standard library's sqlite3 is used instead
+    duckdb = None
+
+# The dataset is queried as this table
+SQL_TABLE = "data"
+RESULT_EXTENSIONS = {".csv", ".parquet"}
+
+_builds = {}     # database path -> lock held while it is built
+_builds_lock = threading.Lock()
+
+
+class SqlError(Exception):
+    """A query was rejected, failed, timed out or was cancelled."""
+
+
+def sql_engine_name(preferred=SQL_ENGINE):
+    """
+    Resolve the configured SQL engine.
+
+    Args:
+        preferred: "duckdb", "sqlite", "auto" (DuckDB when installed) or None
+
+    Returns:
+        "duckdb", "sqlite", or None when the SQL path is disabled
+    """
+    if not preferred:
+        return None
+    if preferred == "sqlite" or duckdb is None:
+        return "sqlite"
+    return "duckdb"
+
+
+def database_path_for(dataset, engine):
+    """Path of a dataset's query database, which sits next to it in the dataset store."""
+    return os.path.splitext(dataset["path"])[0] + (".duckdb" if engine == "duckdb" else ".sqlite")
+
+
+def prepare_database(dataset, engine):
+    """
+    Load a dataset into a query database once per content, with table ``data``.
+
+    The Parquet copy is loaded when it exists (column types preserved), else the CSV.
+    Databases are written to a temporary file and renamed, and opened read-only afterwards.
+
+    Args:
+        dataset: Dict returned by the dataset store
+        engine: "duckdb" or "sqlite"
+
+    Returns:
+        Path of the database file
+    """
+    path = database_path_for(dataset, engine)
+    if os.path.exists(path):
+        return path
+    with _builds_lock:
+        lock = _builds.setdefault(path, threading.Lock())
+    with lock:
+        if os.path.exists(path):
+            return path
+        source = find_columnar_copy(dataset["path"]) or dataset["path"]
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        started = time.perf_counter()
+        try:
+            if engine == "duckdb":
+                _build_duckdb(source, tmp_path)
+            else:
+                _build_sqlite(source, tmp_path)
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, path)
+        finally:
+            # DuckDB's write-ahead log is "<db>.wal"; SQLite's side files are "<db>-journal", "-wal" and "-shm"
+            for leftover in (tmp_path, f"{tmp_path}.wal", f"{tmp_path}-journal", f"{tmp_path}-wal", f"{tmp_path}-shm"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        print(f"SQL engine: loaded {dataset['name']} into {engine} in {time.perf_counter() - started:.1f}s")
+    return path
+
+
+def _quote_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _build_duckdb(source, db_path):
+    reader = "read_parquet" if source.endswith(COLUMNAR_EXTENSION) else "read_csv_auto"
+    con = duckdb.connect(db_path)
+    try:
+        con.execute(f"CREATE TABLE {SQL_TABLE} AS SELECT * FROM {reader}({_quote_literal(source)})")
+        con.execute("CHECKPOINT")
+    finally:
+        con.close()
+
+
+def _build_sqlite(source, db_path):
+    if source.endswith(COLUMNAR_EXTENSION):
+        chunks = (batch.to_pandas() for batch in pq.ParquetFile(source).iter_batches(batch_size=SQL_BATCH_ROWS))
+    else:
+        chunks = iter_csv_chunks(source, SQL_BATCH_ROWS)
+    con = sqlite3.connect(db_path)
+    try:
+        for chunk in chunks:
+            chunk.to_sql(SQL_TABLE, con, if_exists="append", index=False)
+        con.commit()
+    finally:
+        con.close()
+
+
+# --- Sandboxed connections ---
+# Queries run in the app process but can only read the dataset's database: it is opened
+# read-only, DuckDB cannot touch files, the network or extensions, SQLite only allows
+# reading statements, and every query is interrupted after ``SQL_TIMEOUT_SECONDS``.
+_SQLITE_ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+
+def _sqlite_authorizer(action, *_):
+    return sqlite3.SQLITE_OK if action in _SQLITE_ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def connect(db_path, engine):
+    """Open a sandboxed, read-only connection to a query database."""
+    if engine == "duckdb":
+        return duckdb.connect(db_path, read_only=True, config={
+            "enable_external_access": False,
+            "autoinstall_known_extensions": False,
+            "autoload_known_extensions": False,
+            "memory_limit": SQL_MEMORY_LIMIT,
+            "lock_configuration": True,
+        })
+    con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+    con.set_authorizer(_sqlite_authorizer)
+    return con
+
+
+def _duckdb_batches(con, sql):
+    reader = con.execute(sql).fetch_record_batch(SQL_BATCH_ROWS)
+    yield reader.schema
+    yield from reader
+
+
+class _SchemaWidened(Exception):
+    """A later SQLite batch needs wider column types than the ones already written."""
+
+    def __init__(self, schema):
+        super().__init__(str(schema))
+        self.schema = schema
+
+
+def _widen(current, values):
+    """
+    Type a column needs to hold values of type ``current`` and ``values``.
+
+    SQLite columns are dynamically typed: NULLs widen to the first type seen, integers
+    to reals, and anything else mixed falls back to text.
+    """
+    try:
+        new = pa.array(values).type
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.string()
+    if pa.types.is_null(new) or current == new:
+        return current
+    if pa.types.is_null(current):
+        return new
+    if {current, new} <= {pa.int64(), pa.float64()}:
+        return pa.float64()
+    return pa.string()
+
+
+def _sqlite_array(values, type):
+    if pa.types.is_string(type):
+        values = [value if value is None or isinstance(value, str) else str(value) for value in values]
+    return pa.array(values, type=type)
+
+
+def _sqlite_batches(con, sql, schema=None):
+    """
+    Stream a SQLite result as record batches, after its schema.
+
+    Column types come from ``schema`` or the first batch. A later batch that does not fit
+    raises ``_SchemaWidened`` with the types the whole result needs, so the caller can
+    start over with them.
+    """
+    cursor = con.execute(sql)
+    names = [column[0] for column in cursor.description or ()]
+    first = True
+    while True:
+        rows = cursor.fetchmany(SQL_BATCH_ROWS)
+        if not rows and not first:
+            return
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        types = [pa.null()] * len(names) if schema is None else schema.types
+        widened = pa.schema([(name, _widen(type, column)) for name, type, column in zip(names, types, columns)])
+        if first:
+            schema = widened
+            yield schema
+            first = False
+        elif not widened.equals(schema):
+            raise _SchemaWidened(widened)
+        batch = pa.RecordBatch.from_arrays([_sqlite_array(column, field.type) for column, field in zip(columns, schema)],
+                                           schema=schema)
+        if batch.num_rows:
+            yield batch
+
+
+def _write_result(con, engine, sql, tmp_path, output_path, keep_rows, schema=None):
+    batches = _duckdb_batches(con, sql) if engine == "duckdb" else _sqlite_batches(con, sql, schema)
+    schema = next(batches)
+    kept = []
+    kept_rows = 0
+    rows = 0
+    with _open_writer(tmp_path, output_path, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+            if kept_rows < keep_rows:
+                kept.append(batch.slice(0, keep_rows - kept_rows))
+                kept_rows += kept[-1].num_rows
+    return pa.Table.from_batches(kept, schema=schema), rows
+
+
+def _open_writer(path, output_path, schema):
+    """Writer for ``path`` in the format of ``output_path``'s extension."""
+    if output_path.lower().endswith(".parquet"):
+        return pq.ParquetWriter(path, schema)
+    return pa_csv.CSVWriter(path, schema)
+
+
+def run_query(db_path, engine, sql, output_path, keep_rows, timeout=SQL_TIMEOUT_SECONDS, on_connect=None):
+    """
+    Run one query against a dataset's database and stream the result to a file.
+
+    The result is written batch by batch (CSV or Parquet, by ``output_path``'s extension),
+    so its size does not matter; only the first ``keep_rows`` rows are kept in memory.
+    A SQLite result whose column types change after the first batch is written again
+    with the widened types.
+
+    Args:
+        db_path: Database returned by ``prepare_database``
+        engine: "duckdb" or "sqlite"
+        sql: A single query over table ``data``
+        output_path: File the full result is written to
+        keep_rows: Rows of the result to return
+        timeout: Seconds after which the query is interrupted
+        on_connect: Called with a function interrupting the query (e.g. to wire up cancellation)
+
+    Returns:
+        Tuple of (first rows as an Arrow table, total row count)
+
+    Raises:
+        SqlError: The query was rejected, failed or interrupted
+    """
+    con = connect(db_path, engine)
+    timer = threading.Timer(timeout, con.interrupt)
+    timer.daemon = True
+    timer.start()
+    if on_connect is not None:
+        on_connect(con.interrupt)
+    tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        schema = None
+        while True:
+            try:
+                table, rows = _write_result(con, engine, sql, tmp_path, output_path, keep_rows, schema)
+                break
+            except _SchemaWidened as e:
+                # Types only widen, so this restarts a few times at most
+                schema = e.schema
+        os.replace(tmp_path, output_path)
+        return table, rows
+    except Exception as e:
+        if isinstance(e, (sqlite3.Error, pa.ArrowException)) or (duckdb is not None and isinstance(e, duckdb.Error)):
+            if not timer.is_alive():
+                raise SqlError(f"Query interrupted after {timeout}s or cancelled") from e
+            raise SqlError(str(e)) from e
+        raise
+    finally:
+        timer.cancel()
+        con.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
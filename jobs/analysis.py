@@ -0,0 +1,156 @@
+import asyncio
+
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import TextMessage, ModelClientStreamingChunkEvent
+
+from agents.model_context import trim_team_state
+from agents.query_clarity_agent import get_csv_info
+from config.artifact_manifest import ManifestCodeExecutor, ManifestRecorder
+from config.cached_executor import CachingCodeExecutor
+from config.constants import STATEFUL_KERNEL_DOCKER, STREAM_MODEL_OUTPUT, COMPACT_MODEL_CONTEXT
+from config.container_pool import get_container_pool
+from config.kernel_executor import KernelCodeExecutor
+from config.sql_executor import SqlCodeExecutor
+from data.columnar import ensure_columnar
+from data.sql_engine import sql_engine_name
+from models.openai_model_client import get_model_client
+from sessions.workspaces import QuotaCodeExecutor, get_workspace_manager
+from telemetry.instrumentation import TracingChatCompletionClient, TracingCodeExecutor
+from telemetry.tracing import get_tracer
+from teams.analyzer_gpt import getDataAnalyzerTeam
+
+ANALYZER_AGENT = "Data_Analyzer_agent"
+EXECUTOR_AGENT = "Python_Code_Executor"
+
+PROGRESS_STEPS = [
+    "🔄 Initializing analysis...",
+    "📊 Data Analyzer is planning the approach...",
+    "🐍 Executing Python code...",
+    "📈 Processing results...",
+    "✅ Analysis complete!"
+]
+
+
+async def run_analysis(job, dataset, question, chat_id=None, team_state=None, model_client=None, container_pool=None):
+    """
+    Run one analysis with the agent team; meant to be submitted to the job queue.
+
+    Progress steps, completed agent messages and streamed analyzer tokens are reported
+    on ``job`` so a UI can poll them while the run continues in the background. The run
+    is traced under ``job.id`` (see telemetry/tracing.py).
+
+    Args:
+        job: Job receiving progress events (see jobs/job_queue.py)
+        dataset: Dict returned by the dataset store
+        question: User's question
+        chat_id: Chat the run belongs to; its container and kernel are preferred, and its
+            workspace (see sessions/workspaces.py) is the run's working directory
+        team_state: Saved team state from the chat's previous run, if any
+        model_client: Model client to use instead of ``get_model_client()``
+        container_pool: Pool to lease the sandbox from instead of ``get_container_pool()``
+
+    Returns:
+        Dict with ``final_analyzer_message``, the new ``team_state``, ``stop_reason``, the dataset ``columns``,
+        the ``artifacts`` written by the run (manifest entries, see config/artifact_tracker.py), the
+        ``work_dir`` they are relative to and the ``trace_id``
+    """
+    with get_tracer().span("analysis", trace_id=job.id, chat_id=chat_id, dataset=dataset["name"],
+                           resumed=team_state is not None) as span:
+        result = await _run_analysis(job, span, dataset, question, chat_id, team_state, model_client, container_pool)
+        span.set(stop_reason=result["stop_reason"])
+    return dict(result, trace_id=job.id)
+
+
+async def _run_analysis(job, span, dataset, question, chat_id, team_state, model_client, container_pool):
+    job.emit("progress", step=PROGRESS_STEPS[0])
+    model_client = TracingChatCompletionClient(model_client or get_model_client())
+
+    with get_tracer().span("dataset.prepare") as prepare_span:
+        # Point the analysis at the Parquet copy when the conversion is ready (falls back to the CSV)
+        columnar_dataset = await asyncio.to_thread(ensure_columnar, dataset)
+        data_path = columnar_dataset["columnar_container_path"] or dataset["container_path"]
+        prepare_span.set(columnar=bool(columnar_dataset["columnar_container_path"]))
+        # The only dataset files the sandbox gets to see (read-only)
+        dataset_files = [path for path in (dataset["path"], columnar_dataset["columnar_path"]) if path]
+
+        # Get CSV info to provide column context
+        csv_info = await asyncio.to_thread(get_csv_info, dataset["path"])
+    column_info = f"CSV COLUMNS: {csv_info['columns']}\nSAMPLE DATA:\n{csv_info['sample_data']}\n\n"
+    full_task = f"{column_info}Using the data from '{data_path}' (uploaded as '{dataset['name']}'), {question}"
+
+    # Code runs in the chat's own workspace, which is kept from collection while the run lasts
+    workspaces = get_workspace_manager()
+    session_id = chat_id or job.id
+    with workspaces.pin(session_id) as work_dir:
+        return await _run_in_workspace(job, span, dataset, full_task, data_path, dataset_files, csv_info, chat_id,
+                                       session_id, work_dir, team_state, model_client, container_pool, workspaces)
+
+
+async def _run_in_workspace(job, span, dataset, full_task, data_path, dataset_files, csv_info, chat_id, session_id,
+                            work_dir, team_state, model_client, container_pool, workspaces):
+    # Lease a container that mounts only this chat's workspace (and its dataset), preferring
+    # the one that already hosts this chat's kernel
+    container_pool = container_pool or get_container_pool()
+    docker = await container_pool.acquire(affinity=chat_id, work_dir=work_dir, datasets=dataset_files)
+    try:
+        # Executions report the files they wrote, so nobody has to diff the work dir
+        if STATEFUL_KERNEL_DOCKER:
+            # Dataset is parsed once per chat and kept in memory as `df`
+            code_executor = KernelCodeExecutor(docker, chat_id, dataset_file=data_path)
+            await code_executor.start()
+        else:
+            code_executor = ManifestCodeExecutor(docker)
+        # Identical code on unchanged inputs is answered from the execution cache
+        code_executor = CachingCodeExecutor(code_executor, work_dir, stateful=STATEFUL_KERNEL_DOCKER, dataset_file=data_path)
+        # sql blocks are answered in-process by an embedded engine over the dataset
+        sql_engine = sql_engine_name()
+        if sql_engine:
+            code_executor = SqlCodeExecutor(code_executor, dataset, work_dir, sql_engine)
+        code_executor = QuotaCodeExecutor(code_executor, session_id, workspaces)
+        recorder = ManifestRecorder(code_executor)
+        code_executor = TracingCodeExecutor(recorder)
+        team = getDataAnalyzerTeam(code_executor, model_client, stateful_kernel=STATEFUL_KERNEL_DOCKER,
+                                   stream=STREAM_MODEL_OUTPUT, compact_context=COMPACT_MODEL_CONTEXT,
+                                   sql_engine=sql_engine)
+
+        # Load previous state if it exists
+        if team_state:
+            await team.load_state(team_state)
+
+        current_step = 0
+        final_analyzer_message = None
+        stop_reason = None
+        async for message in team.run_stream(task=full_task, cancellation_token=job.cancellation_token):
+            if isinstance(message, ModelClientStreamingChunkEvent):
+                job.stream(message.full_message_id, message.content)
+
+            elif isinstance(message, TextMessage) and message.source != "user":
+                if message.source == ANALYZER_AGENT:
+                    # Clean the analyzer message by removing "STOP" and extra whitespace
+                    final_analyzer_message = message.content.replace("STOP", "").strip()
+                    job.clear_stream()
+                if message.source in (ANALYZER_AGENT, EXECUTOR_AGENT):
+                    current_step = min(current_step + 1, len(PROGRESS_STEPS) - 2)
+                usage = message.models_usage
+                span.event("message", source=message.source, chars=len(message.content),
+                           prompt_tokens=usage.prompt_tokens if usage else 0,
+                           completion_tokens=usage.completion_tokens if usage else 0)
+                job.emit("message", source=message.source, content=message.content,
+                         models_usage=usage.model_dump() if usage else None)
+                job.emit("progress", step=PROGRESS_STEPS[current_step])
+
+            elif isinstance(message, TaskResult):
+                stop_reason = message.stop_reason
+
+        job.emit("progress", step=PROGRESS_STEPS[-1])
+        new_team_state = await team.save_state()
+        return {
+            "final_analyzer_message": final_analyzer_message,
+            "team_state": trim_team_state(new_team_state) if COMPACT_MODEL_CONTEXT else new_team_state,
+            "stop_reason": stop_reason,
+            "columns": csv_info["columns"],
+            "artifacts": recorder.artifacts,
+            "work_dir": work_dir,
+        }
+    finally:
+        await container_pool.release(docker, affinity=chat_id)
@@ -0,0 +1,164 @@
+import asyncio
+import csv
+import json
+import os
+import re
+import shutil
+import time
+
+from config.constants import POOL_MIN_SIZE_DOCKER
+from config.container_pool import ContainerPool
+from data.columnar import schedule_conversion
+from data.dataset_store import store_file
+from jobs.analysis import run_analysis
+from jobs.job_queue import Job
+from models.openai_model_client import get_model_client
+from sessions.workspaces import get_workspace_manager
+from telemetry.tracing import get_tracer
+
+RESULTS_FILE = "results.jsonl"
+
+
+def load_tasks(tasks_file):
+    """
+    Read batch tasks from a JSONL or CSV file.
+
+    Every task needs ``dataset`` (path, relative to the tasks file unless absolute) and
+    ``question``; an optional ``id`` names the task's output folder.
+
+    Args:
+        tasks_file: Path to a ``.jsonl`` or ``.csv`` file
+
+    Returns:
+        List of dicts with ``id``, ``dataset`` (absolute path) and ``question``
+    """
+    if tasks_file.endswith(".csv"):
+        with open(tasks_file, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(tasks_file, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    base_dir = os.path.dirname(os.path.abspath(tasks_file))
+    tasks = []
+    for index, row in enumerate(rows, start=1):
+        if not row.get("dataset") or not row.get("question"):
+            raise ValueError(f"Task {index} in {tasks_file} needs both 'dataset' and 'question'")
+        task_id = re.sub(r"[^\w.-]", "_", str(row.get("id") or f"task_{index:05d}"))
+        tasks.append({
+            "id": task_id,
+            "dataset": os.path.join(base_dir, row["dataset"]),
+            "question": row["question"],
+        })
+    if len({task["id"] for task in tasks}) != len(tasks):
+        raise ValueError(f"Task ids in {tasks_file} must be unique")
+    return tasks
+
+
+async def _run_task(task, slots, container_pool, model_client, output_dir):
+    queued_at = time.perf_counter()
+    async with slots:
+        started_at = time.perf_counter()
+        job = Job(task["id"], chat_id=f"batch-{task['id']}", meta=task)
+        record = {"id": task["id"], "dataset": task["dataset"], "question": task["question"]}
+        written = []
+        try:
+            dataset = await asyncio.to_thread(store_file, task["dataset"])
+            schedule_conversion(dataset)
+            result = await run_analysis(
+                job, dataset, task["question"],
+                chat_id=job.chat_id, model_client=model_client, container_pool=container_pool
+            )
+            record.update(
+                status="done" if result["stop_reason"] else "incomplete",
+                final_analyzer_message=result["final_analyzer_message"],
+                stop_reason=result["stop_reason"],
+            )
+            written = result["artifacts"]
+        except Exception as e:
+            record.update(status="failed", error=str(e))
+        finished_at = time.perf_counter()
+
+    artifacts = []
+    task_dir = os.path.join(output_dir, task["id"])
+    # Every task runs in its own workspace; the files its executions reported writing are
+    # moved out (see config/artifact_tracker.py) and the workspace is removed.
+    workspaces = get_workspace_manager()
+    work_dir = workspaces.path(job.chat_id)
+    with get_tracer().span("artifacts.scan", trace_id=job.id, source="manifest") as span:
+        for entry in written:
+            source = os.path.join(work_dir, entry["name"])
+            if os.path.isfile(source):
+                destination = os.path.join(task_dir, entry["name"])
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                shutil.move(source, destination)
+                artifacts.append(os.path.join(task["id"], entry["name"]))
+        span.set(files=len(artifacts))
+    workspaces.remove(job.chat_id)
+
+    events, _ = job.events_since(0)
+    messages = [event for event in events if event["kind"] == "message"]
+    summary = get_tracer().run_summary(job.id) or {}
+    record.update(
+        artifacts=artifacts,
+        timings={
+            "queued_s": round(started_at - queued_at, 3),
+            "run_s": round(finished_at - started_at, 3),
+            "total_s": round(finished_at - queued_at, 3),
+            "messages": len(messages),
+            "model_s": round(summary.get("model_seconds", 0), 3),
+            "execution_s": round(summary.get("execution_seconds", 0), 3),
+            "prompt_tokens": summary.get("prompt_tokens", 0),
+            "completion_tokens": summary.get("completion_tokens", 0),
+        },
+    )
+    return record
+
+
+async def run_batch(tasks_file, output_dir, concurrency=None):
+    """
+    Run every task in ``tasks_file`` with at most ``concurrency`` teams and containers at once.
+
+    Results are appended to ``<output_dir>/results.jsonl`` as tasks finish (one line per
+    task with status, final analysis, artifacts and timings); artifacts are moved into
+    ``<output_dir>/<task id>/``.
+
+    Args:
+        tasks_file: JSONL or CSV task list (see ``load_tasks``)
+        output_dir: Directory receiving results and artifacts
+        concurrency: Maximum simultaneous analyses (defaults to the CPU count)
+
+    Returns:
+        List of result records in completion order
+    """
+    tasks = load_tasks(tasks_file)
+    concurrency = max(1, concurrency or os.cpu_count() or 1)
+    os.makedirs(output_dir, exist_ok=True)
+
+    container_pool = ContainerPool(min_size=min(POOL_MIN_SIZE_DOCKER, concurrency), max_size=concurrency)
+    container_pool.start()
+    model_client = get_model_client()
+    slots = asyncio.Semaphore(concurrency)
+    batch_started = time.perf_counter()
+
+    records = []
+    try:
+        with open(os.path.join(output_dir, RESULTS_FILE), "a", encoding="utf-8") as results:
+            pending = [
+                asyncio.ensure_future(_run_task(task, slots, container_pool, model_client, output_dir))
+                for task in tasks
+            ]
+            for finished in asyncio.as_completed(pending):
+                record = await finished
+                records.append(record)
+                results.write(json.dumps(record) + "\n")
+                results.flush()
+                print(f"[{len(records)}/{len(tasks)}] {record['id']}: {record['status']} "
+                      f"in {record['timings']['run_s']}s")
+    finally:
+        await asyncio.to_thread(container_pool.shutdown)
+
+    failed = sum(record["status"] != "done" for record in records)
+    print(f"Batch finished: {len(records) - failed} done, {failed} not done, "
+          f"{time.perf_counter() - batch_started:.1f}s with concurrency {concurrency}")
+    return records
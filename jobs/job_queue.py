@@ -0,0 +1,262 @@
+import asyncio
+import atexit
+import threading
+import time
+import traceback
+import uuid
+
+from autogen_core import CancellationToken
+
+from config.constants import JOB_MAX_CONCURRENT, JOB_HISTORY_LIMIT
+from telemetry.tracing import get_tracer
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = {DONE, FAILED, CANCELLED}
+
+
+class Job:
+    """
+    One unit of background work plus everything a UI needs to poll it.
+
+    The job function reports through ``emit`` (discrete events such as progress steps or
+    completed messages) and ``stream`` (model tokens, folded into ``live_text`` so pollers
+    do not have to replay thousands of events). All accessors are thread-safe.
+    """
+
+    def __init__(self, job_id, chat_id=None, meta=None):
+        self.id = job_id
+        self.chat_id = chat_id
+        self.meta = meta or {}
+        self.status = QUEUED
+        self.progress = ""
+        self.live_text = ""
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancellation_token = CancellationToken()
+
+        self._events = []
+        self._live_message_id = None
+        self._lock = threading.Lock()
+        self._task = None
+        self._loop = None
+
+    @property
+    def done(self):
+        return self.status in FINISHED_STATES
+
+    def emit(self, kind, **data):
+        """Record an event; a ``progress`` event also updates ``progress``."""
+        with self._lock:
+            self._events.append(dict(data, kind=kind, time=time.time()))
+            if kind == "progress":
+                self.progress = data.get("step", "")
+
+    def stream(self, message_id, content):
+        """Append a streamed token to ``live_text``, starting over when a new message begins."""
+        with self._lock:
+            if message_id != self._live_message_id:
+                self._live_message_id, self.live_text = message_id, ""
+            self.live_text += content
+
+    def clear_stream(self):
+        with self._lock:
+            self._live_message_id, self.live_text = None, ""
+
+    def events_since(self, cursor=0):
+        """
+        Return events recorded after ``cursor`` and the cursor to pass next time.
+
+        Args:
+            cursor: Number of events already seen
+
+        Returns:
+            Tuple of (list of event dicts, new cursor)
+        """
+        with self._lock:
+            return list(self._events[cursor:]), len(self._events)
+
+    def snapshot(self):
+        """Return a plain-dict view of the job's current state."""
+        with self._lock:
+            return {
+                "id": self.id,
+                "chat_id": self.chat_id,
+                "status": self.status,
+                "progress": self.progress,
+                "live_text": self.live_text,
+                "events": len(self._events),
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+    def cancel(self):
+        """Request cancellation; a queued job never starts, a running one is interrupted."""
+        if self._loop is None or self.done:
+            return
+        self._loop.call_soon_threadsafe(self._cancel_on_loop)
+
+    def _cancel_on_loop(self):
+        self.cancellation_token.cancel()
+        if self._task is not None:
+            self._task.cancel()
+
+
+class JobQueue:
+    """
+    Runs submitted coroutine functions on a dedicated event loop thread with a global concurrency limit.
+
+    Like ``ContainerPool``, the queue owns its loop, so jobs keep running across
+    Streamlit reruns and chat switches; the UI only polls ``Job`` objects by id.
+    """
+
+    def __init__(self, max_concurrent=JOB_MAX_CONCURRENT, history_limit=JOB_HISTORY_LIMIT):
+        if max_concurrent < 1:
+            raise ValueError(f"Invalid concurrency limit: {max_concurrent}")
+        self.max_concurrent = max_concurrent
+        self.history_limit = history_limit
+
+        self._jobs = {}           # job id -> Job, in submission order
+        self._jobs_lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._slots = None
+        self._closed = False
+        self._start_lock = threading.Lock()
+
+    # --- Lifecycle ---
+    def start(self):
+        """Start the queue's loop thread."""
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="analysis-jobs", daemon=True)
+            self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._init_on_loop(), self._loop).result()
+
+    def shutdown(self):
+        """Cancel outstanding jobs and stop the loop. Safe to call more than once."""
+        if self._loop is None or self._closed:
+            return
+        self._closed = True
+        for job in self.jobs():
+            job.cancel()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    # --- Jobs ---
+    def submit(self, fn, *args, chat_id=None, meta=None, job_id=None, **kwargs):
+        """
+        Queue ``fn(job, *args, **kwargs)`` to run in the background.
+
+        Args:
+            fn: Coroutine function; its return value becomes ``job.result``
+            chat_id: Optional owner used by ``jobs(chat_id=...)``
+            meta: Free-form data the submitter wants back when the job finishes
+            job_id: Explicit id (a random one is generated otherwise)
+
+        Returns:
+            The queued Job
+        """
+        if self._loop is None:
+            self.start()
+        if self._closed:
+            raise RuntimeError("Job queue has been shut down")
+
+        job = Job(job_id or uuid.uuid4().hex, chat_id=chat_id, meta=meta)
+        job._loop = self._loop
+        with self._jobs_lock:
+            if job.id in self._jobs:
+                raise ValueError(f"Duplicate job id: {job.id}")
+            self._jobs[job.id] = job
+            self._prune()
+        job.emit("progress", step="⏳ Waiting for a free analysis slot...")
+        self._loop.call_soon_threadsafe(self._schedule, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        """Return the job with this id, or None if it is unknown or was pruned."""
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, chat_id=None):
+        """Return known jobs (optionally only those of one chat), oldest first."""
+        with self._jobs_lock:
+            return [job for job in self._jobs.values() if chat_id is None or job.chat_id == chat_id]
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def stats(self):
+        """Return job counts by status."""
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0, CANCELLED: 0}
+        for job in self.jobs():
+            counts[job.status] += 1
+        return dict(counts, max_concurrent=self.max_concurrent)
+
+    # --- Internals (run on the queue loop) ---
+    async def _init_on_loop(self):
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+
+    def _schedule(self, job, fn, args, kwargs):
+        job._task = asyncio.ensure_future(self._run(job, fn, args, kwargs))
+
+    async def _run(self, job, fn, args, kwargs):
+        try:
+            async with self._slots:
+                if job.cancellation_token.is_cancelled():
+                    raise asyncio.CancelledError()
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.result = await fn(job, *args, **kwargs)
+                job.status = DONE
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = f"{e}"
+            job.emit("error", message=str(e), traceback=traceback.format_exc())
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            job.clear_stream()
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond ``history_limit`` (caller holds the lock)."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.history_limit)]:
+            del self._jobs[job_id]
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    Return the process-wide analysis job queue, starting it on first use.
+
+    Returns:
+        JobQueue shared by every chat and browser session in this process
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+            _queue.start()
+            atexit.register(_queue.shutdown)
+            get_tracer().register_gauge(
+                "analyzer_jobs", "Known analysis jobs by status.",
+                lambda: {(("status", status),): _queue.stats()[status] for status in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)},
+            )
+        return _queue
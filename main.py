@@ -1,29 +1,76 @@
+import argparse
 import asyncio
+import os
+import uuid
 from models.openai_model_client import get_model_client
-from teams.analyzer_gpt import getDataAnalyzerTeam
-from config.docker_utils import getDockerCommandLineExecutor,start_docker_container,stop_docker_container
-from autogen_agentchat.messages import TextMessage
+from config.container_pool import get_container_pool
+from data.columnar import schedule_conversion
+from data.dataset_store import store_file
+from jobs.analysis import run_analysis
+from jobs.batch import run_batch
+from jobs.job_queue import Job
+from telemetry.tracing import get_tracer
 
-async def main():
+DEFAULT_DATASET = 'temp/titanic.csv'
+DEFAULT_QUESTION = 'Can you give me the graph of  no.of people died and survived from the data of titanic.csv and save it as output.png '
 
-    openai_model_client = get_model_client()
-    docker = getDockerCommandLineExecutor()
 
-    team = getDataAnalyzerTeam(docker,openai_model_client)
+async def main(dataset_file=DEFAULT_DATASET, question=DEFAULT_QUESTION):
+
+    model_client = get_model_client()
+    container_pool = get_container_pool()
 
     try:
-        task = 'Can you give me the graph of  no.of people died and survived from the data of titanic.csv and save it as output.png '
+        # Same path as a batch task (jobs/batch.py): the dataset goes through the store and the
+        # run gets the chat workspace, executor chain and container lease that run_analysis builds
+        job = Job(uuid.uuid4().hex, chat_id=f"cli-{uuid.uuid4().hex[:8]}")
+        dataset = await asyncio.to_thread(store_file, dataset_file)
+        schedule_conversion(dataset)
+        run = asyncio.ensure_future(run_analysis(
+            job, dataset, question,
+            chat_id=job.chat_id, model_client=model_client, container_pool=container_pool
+        ))
 
-        await start_docker_container(docker)
+        # Print the agents' messages as the run reports them
+        cursor = 0
+        while True:
+            finished = run.done()
+            events, cursor = job.events_since(cursor)
+            for event in events:
+                if event["kind"] == "message":
+                    print(f"---------- {event['source']} ----------\n{event['content']}")
+            if finished:
+                break
+            await asyncio.sleep(0.2)
+        result = run.result()
 
-        async for message in team.run_stream(task=task):
-            print(message)
+        print(f"Stop reason: {result['stop_reason']}")
+        for entry in result["artifacts"]:
+            print(f"Wrote {os.path.join(result['work_dir'], entry['name'])}")
+        summary = get_tracer().run_summary(result['trace_id'])
+        print(f"Run stats: {summary['wall_seconds']:.1f}s total, {summary['model_calls']} model calls "
+              f"({summary['prompt_tokens']} prompt / {summary['completion_tokens']} completion tokens), "
+              f"{summary['execution_seconds']:.1f}s executing code")
 
     except Exception as e:
         print(e)
     finally:
-        await stop_docker_container(docker)
+        container_pool.shutdown()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Agentic Data Analyzer CLI')
+    parser.add_argument('--dataset', default=DEFAULT_DATASET, help='Dataset to analyze in single-task mode')
+    parser.add_argument('--question', default=DEFAULT_QUESTION, help='Question to ask about the dataset in single-task mode')
+    parser.add_argument('--batch', metavar='TASKS', help='JSONL or CSV file of (dataset, question) tasks to run')
+    parser.add_argument('--output-dir', default='batch_results', help='Where batch results and artifacts are written')
+    parser.add_argument('--concurrency', type=int, default=None, help='Maximum analyses running at once (default: CPU count)')
+    return parser.parse_args()
 
 
 if(__name__=='__main__'):
-    asyncio.run(main())
\ No newline at end of file
+    args = parse_args()
+    if args.batch:
+        asyncio.run(run_batch(args.batch, args.output_dir, args.concurrency))
+    else:
+        asyncio.run(main(args.dataset, args.question))
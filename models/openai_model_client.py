@@ -1,5 +1,6 @@
 from autogen_ext.models.openai import OpenAIChatCompletionClient
-from config.constants import MODEL_GEMINI
+from config.constants import MODEL_GEMINI, MODEL_CASSETTE_DIR
+from models.record_replay_client import RecordReplayChatCompletionClient, RECORD, REPLAY
 from dotenv import load_dotenv
 import os
 
@@ -7,6 +8,12 @@ load_dotenv()
 
 api_key = os.getenv('GOOGLE_API_KEY')
 
+# Record real model traffic to a cassette, or replay one offline: MODEL_CASSETTE_MODE=record|replay
+cassette_mode = os.getenv('MODEL_CASSETTE_MODE', '').lower()
+cassette_path = os.getenv('MODEL_CASSETTE', os.path.join(MODEL_CASSETTE_DIR, 'default.jsonl'))
+# Fraction of the recorded latency to simulate when replaying (0 = full speed)
+replay_latency = float(os.getenv('MODEL_REPLAY_LATENCY', '0'))
+
 
 model_info={
         "json_output": True,
@@ -18,10 +25,16 @@ model_info={
 
 
 def get_model_client():
+    if cassette_mode == REPLAY:
+        return RecordReplayChatCompletionClient(REPLAY, cassette_path, model_info=model_info, latency_scale=replay_latency)
+
     openai_model_client = OpenAIChatCompletionClient(
         model=MODEL_GEMINI,
         api_key=api_key,
         model_info = model_info 
     )
 
+    if cassette_mode == RECORD:
+        return RecordReplayChatCompletionClient(RECORD, cassette_path, client=openai_model_client)
+
     return openai_model_client
@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+from autogen_core.models import ChatCompletionClient, CreateResult, RequestUsage
+
+RECORD = "record"
+REPLAY = "replay"
+
+_cassette_locks = {}
+_cassette_locks_lock = threading.Lock()
+_replayed = {}   # (cassette path, size, mtime) -> indexes of the entries already replayed
+
+
+def _cassette_lock(path):
+    # Several jobs may record through different client instances into the same cassette.
+    with _cassette_locks_lock:
+        return _cassette_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def _replayed_entries(path):
+    """
+    Entries of a cassette already replayed in this process, shared by every client replaying it.
+
+    Each chat turn creates its own client, so per-client state would replay the first
+    turn's recordings again on the next one.
+    """
+    stat = os.stat(path)
+    with _cassette_locks_lock:
+        return _replayed.setdefault((os.path.abspath(path), stat.st_size, stat.st_mtime_ns), set())
+
+
+def _request_payload(messages, tools, json_output, extra_create_args):
+    return {
+        "messages": [message.model_dump(mode="json") for message in messages],
+        "tools": [getattr(tool, "name", None) or tool.get("name") for tool in tools],
+        "json_output": json_output if isinstance(json_output, (bool, type(None))) else json_output.__name__,
+        "extra_create_args": {key: repr(value) for key, value in sorted(extra_create_args.items())},
+    }
+
+
+def _request_key(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _caller_key(payload):
+    """Identify the agent behind a request by its system message and tools."""
+    first = payload["messages"][0] if payload["messages"] else None
+    system = first if first is not None and first.get("type") == "SystemMessage" else None
+    return _request_key({"system": system, "tools": payload["tools"]})
+
+
+class RecordReplayChatCompletionClient(ChatCompletionClient):
+    """
+    Model client wrapper that records model traffic to a cassette file or replays it offline.
+
+    In ``record`` mode every ``create``/``create_stream`` call is forwarded to the wrapped
+    client and appended to the cassette (JSONL) with the request, the final result including
+    usage, the streamed chunks and the observed latency. In ``replay`` mode no wrapped client
+    is needed: a request is answered by the recorded entry with the same request hash, or,
+    when the conversation drifted (e.g. different execution output), by the next unused entry
+    of the same agent (same system message and tools) in recorded order. Which entries were
+    used is shared by all clients replaying the cassette, so a later chat turn continues
+    where the previous one stopped. An identical request is answered again from its
+    recording even when that was used already (the conversation is replayed once more), and
+    once an agent's recordings are all used its fallback starts over from the first. Replays run at full speed unless ``latency_scale`` is set, which
+    sleeps for the recorded latency multiplied by that factor.
+    """
+
+    def __init__(self, mode, cassette_path, client=None, model_info=None, latency_scale=0.0):
+        """
+        Args:
+            mode: ``"record"`` or ``"replay"``
+            cassette_path: JSONL file holding the recorded calls
+            client: Wrapped client (required when recording)
+            model_info: Model info to report when replaying without a wrapped client
+            latency_scale: Fraction of the recorded latency to simulate on replay (0 = none)
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == RECORD and client is None:
+            raise ValueError("Recording needs a model client to forward requests to")
+        self.mode = mode
+        self.cassette_path = cassette_path
+        self.latency_scale = latency_scale
+        self._client = client
+        self._model_info = model_info if model_info is not None else client.model_info
+        self._actual_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self._total_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+        self._entries = []
+        self._by_key = {}
+        self._by_caller = {}
+        self._used = set()
+        if mode == REPLAY:
+            self._load()
+
+    # --- Cassette ---
+    def _load(self):
+        self._used = _replayed_entries(self.cassette_path)
+        with open(self.cassette_path, encoding="utf-8") as f:
+            self._entries = [json.loads(line) for line in f if line.strip()]
+        for index, entry in enumerate(self._entries):
+            self._by_key.setdefault(entry["key"], []).append(index)
+            self._by_caller.setdefault(_caller_key(entry["request"]), []).append(index)
+
+    def _next_entry(self, key, caller):
+        """Pick the recorded call for this request: exact match first, then the caller's recorded order."""
+        with _cassette_lock(self.cassette_path):
+            exact = self._by_key.get(key, [])
+            index = next((i for i in exact if i not in self._used), exact[0] if exact else None)
+            if index is None:
+                entries = self._by_caller.get(caller, [])
+                index = next((i for i in entries if i not in self._used), None)
+                if index is None and entries:
+                    # Every recording of this agent was replayed: start a new pass over them
+                    self._used.difference_update(entries)
+                    index = entries[0]
+                if index is None:
+                    raise RuntimeError(f"Cassette {self.cassette_path} has no recordings for this agent")
+            self._used.add(index)
+            return self._entries[index]
+
+    def _append(self, entry):
+        directory = os.path.dirname(self.cassette_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with _cassette_lock(self.cassette_path), open(self.cassette_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def _add_usage(self, usage):
+        self._actual_usage = RequestUsage(
+            prompt_tokens=self._actual_usage.prompt_tokens + usage.prompt_tokens,
+            completion_tokens=self._actual_usage.completion_tokens + usage.completion_tokens,
+        )
+        self._total_usage = RequestUsage(
+            prompt_tokens=self._total_usage.prompt_tokens + usage.prompt_tokens,
+            completion_tokens=self._total_usage.completion_tokens + usage.completion_tokens,
+        )
+
+    async def _simulate(self, seconds):
+        if self.latency_scale and seconds:
+            await asyncio.sleep(seconds * self.latency_scale)
+
+    # --- ChatCompletionClient ---
+    async def create(self, messages, *, tools=[], tool_choice="auto", json_output=None,
+                     extra_create_args={}, cancellation_token=None):
+        payload = _request_payload(messages, tools, json_output, extra_create_args)
+        key = _request_key(payload)
+
+        if self.mode == REPLAY:
+            entry = self._next_entry(key, _caller_key(payload))
+            await self._simulate(entry["latency_seconds"])
+            result = CreateResult.model_validate(entry["result"])
+        else:
+            started = time.perf_counter()
+            result = await self._client.create(
+                messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                extra_create_args=extra_create_args, cancellation_token=cancellation_token,
+            )
+            self._append({
+                "key": key,
+                "request": payload,
+                "result": result.model_dump(mode="json"),
+                "chunks": None,
+                "latency_seconds": time.perf_counter() - started,
+                "first_chunk_seconds": None,
+                "recorded_at": time.time(),
+            })
+        self._add_usage(result.usage)
+        return result
+
+    async def create_stream(self, messages, *, tools=[], tool_choice="auto", json_output=None,
+                            extra_create_args={}, cancellation_token=None):
+        payload = _request_payload(messages, tools, json_output, extra_create_args)
+        key = _request_key(payload)
+
+        if self.mode == REPLAY:
+            entry = self._next_entry(key, _caller_key(payload))
+            chunks = entry["chunks"] or []
+            await self._simulate(entry["first_chunk_seconds"] or 0)
+            # Spread the rest of the recorded latency evenly over the chunks.
+            remaining = max(0.0, entry["latency_seconds"] - (entry["first_chunk_seconds"] or 0))
+            for chunk in chunks:
+                yield chunk
+                await self._simulate(remaining / max(1, len(chunks)))
+            result = CreateResult.model_validate(entry["result"])
+            self._add_usage(result.usage)
+            yield result
+            return
+
+        started = time.perf_counter()
+        first_chunk = None
+        chunks = []
+        result = None
+        async for item in self._client.create_stream(
+            messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+            extra_create_args=extra_create_args, cancellation_token=cancellation_token,
+        ):
+            if isinstance(item, str):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - started
+                chunks.append(item)
+            else:
+                result = item
+            yield item
+
+        if result is None:
+            # Interrupted stream: nothing complete to replay later.
+            return
+        self._append({
+            "key": key,
+            "request": payload,
+            "result": result.model_dump(mode="json"),
+            "chunks": chunks,
+            "latency_seconds": time.perf_counter() - started,
+            "first_chunk_seconds": first_chunk,
+            "recorded_at": time.time(),
+        })
+        self._add_usage(result.usage)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+
+    def actual_usage(self):
+        return self._actual_usage
+
+    def total_usage(self):
+        return self._total_usage
+
+    def count_tokens(self, messages, *, tools=[]):
+        if self._client is not None:
+            return self._client.count_tokens(messages, tools=tools)
+        # Rough offline estimate: whitespace-separated words.
+        return sum(len(str(message.content).split()) for message in messages)
+
+    def remaining_tokens(self, messages, *, tools=[]):
+        if self._client is not None:
+            return self._client.remaining_tokens(messages, tools=tools)
+        return 1_000_000 - self.count_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self):
+        return self._model_info
+
+    @property
+    def model_info(self):
+        return self._model_info
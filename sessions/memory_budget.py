@@ -0,0 +1,142 @@
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from config.constants import SESSION_MEMORY_BUDGET_BYTES, PROCESS_MEMORY_BUDGET_BYTES, SESSION_MEMORY_IDLE_SECONDS
+from telemetry.tracing import get_tracer
+
+
+def estimate_size(value):
+    """Approximate bytes held by a piece of chat state (messages, team state, tables, texts)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class MemoryBudget:
+    """
+    Process-wide accounting of the chat state browser sessions keep in memory.
+
+    Every session reports the size of the chat it is showing; ``evictions`` then names
+    the chats it should release (their state stays in the session store and is loaded
+    again when the chat is opened). A session over ``session_budget`` releases its own
+    least recently viewed chats. When all sessions together exceed ``process_budget``,
+    the least recently viewed chats process-wide are picked; chats of other sessions are
+    released the next time those sessions run. A chat on screen is never picked.
+    """
+
+    def __init__(self, session_budget=SESSION_MEMORY_BUDGET_BYTES, process_budget=PROCESS_MEMORY_BUDGET_BYTES,
+                 idle_seconds=SESSION_MEMORY_IDLE_SECONDS):
+        """
+        Args:
+            session_budget: Bytes of chat state one browser session may keep loaded
+            process_budget: Bytes of chat state all sessions together may keep loaded
+            idle_seconds: Sessions without a report for this long are dropped from the accounting
+        """
+        self.session_budget = session_budget
+        self.process_budget = process_budget
+        self.idle_seconds = idle_seconds
+
+        self._chats = {}      # session key -> {chat id: [bytes, last viewed]}
+        self._current = {}    # session key -> chat on screen
+        self._seen = {}       # session key -> time of the last report
+        self._pending = {}    # session key -> chat ids to release on its next run
+        self._lock = threading.Lock()
+
+    def update(self, session_key, chat_id, size):
+        """Record the size of the chat a session is showing and mark it as just viewed."""
+        now = time.time()
+        with self._lock:
+            self._chats.setdefault(session_key, {})[chat_id] = [size, now]
+            self._current[session_key] = chat_id
+            self._seen[session_key] = now
+
+    def evictions(self, session_key):
+        """
+        Pick the chats a session should release to get back within the budgets.
+
+        Returns:
+            Chat ids of ``session_key`` to release now; they are no longer counted
+        """
+        with self._lock:
+            self._drop_idle()
+            chats = self._chats.get(session_key, {})
+            current = self._current.get(session_key)
+            evict = {chat_id for chat_id in self._pending.pop(session_key, ()) if chat_id != current}
+
+            own_total = sum(size for chat_id, (size, _) in chats.items() if chat_id not in evict)
+            for chat_id, (size, _) in sorted(chats.items(), key=lambda item: item[1][1]):
+                if own_total <= self.session_budget:
+                    break
+                if chat_id != current and chat_id not in evict:
+                    evict.add(chat_id)
+                    own_total -= size
+            for chat_id in evict:
+                chats.pop(chat_id, None)
+
+            total = self._total()
+            if total > self.process_budget:
+                candidates = sorted(
+                    (viewed, key, chat_id, size)
+                    for key, session_chats in self._chats.items()
+                    for chat_id, (size, viewed) in session_chats.items()
+                    if chat_id != self._current.get(key)
+                )
+                for _, key, chat_id, size in candidates:
+                    if total <= self.process_budget:
+                        break
+                    del self._chats[key][chat_id]
+                    total -= size
+                    if key == session_key:
+                        evict.add(chat_id)
+                    else:
+                        self._pending.setdefault(key, set()).add(chat_id)
+            if evict:
+                print(f"Memory budget: releasing {len(evict)} chat(s), {total / 1e6:.0f} MB held by all sessions")
+        return sorted(evict)
+
+    def stats(self):
+        """Sessions, loaded chats and bytes currently counted."""
+        with self._lock:
+            return {
+                "sessions": len(self._chats),
+                "chats": sum(len(chats) for chats in self._chats.values()),
+                "bytes": self._total(),
+            }
+
+    def _total(self):
+        return sum(size for chats in self._chats.values() for size, _ in chats.values())
+
+    def _drop_idle(self):
+        cutoff = time.time() - self.idle_seconds
+        for key in [key for key, seen in self._seen.items() if seen < cutoff]:
+            for table in (self._chats, self._current, self._seen, self._pending):
+                table.pop(key, None)
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+
+def get_memory_budget():
+    """
+    Return the process-wide memory budget shared by every browser session.
+
+    Returns:
+        MemoryBudget configured from ``config/constants.py``
+    """
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            _budget = MemoryBudget()
+            get_tracer().register_gauge(
+                "analyzer_session_memory", "Chat state held in memory by browser sessions.",
+                lambda: {(("value", key),): value for key, value in _budget.stats().items()},
+            )
+        return _budget
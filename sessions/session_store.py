@@ -0,0 +1,256 @@
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from config.constants import SESSION_STORE_URL, SESSION_STORE_COMPRESSION_LEVEL
+
+# Chat fields shown in the chat list; everything else is heavy state fetched when a chat is opened.
+SUMMARY_FIELDS = ("id", "name", "created_at", "uploaded_file_name")
+
+
+def chat_summary(chat):
+    """Return the lightweight part of a chat used to list and name it."""
+    summary = {field: chat.get(field) for field in SUMMARY_FIELDS}
+    messages = chat.get("messages")
+    if messages is None:
+        summary["first_question"] = chat.get("first_question")
+        summary["message_count"] = chat.get("message_count", 0)
+    else:
+        summary["first_question"] = next((m["content"] for m in messages if m["role"] == "user"), None)
+        summary["message_count"] = len(messages)
+    summary["loaded"] = False
+    return summary
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, default=str).encode("utf-8"), SESSION_STORE_COMPRESSION_LEVEL)
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def _unpack_table(table):
+    if "ref" in table:
+        return table["ref"]
+    if "csv" in table:
+        # Saved before tables were kept on disk: the CSV text itself was stored
+        return pd.read_csv(io.StringIO(table["csv"]))
+    return table["error"]
+
+
+class SessionStore(ABC):
+    """
+    Durable storage for chats, so they survive restarts and can be served by any app replica.
+
+    Chats belong to an ``owner`` (one browser session). ``list_chats`` only returns the
+    summaries needed for the chat selector; a chat's heavy state (messages, team state,
+    suggestions, files) is fetched with ``load_chat`` when it is opened. Generated tables
+    are written once per analysis with ``save_tables`` instead of with every chat save;
+    only references to the tables kept on disk are stored (see data/result_tables.py),
+    and ``referenced_tables`` keeps those tables from being pruned.
+    """
+
+    @abstractmethod
+    def list_chats(self, owner):
+        """Return chat summaries (see ``chat_summary``) of an owner, newest first."""
+
+    @abstractmethod
+    def load_chat(self, owner, chat_id):
+        """Return the full chat dict, or None if it does not exist."""
+
+    @abstractmethod
+    def save_chat(self, owner, chat):
+        """Store a full chat dict; returns False when nothing changed since the last save."""
+
+    @abstractmethod
+    def delete_chat(self, owner, chat_id):
+        """Remove a chat and its tables."""
+
+    @abstractmethod
+    def save_tables(self, chat_id, analysis_id, tables):
+        """Store the tables of one analysis: file name -> table reference (or an error string)."""
+
+    @abstractmethod
+    def load_tables(self, chat_id):
+        """Return ``{analysis_id: {file name: table reference or error string}}`` for a chat."""
+
+    @abstractmethod
+    def referenced_tables(self):
+        """Return the file names of all tables referenced by stored chats."""
+
+
+def _table_names(packed):
+    return {os.path.basename(table["ref"]["path"]) for table in packed.values() if "ref" in table}
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store in a SQLite database (WAL mode), shared by every process on the host.
+
+    Chat state is stored as zlib-compressed JSON next to an uncompressed summary, so the
+    chat list never reads the blobs. Several replicas can share the file as long as it
+    lives on a local or block-storage volume (SQLite locking is unreliable on network
+    filesystems); writes are last-writer-wins per chat.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: SQLite file holding the chats
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._digests = {}    # chat id -> digest of the state last written by this process
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chats ("
+            "id TEXT PRIMARY KEY, owner TEXT NOT NULL, summary TEXT NOT NULL, state BLOB NOT NULL, "
+            "state_digest TEXT NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chats_owner ON chats (owner, created_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_tables ("
+            "chat_id TEXT NOT NULL, analysis_id TEXT NOT NULL, tables BLOB NOT NULL, "
+            "PRIMARY KEY (chat_id, analysis_id))"
+        )
+        # One row per (analysis, table file): which tables stored chats still need
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS table_refs ("
+            "chat_id TEXT NOT NULL, analysis_id TEXT NOT NULL, table_name TEXT NOT NULL, "
+            "PRIMARY KEY (chat_id, analysis_id, table_name))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS table_refs_name ON table_refs (table_name)")
+        if self._conn.execute("SELECT 1 FROM table_refs LIMIT 1").fetchone() is None:
+            # Stores written before references were counted
+            for chat_id, analysis_id, blob in self._conn.execute(
+                    "SELECT chat_id, analysis_id, tables FROM chat_tables").fetchall():
+                self._insert_refs(chat_id, analysis_id, _unpack(blob))
+        self._conn.commit()
+
+    def list_chats(self, owner):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT summary FROM chats WHERE owner = ? ORDER BY created_at DESC", (owner,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def load_chat(self, owner, chat_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, state_digest FROM chats WHERE id = ? AND owner = ?", (chat_id, owner)
+            ).fetchone()
+        if row is None:
+            return None
+        self._digests[chat_id] = row[1]
+        chat = _unpack(row[0])
+        chat["loaded"] = True
+        return chat
+
+    def save_chat(self, owner, chat):
+        state = dict(chat)
+        state.pop("loaded", None)
+        blob = _pack(state)
+        digest = hashlib.sha256(blob).hexdigest()
+        if self._digests.get(chat["id"]) == digest:
+            return False
+
+        summary = chat_summary(chat)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO chats (id, owner, summary, state, state_digest, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET summary = excluded.summary, state = excluded.state, "
+                "state_digest = excluded.state_digest, updated_at = excluded.updated_at",
+                (chat["id"], owner, json.dumps(summary), blob, digest, chat["created_at"], time.time()),
+            )
+            self._conn.commit()
+        self._digests[chat["id"]] = digest
+        return True
+
+    def delete_chat(self, owner, chat_id):
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM chats WHERE id = ? AND owner = ?", (chat_id, owner)).rowcount
+            if deleted:
+                self._conn.execute("DELETE FROM chat_tables WHERE chat_id = ?", (chat_id,))
+                self._conn.execute("DELETE FROM table_refs WHERE chat_id = ?", (chat_id,))
+            self._conn.commit()
+        self._digests.pop(chat_id, None)
+
+    def save_tables(self, chat_id, analysis_id, tables):
+        packed = {
+            name: {"ref": table} if isinstance(table, dict) else {"error": str(table)}
+            for name, table in tables.items()
+        }
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_tables (chat_id, analysis_id, tables) VALUES (?, ?, ?)",
+                (chat_id, analysis_id, _pack(packed)),
+            )
+            self._conn.execute("DELETE FROM table_refs WHERE chat_id = ? AND analysis_id = ?", (chat_id, analysis_id))
+            self._insert_refs(chat_id, analysis_id, packed)
+            self._conn.commit()
+
+    def load_tables(self, chat_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT analysis_id, tables FROM chat_tables WHERE chat_id = ?", (chat_id,)
+            ).fetchall()
+        result = {}
+        for analysis_id, blob in rows:
+            result[analysis_id] = {name: _unpack_table(table) for name, table in _unpack(blob).items()}
+        return result
+
+    def referenced_tables(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT table_name FROM table_refs").fetchall()
+        return {row[0] for row in rows}
+
+    def _insert_refs(self, chat_id, analysis_id, packed):
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO table_refs (chat_id, analysis_id, table_name) VALUES (?, ?, ?)",
+            [(chat_id, analysis_id, name) for name in _table_names(packed)],
+        )
+
+
+# URL scheme -> callable taking the rest of the URL; register other backends here.
+SESSION_STORE_BACKENDS = {
+    "sqlite": lambda location: SQLiteSessionStore(location),
+}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """
+    Return the process-wide session store configured by ``$SESSION_STORE_URL`` or ``SESSION_STORE_URL``.
+
+    The URL is ``<backend>://<location>``, e.g. ``sqlite:///.cache/sessions.sqlite`` for a
+    relative path or ``sqlite:////data/sessions.sqlite`` for an absolute one.
+
+    Returns:
+        SessionStore shared by every browser session in this process
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            url = os.getenv("SESSION_STORE_URL", SESSION_STORE_URL)
+            scheme, _, location = url.partition("://")
+            if scheme not in SESSION_STORE_BACKENDS:
+                raise ValueError(f"Unknown session store backend: {scheme}")
+            # sqlite:///relative.db -> relative.db, sqlite:////abs.db -> /abs.db
+            _store = SESSION_STORE_BACKENDS[scheme](location[1:] if location.startswith("/") else location)
+        return _store
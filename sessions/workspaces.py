@@ -0,0 +1,342 @@
+import atexit
+import os
+import re
+import shlex
+import shutil
+import threading
+from contextlib import contextmanager
+
+from autogen_core.code_executor import CodeBlock, CodeExecutor, CodeResult
+
+from config.constants import (
+    WORK_DIR_DOCKER,
+    WORKSPACE_QUOTA_BYTES,
+    WORKSPACE_MAX_TOTAL_BYTES,
+    WORKSPACE_GC_TARGET_RATIO,
+    WORKSPACE_GC_INTERVAL,
+)
+from telemetry.tracing import get_tracer
+
+# Workspaces live in this directory of the sandbox work dir, one subdirectory per chat
+WORKSPACES_DIR_NAME = "sessions"
+# Touched whenever a workspace is used; its mtime orders workspaces for collection
+LAST_USED_FILE = ".last_used"
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def directory_size(path):
+    """Total size in bytes of the files below ``path`` (symlinks are not followed)."""
+    total = 0
+    pending = [path]
+    while pending:
+        try:
+            entries = os.scandir(pending.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    continue
+    return total
+
+
+def in_work_subdir(code_block, work_subdir):
+    """Return a shell block that runs in ``work_subdir`` (relative to the executor work dir)."""
+    if not work_subdir:
+        return code_block
+    return CodeBlock(code=f"cd {shlex.quote(work_subdir)} || exit 1\n{code_block.code}", language=code_block.language)
+
+
+class WorkspaceManager:
+    """
+    Gives every chat (or batch task) its own directory inside the sandbox work dir.
+
+    A chat's workspace ``sessions/<chat id>`` is the only host directory mounted into the
+    containers leased for it (see ``ContainerPool.acquire(work_dir=...)``), so its code
+    cannot reach other chats' workspaces. A background thread keeps the disk usage of all
+    workspaces under ``max_total_bytes`` by removing the least recently used ones;
+    workspaces pinned by a running analysis are never removed. ``QuotaCodeExecutor`` enforces the per-workspace ``quota_bytes``.
+
+    Recency is kept in the mtime of a marker file, so several app processes sharing the
+    work dir see each other's activity (pins are per process).
+    """
+
+    def __init__(self, work_dir=WORK_DIR_DOCKER, quota_bytes=WORKSPACE_QUOTA_BYTES,
+                 max_total_bytes=WORKSPACE_MAX_TOTAL_BYTES, target_ratio=WORKSPACE_GC_TARGET_RATIO,
+                 gc_interval=WORKSPACE_GC_INTERVAL):
+        """
+        Args:
+            work_dir: Sandbox work dir on the host (mounted into the containers)
+            quota_bytes: Largest size of a single workspace
+            max_total_bytes: Disk budget of all workspaces together
+            target_ratio: Fraction of ``max_total_bytes`` a collection frees space down to
+            gc_interval: Seconds between background collections
+        """
+        self.work_dir = work_dir
+        self.root = os.path.join(work_dir, WORKSPACES_DIR_NAME)
+        self.quota_bytes = quota_bytes
+        self.max_total_bytes = max_total_bytes
+        self.target_ratio = target_ratio
+        self.gc_interval = gc_interval
+
+        self._pinned = {}     # workspace name -> number of active pins
+        self._usage = {"workspaces": 0, "bytes": 0, "evicted": 0}    # as of the last collection
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Lifecycle ---
+    def start(self):
+        """Start the background collector thread."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._collect_loop, name="workspace-gc", daemon=True)
+            self._thread.start()
+
+    def shutdown(self):
+        """Stop the background collector. Safe to call more than once."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    # --- Workspaces ---
+    @staticmethod
+    def name(session_id):
+        """Directory name of a session's workspace."""
+        name = _UNSAFE_CHARS.sub("_", str(session_id)).lstrip(".")
+        return name or "default"
+
+    def path(self, session_id):
+        """
+        Return a session's workspace on the host, creating it and marking it as used.
+
+        Args:
+            session_id: Chat id (or any other key runs are grouped by)
+
+        Returns:
+            Path of the workspace directory
+        """
+        path = os.path.join(self.root, self.name(session_id))
+        with self._lock:
+            os.makedirs(path, exist_ok=True)
+            marker = os.path.join(path, LAST_USED_FILE)
+            try:
+                os.utime(marker)
+            except FileNotFoundError:
+                open(marker, "a").close()
+        return path
+
+    def usage(self, session_id):
+        """Bytes used by a session's workspace."""
+        return directory_size(os.path.join(self.root, self.name(session_id)))
+
+    @contextmanager
+    def pin(self, session_id):
+        """Keep a workspace from being collected while an analysis uses it; yields its path."""
+        name = self.name(session_id)
+        with self._lock:
+            self._pinned[name] = self._pinned.get(name, 0) + 1
+        try:
+            yield self.path(session_id)
+        finally:
+            with self._lock:
+                self._pinned[name] -= 1
+                if not self._pinned[name]:
+                    del self._pinned[name]
+            self.path(session_id)
+
+    def clear(self, session_id):
+        """
+        Delete every file of a session's workspace, keeping the workspace itself.
+
+        Hidden entries are bookkeeping (the chat's kernel, pending manifests, the last-used
+        marker) and are kept.
+
+        Returns:
+            Tuple of (number of entries deleted, list of "name: error" strings for failures)
+        """
+        path = os.path.join(self.root, self.name(session_id))
+        if not os.path.isdir(path):
+            return 0, []
+        deleted_count = 0
+        failed_files = []
+        for entry in os.scandir(path):
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+                deleted_count += 1
+            except OSError as e:
+                failed_files.append(f"{entry.name}: {e}")
+        return deleted_count, failed_files
+
+    def remove(self, session_id):
+        """Delete a session's workspace unless an analysis is using it; returns whether it was removed."""
+        name = self.name(session_id)
+        with self._lock:
+            if self._pinned.get(name):
+                return False
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        return True
+
+    def stats(self):
+        """Workspace count and bytes as of the last collection, and how many were evicted so far."""
+        return dict(self._usage)
+
+    # --- Collection ---
+    def collect(self):
+        """
+        Remove least recently used workspaces until the total is back under budget.
+
+        Nothing is removed while the total is within ``max_total_bytes``; otherwise
+        workspaces are removed oldest first until the total drops to
+        ``target_ratio * max_total_bytes``, skipping pinned ones.
+
+        Returns:
+            Names of the removed workspaces
+        """
+        with get_tracer().span("workspace.collect") as span:
+            workspaces = []
+            try:
+                names = os.listdir(self.root)
+            except FileNotFoundError:
+                names = []
+            for name in names:
+                path = os.path.join(self.root, name)
+                if not os.path.isdir(path):
+                    continue
+                try:
+                    last_used = os.path.getmtime(os.path.join(path, LAST_USED_FILE))
+                except OSError:
+                    last_used = os.path.getmtime(path)
+                workspaces.append((last_used, name, directory_size(path)))
+            total = sum(size for _, _, size in workspaces)
+
+            evicted = []
+            if total > self.max_total_bytes:
+                target = self.max_total_bytes * self.target_ratio
+                for _, name, size in sorted(workspaces):
+                    if total <= target:
+                        break
+                    with self._lock:
+                        if self._pinned.get(name):
+                            continue
+                        shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+                    total -= size
+                    evicted.append(name)
+                print(f"Workspaces: removed {len(evicted)} least recently used, {total / 1e6:.0f} MB in use")
+
+            self._usage = {
+                "workspaces": len(workspaces) - len(evicted),
+                "bytes": total,
+                "evicted": self._usage["evicted"] + len(evicted),
+            }
+            span.set(workspaces=len(workspaces), bytes=total, evicted=len(evicted))
+        return evicted
+
+    def _collect_loop(self):
+        while True:
+            try:
+                self.collect()
+            except Exception as e:
+                print(f"Workspaces: collection failed: {e}")
+            if self._stop.wait(self.gc_interval):
+                return
+
+
+class QuotaCodeExecutor(CodeExecutor):
+    """
+    Executor wrapper enforcing a session's workspace quota.
+
+    Nothing runs while the workspace is over quota. When an execution pushes it over, the
+    files that execution reported writing (see config/artifact_manifest.py) are deleted
+    again and the block fails with a message the analyzer can act on.
+    """
+
+    def __init__(self, executor, session_id, workspaces=None):
+        """
+        Args:
+            executor: Executor running in the session's workspace
+            session_id: Session the workspace belongs to
+            workspaces: WorkspaceManager to use instead of ``get_workspace_manager()``
+        """
+        self._executor = executor
+        self._session_id = session_id
+        self._workspaces = workspaces or get_workspace_manager()
+
+    @property
+    def executor(self):
+        """The wrapped executor."""
+        return self._executor
+
+    async def execute_code_blocks(self, code_blocks, cancellation_token):
+        quota = self._workspaces.quota_bytes
+        used = self._workspaces.usage(self._session_id)
+        if used > quota:
+            return CodeResult(exit_code=1, output=self._quota_message(used))
+
+        result = await self._executor.execute_code_blocks(code_blocks, cancellation_token)
+        used = self._workspaces.usage(self._session_id)
+        if used <= quota:
+            return result
+
+        written = getattr(result, "artifacts", None) or []
+        work_dir = self._workspaces.path(self._session_id)
+        for entry in written:
+            try:
+                os.remove(os.path.join(work_dir, entry["name"]))
+            except OSError:
+                pass
+        fields = dict(vars(result), exit_code=1)
+        if written:
+            fields["artifacts"] = []
+        fields["output"] = f"{result.output}\n{self._quota_message(used, removed=bool(written))}"
+        return type(result)(**fields)
+
+    def _quota_message(self, used, removed=False):
+        note = (" The files written by this code were deleted again; write smaller outputs (e.g. aggregates or samples)."
+                if removed else " Delete files that are no longer needed to continue.")
+        return (f"Disk quota of this chat's work directory exceeded: {used / 1e6:.0f} MB used, "
+                f"limit {self._workspaces.quota_bytes / 1e6:.0f} MB.{note}")
+
+    async def start(self):
+        await self._executor.start()
+
+    async def stop(self):
+        await self._executor.stop()
+
+    async def restart(self):
+        await self._executor.restart()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_workspace_manager():
+    """
+    Return the process-wide workspace manager, starting its collector on first use.
+
+    Returns:
+        WorkspaceManager for the sandbox work dir
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = WorkspaceManager()
+            _manager.start()
+            atexit.register(_manager.shutdown)
+            get_tracer().register_gauge(
+                "analyzer_workspaces", "Per-chat sandbox work directories (as of the last collection).",
+                lambda: {(("value", key),): value for key, value in _manager.stats().items()},
+            )
+        return _manager
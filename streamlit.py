@@ -1,19 +1,25 @@
 import streamlit as st
-import asyncio
 import os
-import base64
 import glob
-import zipfile
 import uuid
 import time
 import pandas as pd
-from io import BytesIO
 from models.openai_model_client import get_model_client
-from teams.analyzer_gpt import getDataAnalyzerTeam
-from config.docker_utils import getDockerCommandLineExecutor, start_docker_container, stop_docker_container
-from agents.query_clarity_agent import create_query_clarity_agent, get_csv_info
-from autogen_agentchat.messages import TextMessage
-from autogen_agentchat.base import TaskResult
+from cache.answer_cache import get_answer_cache, restore_artifacts
+from config.constants import JOB_POLL_INTERVAL, RESULT_TABLE_PAGE_ROWS
+from jobs.job_queue import get_job_queue, DONE, CANCELLED
+from jobs.analysis import run_analysis
+from agents.query_clarity_agent import create_query_clarity_agent, get_csv_info, get_suggestion_cache, generate_local_suggestions
+from data.dataset_store import store_upload
+from data.columnar import schedule_conversion
+from data.csv_reader import read_csv_sample
+from data.image_cache import get_image_ref
+from data.result_tables import store_result_table, read_table_page, table_path
+from data.session_files import find_export_zip, schedule_export_zip
+from sessions.memory_budget import estimate_size, get_memory_budget
+from sessions.session_store import get_session_store, chat_summary
+from sessions.workspaces import get_workspace_manager
+from telemetry.tracing import get_tracer, start_metrics_server
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -22,11 +28,41 @@ st.set_page_config(
     layout="wide"
 )
 
+# Prometheus-style metrics for every run in this process (see telemetry/tracing.py)
+start_metrics_server()
+
 # --- Helper Functions ---
-def get_image_b64(path):
-    """Converts an image file to a base64 string."""
-    with open(path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode('utf-8')
+def show_chart(path, caption):
+    """Show a chart as a thumbnail served by URL from the image cache, linking to the full resolution image."""
+    ref = get_image_ref(path)
+    if ref is None:
+        st.caption(f"📈 {caption} (image file no longer available)")
+        return
+    st.markdown(f"[![{caption}]({ref['thumbnail_url']})]({ref['url']})")
+    st.caption(f"{caption} · click for full resolution")
+
+@st.fragment(run_every=1)
+def poll_suggestion_refinement():
+    """Swap in the model-generated suggestions once the background request finishes."""
+    pending = st.session_state.get("pending_suggestions")
+    if not pending:
+        return
+    if pending["chat_id"] != st.session_state.current_chat_id:
+        # Chat was switched; its local suggestions stay as they are
+        st.session_state.pending_suggestions = None
+        return
+    if not pending["future"].done():
+        st.caption("✨ Refining suggestions with AI...")
+        return
+    
+    st.session_state.pending_suggestions = None
+    try:
+        suggestions_result = pending["future"].result()
+    except Exception:
+        suggestions_result = {}
+    if "error" not in suggestions_result and suggestions_result.get("suggestions"):
+        st.session_state.suggestions = suggestions_result["suggestions"]
+    st.rerun()
 
 def create_new_chat():
     """Create a new chat session."""
@@ -42,8 +78,11 @@ def create_new_chat():
         "refined_query": "",
         "session_start_time": time.time(),
         "session_files": [],
-        "files_before_analysis": set(),
-        "uploaded_file_name": None
+        "uploaded_file_name": None,
+        "active_job_id": None,
+        "last_trace_id": None,
+        "analysis_texts": {},
+        "loaded": True
     }
     return new_chat
 
@@ -51,18 +90,56 @@ def get_chat_display_name(chat):
     """Get display name for chat."""
     if chat.get("uploaded_file_name"):
         return f"📊 {chat['uploaded_file_name']}"
-    elif len(chat.get("messages", [])) > 0:
-        # Use first user message as chat name (truncated)
-        for msg in chat["messages"]:
-            if msg["role"] == "user":
-                content = msg["content"][:30] + "..." if len(msg["content"]) > 30 else msg["content"]
-                return f"💬 {content}"
+    # Use first user message as chat name (truncated); unopened chats carry it in their summary
+    first_question = chat_summary(chat)["first_question"]
+    if first_question:
+        content = first_question[:30] + "..." if len(first_question) > 30 else first_question
+        return f"💬 {content}"
     return f"💭 {chat['name']}"
 
+def get_owner_id():
+    """Identify this browser session by the ?session= URL parameter, so its chats survive reloads and restarts."""
+    owner_id = st.query_params.get("session")
+    if not owner_id:
+        owner_id = uuid.uuid4().hex
+        st.query_params["session"] = owner_id
+    return owner_id
+
+def get_chat_work_dir(chat_id=None):
+    """Return the chat's own work directory (where its code runs and its results are written)."""
+    return get_workspace_manager().path(chat_id or st.session_state.current_chat_id)
+
+def load_chat_state(chat_id):
+    """Fetch a chat's full state from the session store, including its generated tables and explanations."""
+    store = get_session_store()
+    chat = store.load_chat(st.session_state.owner_id, chat_id)
+    if chat is None:
+        # Listed but gone from the store (deleted by another replica): start it over empty
+        chat = dict(create_new_chat(), id=chat_id)
+    for analysis_id, tables in store.load_tables(chat_id).items():
+        st.session_state[f"csv_data_{analysis_id}"] = tables
+    for analysis_id, text in chat.get("analysis_texts", {}).items():
+        st.session_state[f"analysis_text_{analysis_id}"] = text
+    st.session_state.chats[chat_id] = chat
+    return chat
+
+def release_chat_state(chat_id):
+    """Drop an inactive chat's heavy state from memory; it stays in the session store."""
+    chat = st.session_state.chats.get(chat_id)
+    if chat is None or not chat.get("loaded"):
+        return
+    for key in list(st.session_state.keys()):
+        if key.startswith((f"csv_data_{chat_id}_", f"analysis_text_{chat_id}_")):
+            del st.session_state[key]
+    st.session_state.chats[chat_id] = chat_summary(chat)
+
 def switch_to_chat(chat_id):
     """Switch to a specific chat session."""
     if chat_id in st.session_state.chats:
+        # Released chats are loaded back from the session store
         chat = st.session_state.chats[chat_id]
+        if not chat.get("loaded"):
+            chat = load_chat_state(chat_id)
         st.session_state.current_chat_id = chat_id
         st.session_state.messages = chat["messages"]
         st.session_state.team_state = chat["team_state"]
@@ -71,10 +148,26 @@ def switch_to_chat(chat_id):
         st.session_state.refined_query = chat["refined_query"]
         st.session_state.session_start_time = chat["session_start_time"]
         st.session_state.session_files = chat["session_files"]
-        st.session_state.files_before_analysis = chat["files_before_analysis"]
+
+def chat_state_size(chat_id):
+    """Approximate bytes of a loaded chat's state, including its tables and explanations in session state."""
+    size = estimate_size(st.session_state.chats[chat_id])
+    for key in st.session_state.keys():
+        if key.startswith((f"csv_data_{chat_id}_", f"analysis_text_{chat_id}_")):
+            size += estimate_size(st.session_state[key])
+    return size
+
+def enforce_memory_budget():
+    """Release the least recently viewed chats once this session or the process holds too much chat state."""
+    budget = get_memory_budget()
+    chat_id = st.session_state.current_chat_id
+    if chat_id in st.session_state.chats:
+        budget.update(st.session_state.memory_key, chat_id, chat_state_size(chat_id))
+    for released_chat_id in budget.evictions(st.session_state.memory_key):
+        release_chat_state(released_chat_id)
 
 def save_current_chat():
-    """Save current chat state."""
+    """Save current chat state to the session and the session store (skipped when unchanged)."""
     if st.session_state.current_chat_id and st.session_state.current_chat_id in st.session_state.chats:
         chat = st.session_state.chats[st.session_state.current_chat_id]
         chat["messages"] = st.session_state.messages
@@ -83,65 +176,11 @@ def save_current_chat():
         chat["show_suggestions"] = st.session_state.show_suggestions
         chat["refined_query"] = st.session_state.refined_query
         chat["session_files"] = st.session_state.session_files
-        chat["files_before_analysis"] = st.session_state.files_before_analysis
-
-def get_temp_files_before_analysis(temp_dir):
-    """Get list of files in temp directory before analysis."""
-    if not os.path.exists(temp_dir):
-        return set()
-    return set(os.listdir(temp_dir))
-
-def get_session_files(temp_dir, files_before, session_start_time):
-    """Get files created during current session."""
-    if not os.path.exists(temp_dir):
-        return []
-    
-    current_files = set(os.listdir(temp_dir))
-    new_files = current_files - files_before
-    
-    # Filter files by creation time to ensure they're from current session
-    session_files = []
-    for file in new_files:
-        file_path = os.path.join(temp_dir, file)
-        if os.path.isfile(file_path):
-            # Check if file was created after session start
-            file_creation_time = os.path.getctime(file_path)
-            if file_creation_time >= session_start_time:
-                session_files.append(file)
-    
-    return session_files
-
-def create_export_zip(temp_dir, session_files):
-    """Create a ZIP file containing session files, converting CSV files to JSON format."""
-    if not session_files:
-        return None
-    
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for file_name in session_files:
-            file_path = os.path.join(temp_dir, file_name)
-            if os.path.exists(file_path):
-                # Check if it's a CSV file that should be converted to JSON
-                if file_name.endswith('.csv') and not file_name.startswith('tmp_') and not file_name.endswith('_full.csv'):
-                    try:
-                        # Read CSV and convert to JSON
-                        df = pd.read_csv(file_path)
-                        json_data = df.to_json(orient='records', indent=2)
-                        
-                        # Create new filename with .json extension
-                        json_filename = file_name.replace('.csv', '.json')
-                        
-                        # Add JSON data to ZIP
-                        zip_file.writestr(json_filename, json_data)
-                    except Exception as e:
-                        # If conversion fails, include original CSV file
-                        zip_file.write(file_path, file_name)
-                else:
-                    # For non-CSV files (PNG, JSON, etc.), add as-is
-                    zip_file.write(file_path, file_name)
-    
-    zip_buffer.seek(0)
-    return zip_buffer.getvalue()
+        prefix = f"analysis_text_{chat['id']}_"
+        chat["analysis_texts"] = {
+            key[len("analysis_text_"):]: value for key, value in st.session_state.items() if key.startswith(prefix)
+        }
+        get_session_store().save_chat(st.session_state.owner_id, chat)
 
 def cleanup_session_files(temp_dir, session_files):
     """Delete session files from temp directory."""
@@ -156,39 +195,32 @@ def cleanup_session_files(temp_dir, session_files):
             st.error(f"Could not delete {file_name}: {str(e)}")
     return deleted_count
 
-def cleanup_all_temp_files(temp_dir):
-    """Delete ALL files from temp directory (except .gitkeep)."""
-    if not os.path.exists(temp_dir):
-        return 0
-    
-    deleted_count = 0
-    failed_files = []
-    
-    for file_name in os.listdir(temp_dir):
-        # Skip .gitkeep file to preserve directory structure
-        if file_name == '.gitkeep':
-            continue
-            
-        file_path = os.path.join(temp_dir, file_name)
-        try:
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-                deleted_count += 1
-            elif os.path.isdir(file_path):
-                # Remove directory and its contents
-                import shutil
-                shutil.rmtree(file_path)
-                deleted_count += 1
-        except Exception as e:
-            failed_files.append(f"{file_name}: {str(e)}")
-    
-    return deleted_count, failed_files
+def cleanup_chat_work_dir(chat_id):
+    """Delete ALL files from the chat's work directory (other chats are not touched)."""
+    return get_workspace_manager().clear(chat_id)
+
+def display_result_table(file_name, table, key):
+    """
+    Display a generated table in chat, one page at a time.
 
-def display_csv_data_file(file_path, file_name):
-    """Display a CSV data file as a scrollable dataframe in chat."""
+    Args:
+        file_name: Name of the CSV the table came from
+        table: Table reference (see data/result_tables.py), a DataFrame from an older chat, or an error string
+        key: Unique widget key prefix for this table
+    """
+    if isinstance(table, str):
+        st.error(f"Error with {file_name}: {table}")
+        return False
+    if not isinstance(table, pd.DataFrame) and not os.path.exists(table_path(table)):
+        # Not on this host's RESULT_TABLE_DIR (e.g. a replica without the shared directory)
+        st.warning(f"📄 {file_name}: this table is no longer available on this server")
+        return False
     try:
-        # Read the CSV file
-        df = pd.read_csv(file_path)
+        # Row and column counts come from the table's metadata, not from reading it
+        if isinstance(table, pd.DataFrame):
+            rows, columns = len(table), len(table.columns)
+        else:
+            rows, columns = table["rows"], len(table["columns"])
         
         # Display file info
         st.markdown(f"### 📄 **{file_name}**")
@@ -196,9 +228,22 @@ def display_csv_data_file(file_path, file_name):
         # Show basic metrics
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("📊 Rows", len(df))
+            st.metric("📊 Rows", rows)
         with col2:
-            st.metric("📋 Columns", len(df.columns))
+            st.metric("📋 Columns", columns)
+        
+        # Only the visible page is read from disk
+        page_count = max(1, -(-rows // RESULT_TABLE_PAGE_ROWS))
+        page = 0
+        if page_count > 1:
+            page = st.number_input(
+                f"Page (of {page_count:,}, {RESULT_TABLE_PAGE_ROWS} rows each)",
+                min_value=1, max_value=page_count, value=1, step=1, key=f"{key}_page"
+            ) - 1
+        if isinstance(table, pd.DataFrame):
+            df = table.iloc[page * RESULT_TABLE_PAGE_ROWS:(page + 1) * RESULT_TABLE_PAGE_ROWS]
+        else:
+            df = read_table_page(table, page, RESULT_TABLE_PAGE_ROWS)
         
         # Calculate adaptive height based on data size
         row_height = 35    # Approximate height per row
@@ -245,7 +290,7 @@ def display_analysis_results_with_data_files(temp_dir, session_files, final_anal
     
     # Store CSV data and analysis text for persistent access with unique analysis ID
     if session_csv_files:
-        # Store CSV data in session state for persistent access with unique key
+        # Tables are kept on disk as Parquet; session state only holds references to them
         csv_data_key = f"csv_data_{analysis_id}"
         st.session_state[csv_data_key] = {}
         
@@ -253,10 +298,11 @@ def display_analysis_results_with_data_files(temp_dir, session_files, final_anal
             csv_path = os.path.join(temp_dir, csv_file)
             if os.path.exists(csv_path):
                 try:
-                    df = pd.read_csv(csv_path)
-                    st.session_state[csv_data_key][csv_file] = df
+                    st.session_state[csv_data_key][csv_file] = store_result_table(csv_path)
                 except Exception as e:
                     st.session_state[csv_data_key][csv_file] = f"Error reading file: {str(e)}"
+        # Tables are stored once per analysis rather than with every chat save
+        get_session_store().save_tables(chat_id, analysis_id, st.session_state[csv_data_key])
     
     # Store analysis text for persistent access with unique key
     analysis_key = f"analysis_text_{analysis_id}"
@@ -267,11 +313,9 @@ def display_analysis_results_with_data_files(temp_dir, session_files, final_anal
         with st.chat_message("assistant", avatar="📊"):
             st.markdown("## 📋 **Generated Data Files**")
             
-            for csv_file in session_csv_files:
-                csv_path = os.path.join(temp_dir, csv_file)
-                if os.path.exists(csv_path):
-                    display_csv_data_file(csv_path, csv_file)
-                    st.markdown("---")
+            for csv_file, table in st.session_state[csv_data_key].items():
+                display_result_table(csv_file, table, key=f"result_{analysis_id}_{csv_file}_new")
+                st.markdown("---")
         
         # Save CSV data to chat history with special marker for persistent display
         csv_message = {
@@ -292,8 +336,7 @@ def display_analysis_results_with_data_files(temp_dir, session_files, final_anal
             for image_file in session_png_files:
                 image_path = os.path.join(temp_dir, image_file)
                 if os.path.exists(image_path):
-                    img_b64 = get_image_b64(image_path)
-                    st.image(f"data:image/png;base64,{img_b64}", caption=image_file)
+                    show_chart(image_path, image_file)
                     
                     # Add image info to chat content (without base64)
                     image_content_for_chat += f"- 📈 **{image_file}** (Chart generated)\n"
@@ -316,11 +359,156 @@ def display_analysis_results_with_data_files(temp_dir, session_files, final_anal
         }
         st.session_state.messages.append(explain_message)
 
-def display_csv_preview(uploaded_file):
+
+def answer_context():
+    """Answer cache scope of the next question: the chat for a follow-up, shared for a first question."""
+    return st.session_state.current_chat_id if st.session_state.team_state else None
+
+
+def show_cached_answer(answer, temp_dir):
+    """Show a previous analysis from the answer cache as the result of the current question."""
+    session_files = restore_artifacts(answer, temp_dir)
+    st.session_state.session_files = session_files
+    
+    reuse_note = f"♻️ **Reused the result of a similar earlier question:** \"{answer['query']}\" ({answer['score']:.0%} match)"
+    with st.chat_message("assistant", avatar="♻️"):
+        st.info(reuse_note)
+    st.session_state.messages.append({"role": "assistant", "content": reuse_note})
+    
+    display_analysis_results_with_data_files(temp_dir, session_files, answer["final_message"], st.session_state.current_chat_id)
+    
+    with st.chat_message("assistant"):
+        st.success("✅ **Analysis completed successfully!**")
+    st.session_state.messages.append({
+        "role": "assistant", 
+        "content": "✅ **Analysis completed successfully!**"
+    })
+
+
+def get_active_job(chat_id):
+    """Return the analysis job last started in a chat, if the job queue still knows it."""
+    job_id = st.session_state.chats.get(chat_id, {}).get("active_job_id")
+    return get_job_queue().get(job_id) if job_id else None
+
+def start_analysis_job(dataset, user_question):
+    """Queue an analysis for the current chat; it keeps running across reruns and chat switches."""
+    chat_id = st.session_state.current_chat_id
+    active_job = get_active_job(chat_id)
+    if active_job is not None and not active_job.done:
+        st.warning("An analysis is already running in this chat. Please wait for it to finish or cancel it.")
+        return None
+    
+    job = get_job_queue().submit(
+        run_analysis, dataset, user_question,
+        chat_id=chat_id,
+        team_state=st.session_state.team_state,
+        meta={"question": user_question, "dataset": dataset, "answer_context": answer_context()}
+    )
+    st.session_state.chats[chat_id]["active_job_id"] = job.id
+    # Analyses are traced under their job id; the "Run stats" panel shows the latest one
+    st.session_state.chats[chat_id]["last_trace_id"] = job.id
+    return job
+
+def finish_analysis_job(job):
+    """Apply a finished job's result to the current chat (team state, result display, answer cache)."""
+    st.session_state.chats[job.chat_id]["active_job_id"] = None
+    
+    if job.status == CANCELLED:
+        note = "⏹️ **Analysis cancelled.**"
+    elif job.status != DONE:
+        note = f"❌ **An error occurred:** {job.error}"
+    else:
+        result = job.result
+        temp_dir = result["work_dir"]
+        st.session_state.team_state = result["team_state"]
+        final_analyzer_message = result["final_analyzer_message"]
+        
+        # Display the final detailed analysis using new format
+        if result["stop_reason"] and final_analyzer_message:
+            # Files the run wrote, as reported by the sandbox (no directory scan)
+            with get_tracer().span("artifacts.scan", trace_id=job.id, source="manifest") as scan_span:
+                session_files = [artifact["name"] for artifact in result["artifacts"]]
+                scan_span.set(files=len(session_files))
+            st.session_state.session_files = session_files
+            # Package the files for download in the background so the export is ready when asked for
+            schedule_export_zip(temp_dir, session_files)
+            
+            # Use new display function that shows CSV data first, then explain button
+            display_analysis_results_with_data_files(temp_dir, session_files, final_analyzer_message, job.chat_id)
+            
+            # Remember the answer so near-identical questions on this dataset can reuse it
+            get_answer_cache().store(
+                job.meta["dataset"]["digest"], job.meta["question"], result["columns"], final_analyzer_message,
+                [os.path.join(temp_dir, f) for f in session_files], context=job.meta.get("answer_context")
+            )
+            note = "✅ **Analysis completed successfully!**"
+        else:
+            # e.g. the turn limit was reached before the analyzer said STOP
+            reason = f" ({result['stop_reason']})" if result["stop_reason"] else ""
+            note = f"⚠️ **Analysis ended without a final answer{reason}.** Try asking again or narrowing the question."
+    
+    st.session_state.messages.append({"role": "assistant", "content": note})
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def poll_analysis_job():
+    """Show the running analysis of the current chat and pick up its result when it finishes."""
+    job = get_active_job(st.session_state.current_chat_id)
+    if job is None:
+        return
+    if job.done:
+        finish_analysis_job(job)
+        st.rerun()
+    
+    with st.chat_message("assistant", avatar="📝"):
+        st.info(job.progress)
+        # Live view of the analyzer's current reply (plan, code, analysis) as tokens arrive
+        if job.live_text:
+            st.markdown(job.live_text.replace("STOP", "") + " ▌")
+        if st.button("⏹️ Cancel analysis", key=f"cancel_job_{job.id}"):
+            job.cancel()
+
+def show_run_stats(trace_id):
+    """Show timings and token usage of a traced analysis run."""
+    summary = get_tracer().run_summary(trace_id) if trace_id else None
+    if summary is None:
+        st.caption("No traced run in this chat yet.")
+        return
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("⏱️ Wall time", f"{summary['wall_seconds']:.1f}s")
+        st.metric("🧠 Model time", f"{summary['model_seconds']:.1f}s", help=f"{summary['model_calls']} model calls")
+        st.metric("🐍 Execution time", f"{summary['execution_seconds']:.1f}s",
+                  help=f"{summary['blocks']} code blocks, {summary['cached_blocks']} served from the cache")
+    with col2:
+        st.metric("📥 Prompt tokens", f"{summary['prompt_tokens']:,}")
+        st.metric("📤 Completion tokens", f"{summary['completion_tokens']:,}")
+        st.metric("🐳 Container time", f"{summary['container_seconds']:.1f}s")
+    if summary["first_token_seconds"] is not None:
+        st.caption(f"⚡ First token after {summary['first_token_seconds']:.2f}s · "
+                   f"artifact scan {summary['artifact_scan_seconds'] * 1000:.0f} ms")
+    if summary["errors"]:
+        st.warning(f"{summary['errors']} traced operations failed")
+    
+    if summary["messages"]:
+        st.write("**Tokens per message:**")
+        st.dataframe(pd.DataFrame([
+            {"agent": m["source"], "prompt": m["prompt_tokens"], "completion": m["completion_tokens"], "chars": m["chars"]}
+            for m in summary["messages"]
+        ]), hide_index=True, use_container_width=True)
+    st.write("**Spans:**")
+    st.dataframe(pd.DataFrame([
+        {"span": span["name"], "ms": round(span["duration_seconds"] * 1000, 1), "status": span["status"],
+         "attributes": ", ".join(f"{k}={v}" for k, v in span["attributes"].items())}
+        for span in sorted(summary["spans"], key=lambda span: span["start_time"])
+    ]), hide_index=True, use_container_width=True)
+
+def display_csv_preview(file_path):
     """Display a preview of the uploaded CSV file."""
     try:
-        # Read the CSV file
-        df = pd.read_csv(uploaded_file)
+        # Only the first rows are parsed; counts and column details come from the cached profile
+        preview_df = read_csv_sample(file_path, 5)
+        csv_info = get_csv_info(file_path)
         
         # Display basic info
         st.subheader("📋 Data Preview")
@@ -328,13 +516,12 @@ def display_csv_preview(uploaded_file):
         # File info
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("Rows", len(df))
+            st.metric("Rows", csv_info["shape"][0])
         with col2:
-            st.metric("Columns", len(df.columns))
+            st.metric("Columns", len(preview_df.columns))
         
         # Data preview (first 5 rows)
         st.write("**🔍 Sample Data (First 5 rows):**")
-        preview_df = df.head(5)
         
         # Display with better formatting
         st.dataframe(
@@ -347,13 +534,12 @@ def display_csv_preview(uploaded_file):
         # Data types info
         with st.expander("📈 Column Details"):
             col_info = []
-            for col in df.columns:
-                dtype = str(df[col].dtype)
-                null_count = df[col].isnull().sum()
+            for col in preview_df.columns:
+                profile = csv_info["column_profiles"].get(col, {})
                 col_info.append({
                     "Column": col,
-                    "Type": dtype,
-                    "Null Values": null_count
+                    "Type": profile.get("dtype", str(preview_df[col].dtype)),
+                    "Null Values": profile.get("null_count", 0)
                 })
             
             info_df = pd.DataFrame(col_info)
@@ -370,13 +556,28 @@ st.title("📊 Agentic Data Analyzer")
 st.caption("Your AI-powered data analysis assistant. Upload a CSV, ask a question, and get insights.")
 
 # --- Multi-Chat State Initialization ---
+if "owner_id" not in st.session_state:
+    st.session_state.owner_id = get_owner_id()
+if "memory_key" not in st.session_state:
+    # Identifies this browser tab in the process-wide memory budget
+    st.session_state.memory_key = uuid.uuid4().hex
 if "chats" not in st.session_state:
     st.session_state.chats = {}
+# Only chat summaries are listed; a chat's state is fetched from the store when it is opened.
+# Listing on every run also picks up chats this session created through another replica.
+for stored_chat in get_session_store().list_chats(st.session_state.owner_id):
+    st.session_state.chats.setdefault(stored_chat["id"], stored_chat)
 if "current_chat_id" not in st.session_state:
-    # Create first chat
-    first_chat = create_new_chat()
-    st.session_state.chats[first_chat["id"]] = first_chat
-    st.session_state.current_chat_id = first_chat["id"]
+    if st.session_state.chats:
+        # Reopen the most recent chat
+        latest_chat = max(st.session_state.chats.values(), key=lambda chat: chat["created_at"])
+        load_chat_state(latest_chat["id"])
+        st.session_state.current_chat_id = latest_chat["id"]
+    else:
+        # Create first chat
+        first_chat = create_new_chat()
+        st.session_state.chats[first_chat["id"]] = first_chat
+        st.session_state.current_chat_id = first_chat["id"]
 
 # Initialize current session variables from current chat
 if st.session_state.current_chat_id in st.session_state.chats:
@@ -395,8 +596,6 @@ if st.session_state.current_chat_id in st.session_state.chats:
         st.session_state.session_start_time = current_chat["session_start_time"]
     if "session_files" not in st.session_state:
         st.session_state.session_files = current_chat["session_files"]
-    if "files_before_analysis" not in st.session_state:
-        st.session_state.files_before_analysis = current_chat["files_before_analysis"]
 
 # Legacy compatibility
 if "session_id" not in st.session_state:
@@ -477,6 +676,11 @@ with st.sidebar:
     
     # Step 2: CSV Preview (only show if file is uploaded)
     if uploaded_file is not None:
+        # Add the upload to the dataset store (deduplicated by content hash) and start its
+        # one-time columnar conversion in the background while the user types a question
+        dataset = store_upload(uploaded_file)
+        schedule_conversion(dataset)
+
         # Update current chat with uploaded file name
         if st.session_state.current_chat_id in st.session_state.chats:
             current_chat = st.session_state.chats[st.session_state.current_chat_id]
@@ -488,7 +692,7 @@ with st.sidebar:
         
         # Display CSV preview in sidebar
         st.markdown("---")
-        display_csv_preview(uploaded_file)
+        display_csv_preview(dataset["path"])
         
         # Step 3: Query Input (only show after CSV is uploaded and previewed)
         st.markdown("---")
@@ -502,6 +706,7 @@ with st.sidebar:
         # Initialize empty variables when no file is uploaded
         user_question = ""
         analyze_button = False
+        dataset = None
     
     # Generate Suggestions button (only show if CSV and query are available)
     if uploaded_file is not None and user_question:
@@ -509,43 +714,45 @@ with st.sidebar:
         
         # Handle Generate Suggestions button click
         if generate_suggestions_button:
-            # Save uploaded file to temp directory for processing
-            temp_dir = "temp"
-            if not os.path.exists(temp_dir):
-                os.makedirs(temp_dir)
-            file_path = os.path.join(temp_dir, uploaded_file.name)
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
+            file_path = dataset["path"]
             
             # Generate suggestions
-            async def generate_suggestions():
-                try:
-                    openai_model_client = get_model_client()
-                    clarity_agent = create_query_clarity_agent(openai_model_client)
-                    
-                    # Get CSV information
-                    csv_info = get_csv_info(file_path)
-                    
-                    # Generate suggestions
-                    suggestions_result = await clarity_agent.generate_query_suggestions(user_question, csv_info)
-                    
-                    if "error" not in suggestions_result and suggestions_result.get("suggestions"):
-                        st.session_state.suggestions = suggestions_result["suggestions"]
-                        st.session_state.show_suggestions = True
-                        st.rerun()
-                    else:
-                        st.error("Unable to generate suggestions. Please try again.")
-                except Exception as e:
-                    st.error(f"Error generating suggestions: {str(e)}")
+            suggestions_ready = False
+            try:
+                openai_model_client = get_model_client()
+                clarity_agent = create_query_clarity_agent(openai_model_client)
+                
+                # Get CSV information
+                csv_info = get_csv_info(file_path)
+                
+                cached_suggestions = clarity_agent.get_cached_suggestions(user_question, csv_info)
+                if cached_suggestions:
+                    st.session_state.suggestions = cached_suggestions
+                    st.session_state.pending_suggestions = None
+                else:
+                    # Show schema-driven suggestions instantly; the model's suggestions replace them when they arrive
+                    st.session_state.suggestions = generate_local_suggestions(user_question, csv_info)
+                    st.session_state.pending_suggestions = {
+                        "chat_id": st.session_state.current_chat_id,
+                        "future": clarity_agent.refine_suggestions_in_background(user_question, csv_info)
+                    }
+                st.session_state.show_suggestions = True
+                suggestions_ready = True
+            except Exception as e:
+                st.error(f"Error generating suggestions: {str(e)}")
             
-            # Run suggestion generation
-            asyncio.run(generate_suggestions())
+            if suggestions_ready:
+                st.rerun()
     
     # --- Suggestions Panel (in sidebar) ---
     if st.session_state.show_suggestions and st.session_state.suggestions:
         st.markdown("---")
         st.subheader("💡 Query Suggestions")
         st.write("**Here are some related query suggestions:**")
+        cache_stats = get_suggestion_cache().stats()
+        st.caption(f"⚡ Suggestion cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+        if st.session_state.get("pending_suggestions"):
+            poll_suggestion_refinement()
         
         for i, suggestion in enumerate(st.session_state.suggestions, 1):
             if st.button(f"{suggestion}", key=f"suggestion_{i}", use_container_width=True):
@@ -560,6 +767,13 @@ with st.sidebar:
             st.session_state.suggestions = []
             st.rerun()
     
+    # --- Run Stats Panel (in sidebar) ---
+    last_trace_id = st.session_state.chats[st.session_state.current_chat_id].get("last_trace_id")
+    if last_trace_id:
+        st.markdown("---")
+        with st.expander("📈 Run Stats (last analysis)"):
+            show_run_stats(last_trace_id)
+    
     # --- Export Panel (in sidebar) ---
     # Show export panel only if there are session-specific files
     if st.session_state.session_files:
@@ -592,35 +806,51 @@ with st.sidebar:
             for json_file in session_json_files:
                 st.write(f"• {json_file}")
         
-        # Single download button for all session files
-        temp_dir = "temp"
+        # Single download button for all session files. The archive is built in the background
+        # once per set of files and only read when the user asks for it, so reruns stay cheap.
+        temp_dir = get_chat_work_dir()
         if st.session_state.session_files:
-            zip_data = create_export_zip(temp_dir, st.session_state.session_files)
-            if zip_data:
-                st.download_button(
-                    label="📥 Download Analysis Results",
-                    data=zip_data,
-                    file_name=f"chat_analysis_{st.session_state.session_id[:8]}.zip",
-                    mime="application/zip",
-                    use_container_width=True,
-                    help="Download all files created in this chat session"
-                )
-                
-                # Cleanup button to delete ALL files from temp directory
-                if st.button("🗑️ Clean Up Files", use_container_width=True, help="Delete ALL files from temp directory to keep it clean"):
-                    deleted_count, failed_files = cleanup_all_temp_files(temp_dir)
-                    if deleted_count > 0:
-                        st.success(f"✅ Cleaned up {deleted_count} files from temp directory")
-                        if failed_files:
-                            st.warning(f"⚠️ Could not delete {len(failed_files)} files:")
-                            for failed_file in failed_files[:3]:  # Show first 3 failed files
-                                st.write(f"• {failed_file}")
-                            if len(failed_files) > 3:
-                                st.write(f"• ... and {len(failed_files) - 3} more")
-                        st.session_state.session_files = []  # Clear the session files list
-                        st.rerun()  # Refresh to hide the export panel
-                    else:
-                        st.warning("No files were deleted - temp directory might be empty")
+            zip_path = find_export_zip(temp_dir, st.session_state.session_files)
+            export_requested = st.session_state.get("export_requested") == st.session_state.current_chat_id
+            if zip_path and export_requested:
+                with open(zip_path, "rb") as zip_file:
+                    st.download_button(
+                        label="📥 Download Analysis Results",
+                        data=zip_file,
+                        file_name=f"chat_analysis_{st.session_state.session_id[:8]}.zip",
+                        mime="application/zip",
+                        use_container_width=True,
+                        help="Download all files created in this chat session",
+                        on_click=lambda: st.session_state.pop("export_requested", None)
+                    )
+            elif st.button("📦 Prepare Download", use_container_width=True, help="Package all files created in this chat session"):
+                try:
+                    with st.spinner("Preparing the archive..."):
+                        build = schedule_export_zip(temp_dir, st.session_state.session_files)
+                        if build is not None:
+                            build.result()
+                except Exception as e:
+                    # e.g. a file was deleted or the disk is full; clicking again starts a new build
+                    st.error(f"❌ Could not prepare the download: {e}")
+                else:
+                    st.session_state.export_requested = st.session_state.current_chat_id
+                    st.rerun()
+            
+            # Cleanup button to delete ALL files of this chat
+            if st.button("🗑️ Clean Up Files", use_container_width=True, help="Delete ALL files of this chat to keep it clean"):
+                deleted_count, failed_files = cleanup_chat_work_dir(st.session_state.current_chat_id)
+                if deleted_count > 0:
+                    st.success(f"✅ Cleaned up {deleted_count} files from this chat's work directory")
+                    if failed_files:
+                        st.warning(f"⚠️ Could not delete {len(failed_files)} files:")
+                        for failed_file in failed_files[:3]:  # Show first 3 failed files
+                            st.write(f"• {failed_file}")
+                        if len(failed_files) > 3:
+                            st.write(f"• ... and {len(failed_files) - 3} more")
+                    st.session_state.session_files = []  # Clear the session files list
+                    st.rerun()  # Refresh to hide the export panel
+                else:
+                    st.warning("No files were deleted - the chat's work directory might be empty")
 
 # --- Main Chat Interface (full width) ---
 st.header("💬 Analysis Chat")
@@ -641,46 +871,8 @@ for i, message in enumerate(st.session_state.messages):
                 st.markdown("## 📋 **Generated Data Files**")
                 
                 for csv_file, csv_data in st.session_state[csv_data_key].items():
-                    if isinstance(csv_data, pd.DataFrame):
-                        # Display file info
-                        st.markdown(f"### 📄 **{csv_file}**")
-                        
-                        # Show basic metrics
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.metric("📊 Rows", len(csv_data))
-                        with col2:
-                            st.metric("📋 Columns", len(csv_data.columns))
-                        
-                        # Calculate adaptive height based on data size
-                        row_height = 35    # Approximate height per row
-                        header_height = 40 # Header height
-                        padding = 20       # Extra padding for better appearance
-                        
-                        # Calculate the natural height needed for the data
-                        natural_height = header_height + (len(csv_data) * row_height) + padding
-                        
-                        # For small datasets (<=10 rows), use natural height with minimal constraints
-                        # For larger datasets, use scrollable height with reasonable bounds
-                        if len(csv_data) <= 10:
-                            # Small datasets: use natural height, minimum 120px for very small tables
-                            table_height = max(120, natural_height)
-                        else:
-                            # Large datasets: use scrollable height between 200px and 600px
-                            min_height = 200
-                            max_height = 600
-                            table_height = max(min_height, min(natural_height, max_height))
-                        
-                        # Display the dataframe with adaptive height
-                        st.dataframe(
-                            csv_data,
-                            use_container_width=True,
-                            hide_index=False,
-                            height=table_height
-                        )
+                    if display_result_table(csv_file, csv_data, key=f"result_{chat_id}_{csv_file}"):
                         st.markdown("---")
-                    else:
-                        st.error(f"Error with {csv_file}: {csv_data}")
     
     elif message_type == "explain_button":
         # Display explain button with functionality
@@ -719,156 +911,94 @@ for i, message in enumerate(st.session_state.messages):
                         end_idx = line.rfind('**')
                         if start_idx < end_idx:
                             png_file = line[start_idx:end_idx]
-                            temp_dir = "temp"
-                            png_path = os.path.join(temp_dir, png_file)
+                            png_path = os.path.join(get_chat_work_dir(), png_file)
                             if os.path.exists(png_path):
                                 try:
-                                    img_b64 = get_image_b64(png_path)
-                                    st.image(f"data:image/png;base64,{img_b64}", caption=png_file)
+                                    show_chart(png_path, png_file)
                                 except Exception as e:
                                     st.caption(f"📈 {png_file} (Image file exists but cannot be displayed)")
             else:
                 st.markdown(message_content)
 
+# --- Offer to Reuse a Similar Earlier Analysis ---
+answer_offer = st.session_state.get("answer_offer")
+if answer_offer and answer_offer["chat_id"] == st.session_state.current_chat_id:
+    with st.chat_message("assistant", avatar="♻️"):
+        st.info(f"A similar question was analyzed before on this dataset: \"{answer_offer['answer']['query']}\" "
+                f"({answer_offer['answer']['score']:.0%} match).")
+        col1, col2 = st.columns(2)
+        with col1:
+            reuse_button = st.button("♻️ Reuse previous result", key="reuse_answer", use_container_width=True)
+        with col2:
+            fresh_button = st.button("🔄 Run fresh analysis", key="fresh_answer", use_container_width=True)
+    
+    if reuse_button:
+        st.session_state.answer_offer = None
+        show_cached_answer(answer_offer["answer"], get_chat_work_dir())
+        st.rerun()
+    elif fresh_button:
+        st.session_state.answer_offer = None
+        st.session_state.refined_query = answer_offer["question"]
+        st.session_state.skip_answer_cache = True
+        st.rerun()
+
 # --- Handle Refined Query from Suggestions ---
 if st.session_state.refined_query and uploaded_file is not None:
     # Use the refined query instead of the original
     user_question = st.session_state.refined_query
     st.session_state.refined_query = ""  # Clear it after use
+    # Set when the user turned down a reused answer; the question is already in the chat
+    run_fresh = st.session_state.pop("skip_answer_cache", False)
     
-    # Save uploaded file to the temp directory
-    temp_dir = "temp"
-    if not os.path.exists(temp_dir):
-        os.makedirs(temp_dir)
-    file_path = os.path.join(temp_dir, uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    
-    # Record files before analysis
-    st.session_state.files_before_analysis = get_temp_files_before_analysis(temp_dir)
+    temp_dir = get_chat_work_dir()
+
+    # The upload lives in the dataset store, mounted read-only into the sandbox rather than copied into temp
+    file_path = dataset["path"]
     
     # Add refined question to chat
-    st.session_state.messages.append({"role": "user", "content": f"**Refined Query:** {user_question}"})
-    with st.chat_message("user"):
-        st.markdown(f"**Refined Query:** {user_question}")
+    if not run_fresh:
+        st.session_state.messages.append({"role": "user", "content": f"**Refined Query:** {user_question}"})
+        with st.chat_message("user"):
+            st.markdown(f"**Refined Query:** {user_question}")
     
     # Clear suggestions and proceed directly to analysis (refined queries are assumed to be clear)
     st.session_state.show_suggestions = False
+    st.session_state.answer_offer = None
     
+    proceed_note = "**Running a fresh analysis.**" if run_fresh else "**Using refined query - proceeding with analysis.**"
     with st.chat_message("assistant", avatar="✅"):
-        st.success("**Using refined query - proceeding with analysis.**")
+        st.success(proceed_note)
     
     st.session_state.messages.append({
         "role": "assistant", 
-        "content": "**Using refined query - proceeding with analysis.**"
+        "content": proceed_note
     })
 
-    # Run the AutoGen team directly
-    async def run_analysis():
-        # Initialize components
-        docker = getDockerCommandLineExecutor()
-        openai_model_client = get_model_client()
-        team = getDataAnalyzerTeam(docker, openai_model_client)
-
-        # Load previous state if it exists
-        if st.session_state.team_state:
-            await team.load_state(st.session_state.team_state)
-
-        # Get CSV info to provide column context
-        csv_info = get_csv_info(file_path)
-        column_info = f"CSV COLUMNS: {csv_info['columns']}\nSAMPLE DATA:\n{csv_info['sample_data']}\n\n"
-        full_task = f"{column_info}Using the data from '{uploaded_file.name}', {user_question}"
-
-        try:
-            await start_docker_container(docker)
-
-            # Progress tracking variables
-            progress_placeholder = st.empty()
-            progress_steps = [
-                "🔄 Initializing analysis...",
-                "📊 Data Analyzer is planning the approach...",
-                "🐍 Executing Python code...",
-                "📈 Processing results...",
-                "✅ Analysis complete!"
-            ]
-            current_step = 0
-            
-            # Show initial progress
-            with progress_placeholder.container():
-                st.info(progress_steps[current_step])
-            
-            # Track messages for final analysis
-            final_analyzer_message = None
-            
-            async for message in team.run_stream(task=full_task):
-                if isinstance(message, TextMessage) and message.source != "user":
-                    agent_name = message.source
-                    
-                    # Update progress based on agent activity
-                    if agent_name == "Data_Analyzer_agent":
-                        current_step = min(current_step + 1, len(progress_steps) - 2)
-                        # Clean the analyzer message by removing "STOP" and extra whitespace
-                        cleaned_content = message.content.replace("STOP", "").strip()
-                        final_analyzer_message = cleaned_content  # Keep updating with latest analyzer message
-                    elif agent_name == "Python_Code_Executor":
-                        current_step = min(current_step + 1, len(progress_steps) - 2)
-                    
-                    # Update progress display
-                    if current_step < len(progress_steps) - 1:
-                        with progress_placeholder.container():
-                            st.info(progress_steps[current_step])
-
-                elif isinstance(message, TaskResult):
-                    if message.stop_reason:
-                        # Show final progress
-                        current_step = len(progress_steps) - 1
-                        with progress_placeholder.container():
-                            st.success(progress_steps[current_step])
-                        
-                        # Display the final detailed analysis using new format
-                        if final_analyzer_message:
-                            # Get session-specific files
-                            session_files = get_session_files(temp_dir, st.session_state.files_before_analysis, st.session_state.session_start_time)
-                            st.session_state.session_files = session_files
-                            
-                            # Use new display function that shows CSV data first, then explain button
-                            display_analysis_results_with_data_files(temp_dir, session_files, final_analyzer_message, st.session_state.current_chat_id)
-                        
-                        # Add completion message
-                        with st.chat_message("assistant"):
-                            st.success("✅ **Analysis completed successfully!**")
-                        st.session_state.messages.append({
-                            "role": "assistant", 
-                            "content": "✅ **Analysis completed successfully!**"
-                        })
-
-            # Save the state after the run
-            st.session_state.team_state = await team.save_state()
-            
-            # Force UI refresh to show export panel immediately
-            if session_files:
-                st.rerun()
-
-        except Exception as e:
-            st.error(f"An error occurred: {e}")
-        finally:
-            await stop_docker_container(docker)
-
-    # Run the async function
-    asyncio.run(run_analysis())
+    # Near-identical questions on the same dataset are answered from earlier runs
+    cached_answer = None
+    if not run_fresh:
+        cached_answer = get_answer_cache().find(dataset["digest"], user_question, get_csv_info(file_path)["columns"],
+                                                context=answer_context())
+    
+    if cached_answer and cached_answer["action"] == "serve":
+        show_cached_answer(cached_answer, temp_dir)
+        st.rerun()
+    elif cached_answer:
+        st.session_state.answer_offer = {
+            "chat_id": st.session_state.current_chat_id,
+            "question": user_question,
+            "answer": cached_answer
+        }
+        st.rerun()
+    else:
+        # Runs in the background job queue; the page polls it (see poll_analysis_job)
+        start_analysis_job(dataset, user_question)
 
 # --- Core Logic ---
 elif analyze_button and uploaded_file is not None and user_question:
-    # 1. Save uploaded file to the temp directory
-    temp_dir = "temp"
-    if not os.path.exists(temp_dir):
-        os.makedirs(temp_dir)
-    file_path = os.path.join(temp_dir, uploaded_file.name)
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    
-    # Record files before analysis
-    st.session_state.files_before_analysis = get_temp_files_before_analysis(temp_dir)
+    # 1. The upload lives in the dataset store, mounted read-only into the sandbox rather than copied into temp
+    temp_dir = get_chat_work_dir()
+    file_path = dataset["path"]
     
     st.info(f"File '{uploaded_file.name}' uploaded successfully.")
 
@@ -879,6 +1009,7 @@ elif analyze_button and uploaded_file is not None and user_question:
 
     # Clear any existing suggestions since user chose to proceed directly
     st.session_state.show_suggestions = False
+    st.session_state.answer_offer = None
     
     with st.chat_message("assistant", avatar="✅"):
         st.success("**Proceeding with analysis using your query.**")
@@ -888,99 +1019,32 @@ elif analyze_button and uploaded_file is not None and user_question:
         "content": "**Proceeding with analysis using your query.**"
     })
 
-    # Run the AutoGen team directly (no query clarity check)
-    async def run_analysis():
-        # Initialize components
-        docker = getDockerCommandLineExecutor()
-        openai_model_client = get_model_client()
-        team = getDataAnalyzerTeam(docker, openai_model_client)
-
-        # Load previous state if it exists
-        if st.session_state.team_state:
-            await team.load_state(st.session_state.team_state)
-
-        # Get CSV info to provide column context
-        csv_info = get_csv_info(file_path)
-        column_info = f"CSV COLUMNS: {csv_info['columns']}\nSAMPLE DATA:\n{csv_info['sample_data']}\n\n"
-        full_task = f"{column_info}Using the data from '{uploaded_file.name}', {user_question}"
-
-        try:
-            await start_docker_container(docker)
-
-            # Progress tracking variables
-            progress_placeholder = st.empty()
-            progress_steps = [
-                "🔄 Initializing analysis...",
-                "📊 Data Analyzer is planning the approach...",
-                "🐍 Executing Python code...",
-                "📈 Processing results...",
-                "✅ Analysis complete!"
-            ]
-            current_step = 0
-            
-            # Show initial progress
-            with progress_placeholder.container():
-                st.info(progress_steps[current_step])
-            
-            # Track messages for final analysis
-            final_analyzer_message = None
-            
-            async for message in team.run_stream(task=full_task):
-                if isinstance(message, TextMessage) and message.source != "user":
-                    agent_name = message.source
-                    
-                    # Update progress based on agent activity
-                    if agent_name == "Data_Analyzer_agent":
-                        current_step = min(current_step + 1, len(progress_steps) - 2)
-                        # Clean the analyzer message by removing "STOP" and extra whitespace
-                        cleaned_content = message.content.replace("STOP", "").strip()
-                        final_analyzer_message = cleaned_content  # Keep updating with latest analyzer message
-                    elif agent_name == "Python_Code_Executor":
-                        current_step = min(current_step + 1, len(progress_steps) - 2)
-                    
-                    # Update progress display
-                    if current_step < len(progress_steps) - 1:
-                        with progress_placeholder.container():
-                            st.info(progress_steps[current_step])
-
-                elif isinstance(message, TaskResult):
-                    if message.stop_reason:
-                        # Show final progress
-                        current_step = len(progress_steps) - 1
-                        with progress_placeholder.container():
-                            st.success(progress_steps[current_step])
-                        
-                        # Display the final detailed analysis using new format
-                        if final_analyzer_message:
-                            # Get session-specific files
-                            session_files = get_session_files(temp_dir, st.session_state.files_before_analysis, st.session_state.session_start_time)
-                            st.session_state.session_files = session_files
-                            
-                            # Use new display function that shows CSV data first, then explain button
-                            display_analysis_results_with_data_files(temp_dir, session_files, final_analyzer_message, st.session_state.current_chat_id)
-                        
-                        # Add completion message
-                        with st.chat_message("assistant"):
-                            st.success("✅ **Analysis completed successfully!**")
-                        st.session_state.messages.append({
-                            "role": "assistant", 
-                            "content": "✅ **Analysis completed successfully!**"
-                        })
-
-            # Save the state after the run
-            st.session_state.team_state = await team.save_state()
-            
-            # Force UI refresh to show export panel immediately
-            if session_files:
-                st.rerun()
+    # Near-identical questions on the same dataset are answered from earlier runs
+    cached_answer = get_answer_cache().find(dataset["digest"], user_question, get_csv_info(file_path)["columns"],
+                                            context=answer_context())
+    
+    if cached_answer and cached_answer["action"] == "serve":
+        show_cached_answer(cached_answer, temp_dir)
+        st.rerun()
+    elif cached_answer:
+        st.session_state.answer_offer = {
+            "chat_id": st.session_state.current_chat_id,
+            "question": user_question,
+            "answer": cached_answer
+        }
+        st.rerun()
+    else:
+        # Runs in the background job queue; the page polls it (see poll_analysis_job)
+        start_analysis_job(dataset, user_question)
 
-        except Exception as e:
-            st.error(f"An error occurred: {e}")
-        finally:
-            await stop_docker_container(docker)
+elif analyze_button:
+    st.warning("Please upload a CSV file and enter a question.")
 
-    # Run the async function
-    asyncio.run(run_analysis())
+# --- Running Analysis (polled without blocking the rest of the page) ---
+if get_active_job(st.session_state.current_chat_id) is not None:
+    poll_analysis_job()
 
-elif analyze_button:
-    st.warning("Please upload a CSV file and enter a question.")
\ No newline at end of file
+# --- Persist the current chat (written only when its state changed) ---
+save_current_chat()
+# --- Keep the chats held in memory within the budget (released chats reload on switch) ---
+enforce_memory_budget()
\ No newline at end of file
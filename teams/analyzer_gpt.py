@@ -3,11 +3,11 @@ from autogen_agentchat.conditions import TextMentionTermination
 from agents.code_executor_agent import getCodeExecutorAgent
 from agents.data_analyzer_agent import getDataAnalyzerAgent
 
-def getDataAnalyzerTeam(docker,model_client):
+def getDataAnalyzerTeam(docker,model_client,stateful_kernel=False,stream=False,compact_context=False,sql_engine=None):
 
-    code_executor_agent = getCodeExecutorAgent(docker)
+    code_executor_agent = getCodeExecutorAgent(docker,sql_engine=sql_engine)
 
-    data_analyzer_agent = getDataAnalyzerAgent(model_client)
+    data_analyzer_agent = getDataAnalyzerAgent(model_client,stateful_kernel=stateful_kernel,stream=stream,compact_context=compact_context,sql_engine=sql_engine)
 
 
     text_mention_termination = TextMentionTermination('STOP')
@@ -0,0 +1,115 @@
+import time
+
+from autogen_core.code_executor import CodeExecutor
+from autogen_core.models import ChatCompletionClient
+
+from telemetry.tracing import get_tracer
+
+
+class TracingChatCompletionClient(ChatCompletionClient):
+    """
+    Model client wrapper emitting a ``model.call`` span per request.
+
+    The span records the token usage of the call, whether it was streamed and, for
+    streamed calls, the time to the first token. Everything else is delegated.
+    """
+
+    def __init__(self, client, tracer=None):
+        self._client = client
+        self._tracer = tracer or get_tracer()
+
+    @property
+    def client(self):
+        """The wrapped client."""
+        return self._client
+
+    async def create(self, messages, **kwargs):
+        span = self._tracer.start_span("model.call", streamed=False, messages=len(messages))
+        try:
+            result = await self._client.create(messages, **kwargs)
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        self._finish(span, result)
+        return result
+
+    async def create_stream(self, messages, **kwargs):
+        # Not made the current span: an async generator's body runs in its consumer's context.
+        span = self._tracer.start_span("model.call", streamed=True, messages=len(messages))
+        started = time.perf_counter()
+        result = None
+        try:
+            async for item in self._client.create_stream(messages, **kwargs):
+                if isinstance(item, str):
+                    if "first_token_seconds" not in span.attributes:
+                        span.set(first_token_seconds=time.perf_counter() - started)
+                else:
+                    result = item
+                yield item
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        self._finish(span, result)
+
+    def _finish(self, span, result):
+        if result is not None:
+            span.set(
+                prompt_tokens=result.usage.prompt_tokens,
+                completion_tokens=result.usage.completion_tokens,
+                finish_reason=result.finish_reason,
+                cached=result.cached,
+            )
+        span.end()
+
+    async def close(self):
+        await self._client.close()
+
+    def actual_usage(self):
+        return self._client.actual_usage()
+
+    def total_usage(self):
+        return self._client.total_usage()
+
+    def count_tokens(self, messages, **kwargs):
+        return self._client.count_tokens(messages, **kwargs)
+
+    def remaining_tokens(self, messages, **kwargs):
+        return self._client.remaining_tokens(messages, **kwargs)
+
+    @property
+    def capabilities(self):
+        return self._client.capabilities
+
+    @property
+    def model_info(self):
+        return self._client.model_info
+
+
+class TracingCodeExecutor(CodeExecutor):
+    """Executor wrapper emitting an ``execution`` span per ``execute_code_blocks`` call."""
+
+    def __init__(self, executor, tracer=None):
+        self._executor = executor
+        self._tracer = tracer or get_tracer()
+
+    @property
+    def executor(self):
+        """The wrapped executor."""
+        return self._executor
+
+    async def execute_code_blocks(self, code_blocks, cancellation_token):
+        languages = sorted({block.language.lower() for block in code_blocks})
+        with self._tracer.span("execution", blocks=len(code_blocks), languages=",".join(languages)) as span:
+            result = await self._executor.execute_code_blocks(code_blocks, cancellation_token)
+            span.set(exit_code=result.exit_code, output_chars=len(result.output),
+                     artifacts=len(getattr(result, "artifacts", None) or []))
+        return result
+
+    async def start(self):
+        await self._executor.start()
+
+    async def stop(self):
+        await self._executor.stop()
+
+    async def restart(self):
+        await self._executor.restart()
@@ -0,0 +1,382 @@
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config.constants import (
+    TRACE_DIR,
+    TRACE_FILE_MAX_BYTES,
+    TRACE_HISTORY_LIMIT,
+    TRACE_BACKGROUND_HISTORY_LIMIT,
+    TRACE_LATENCY_BUCKETS,
+    METRICS_PORT,
+    METRICS_HOST,
+)
+
+TRACE_FILE = os.path.join(TRACE_DIR, "spans.jsonl")
+
+# Span the code currently runs under; asyncio tasks inherit it from the task that created them.
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation within a trace (a model call, a code execution, a container start, ...)."""
+
+    def __init__(self, tracer, name, trace_id, parent_id, attributes, background=False):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        # Part of a trace no run asked for (e.g. pool maintenance), kept apart from run traces
+        self.background = background
+        self.attributes = dict(attributes)
+        self.events = []
+        self.status = "ok"
+        self.error = None
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes):
+        """Add or overwrite attributes."""
+        self.attributes.update(attributes)
+
+    def event(self, name, **attributes):
+        """Record a point-in-time event (e.g. one agent message and its token usage)."""
+        self.events.append(dict(attributes, name=name, time=time.time()))
+
+    def end(self, error=None):
+        """Finish the span and hand it to the tracer; only the first call counts."""
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._started
+        if error is not None:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+        self.tracer._finish(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_seconds": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+
+class Tracer:
+    """
+    Collects spans for analysis runs and keeps the aggregate metrics derived from them.
+
+    Every finished span is appended to a local JSONL file (rotated once it grows past
+    ``max_file_bytes``), kept in memory with the rest of its trace for the "Run stats"
+    panel (the ``history_limit`` most recent runs; spans started outside any run, such
+    as pool maintenance, are kept under their own limit), and folded into per-span-name
+    latency histograms and token counters rendered in the Prometheus text format.
+    """
+
+    def __init__(self, path=TRACE_FILE, history_limit=TRACE_HISTORY_LIMIT, max_file_bytes=TRACE_FILE_MAX_BYTES,
+                 buckets=TRACE_LATENCY_BUCKETS, background_history_limit=TRACE_BACKGROUND_HISTORY_LIMIT):
+        """
+        Args:
+            path: JSONL file spans are exported to (None disables the file export)
+            history_limit: Number of recent run traces kept in memory
+            max_file_bytes: Size after which the JSONL file is rotated to ``<path>.1``
+            buckets: Upper bounds (seconds) of the latency histogram buckets
+            background_history_limit: Number of recent background traces kept in memory
+        """
+        self.path = path
+        self.history_limit = history_limit
+        self.background_history_limit = background_history_limit
+        self.max_file_bytes = max_file_bytes
+        self.buckets = sorted(buckets)
+
+        self._traces = OrderedDict()   # trace id -> finished span dicts, oldest trace first
+        self._background = OrderedDict()   # the same for background traces
+        self._durations = {}           # span name -> [bucket counts..., +Inf count, sum]
+        self._errors = {}              # span name -> error count
+        self._tokens = {}              # (source, kind) -> tokens
+        self._gauges = {}              # metric name -> (help text, callable returning {labels tuple: value})
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+
+    # --- Spans ---
+    def start_span(self, name, trace_id=None, parent=None, **attributes):
+        """
+        Start a span without making it the current one (for async generators and callbacks).
+
+        Args:
+            name: Operation name, e.g. ``model.call``
+            trace_id: Trace to attach to; defaults to the current span's trace, or a new
+                background trace (runs pass their own id)
+            parent: Parent span; defaults to the current span when it is in the same trace
+
+        Returns:
+            Span that must be finished with ``end()``
+        """
+        current = _current_span.get()
+        if parent is None and current is not None and trace_id in (None, current.trace_id):
+            parent = current
+        background = False
+        if trace_id is None:
+            background = parent is None or parent.background
+            trace_id = parent.trace_id if parent is not None else uuid.uuid4().hex
+        return Span(self, name, trace_id, parent.span_id if parent is not None else None, attributes, background)
+
+    @contextmanager
+    def span(self, name, trace_id=None, **attributes):
+        """
+        Time the enclosed block as a span and make it the parent of spans started inside it.
+
+        Args:
+            name: Operation name, e.g. ``container.acquire``
+            trace_id: Trace to attach to (e.g. a job id); defaults to the current trace
+
+        Yields:
+            The Span, so the block can add attributes and events
+        """
+        span = self.start_span(name, trace_id=trace_id, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def current_span(self):
+        """Return the span the caller runs under, or None."""
+        return _current_span.get()
+
+    def _finish(self, span):
+        record = span.to_dict()
+        traces, limit = ((self._background, self.background_history_limit) if span.background
+                         else (self._traces, self.history_limit))
+        with self._lock:
+            spans = traces.pop(span.trace_id, None)
+            if spans is None:
+                spans = []
+                while len(traces) >= limit:
+                    traces.popitem(last=False)
+            spans.append(record)
+            traces[span.trace_id] = spans
+
+            histogram = self._durations.setdefault(span.name, [0] * (len(self.buckets) + 2))
+            histogram[bisect.bisect_left(self.buckets, span.duration)] += 1
+            histogram[-1] += span.duration
+            if span.status == "error":
+                self._errors[span.name] = self._errors.get(span.name, 0) + 1
+            for event in span.events:
+                if event["name"] == "message":
+                    for kind in ("prompt_tokens", "completion_tokens"):
+                        key = (event.get("source", ""), kind)
+                        self._tokens[key] = self._tokens.get(key, 0) + (event.get(kind) or 0)
+        self._export(record)
+
+    def _export(self, record):
+        if not self.path:
+            return
+        try:
+            with self._file_lock:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_file_bytes:
+                    os.replace(self.path, f"{self.path}.1")
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            print(f"Tracing: could not export span: {e}")
+
+    # --- Runs ---
+    def trace(self, trace_id):
+        """Return the finished spans of a trace (oldest first), or an empty list if it is unknown."""
+        with self._lock:
+            return list(self._traces.get(trace_id) or self._background.get(trace_id, []))
+
+    def run_summary(self, trace_id):
+        """
+        Summarize one analysis run for display.
+
+        Args:
+            trace_id: Trace id of the run (the job id for background analyses)
+
+        Returns:
+            Dict of totals (see ``summarize_spans``), or None if the trace is unknown
+        """
+        spans = self.trace(trace_id)
+        return summarize_spans(spans) if spans else None
+
+    # --- Metrics ---
+    def register_gauge(self, name, help_text, fn):
+        """
+        Expose a value computed at scrape time (e.g. container pool occupancy).
+
+        Args:
+            name: Prometheus metric name
+            help_text: HELP line for the metric
+            fn: Callable returning a number, or a dict mapping label tuples ``(("state", "idle"),)`` to numbers
+        """
+        with self._lock:
+            self._gauges[name] = (help_text, fn)
+
+    def render_prometheus(self):
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            durations = {name: list(values) for name, values in self._durations.items()}
+            errors = dict(self._errors)
+            tokens = dict(self._tokens)
+            gauges = dict(self._gauges)
+
+        lines = [
+            "# HELP analyzer_span_duration_seconds Duration of traced operations.",
+            "# TYPE analyzer_span_duration_seconds histogram",
+        ]
+        for name, values in sorted(durations.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ["+Inf"], values[:-1]):
+                cumulative += count
+                lines.append(f'analyzer_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'analyzer_span_duration_seconds_sum{{span="{name}"}} {values[-1]:.6f}')
+            lines.append(f'analyzer_span_duration_seconds_count{{span="{name}"}} {cumulative}')
+
+        lines += ["# HELP analyzer_span_errors_total Traced operations that raised.",
+                  "# TYPE analyzer_span_errors_total counter"]
+        for name, count in sorted(errors.items()):
+            lines.append(f'analyzer_span_errors_total{{span="{name}"}} {count}')
+
+        lines += ["# HELP analyzer_model_tokens_total Model tokens used, by agent and kind.",
+                  "# TYPE analyzer_model_tokens_total counter"]
+        for (source, kind), count in sorted(tokens.items()):
+            lines.append(f'analyzer_model_tokens_total{{agent="{source}",kind="{kind.replace("_tokens", "")}"}} {count}')
+
+        for name, (help_text, fn) in sorted(gauges.items()):
+            try:
+                value = fn()
+            except Exception:
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for labels, number in (value.items() if isinstance(value, dict) else [((), value)]):
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+                lines.append(f"{name}{{{label_text}}} {number}" if label_text else f"{name} {number}")
+        return "\n".join(lines) + "\n"
+
+
+def summarize_spans(spans):
+    """
+    Fold the spans of one run into the totals shown in the "Run stats" panel.
+
+    Args:
+        spans: Span dicts of a single trace
+
+    Returns:
+        Dict with wall time, model/execution/container/artifact totals and per-message token usage
+    """
+    def total(name):
+        return sum(span["duration_seconds"] for span in spans if span["name"] == name)
+
+    model_calls = [span for span in spans if span["name"] == "model.call"]
+    blocks = [span for span in spans if span["name"] == "execution.block"]
+    first_tokens = [span["attributes"].get("first_token_seconds") for span in model_calls]
+    first_tokens = [value for value in first_tokens if value is not None]
+    messages = [event for span in spans for event in span["events"] if event["name"] == "message"]
+
+    start = min(span["start_time"] for span in spans)
+    end = max(span["start_time"] + span["duration_seconds"] for span in spans)
+    return {
+        "wall_seconds": end - start,
+        "model_calls": len(model_calls),
+        "model_seconds": total("model.call"),
+        "first_token_seconds": first_tokens[0] if first_tokens else None,
+        "prompt_tokens": sum(span["attributes"].get("prompt_tokens", 0) for span in model_calls),
+        "completion_tokens": sum(span["attributes"].get("completion_tokens", 0) for span in model_calls),
+        "executions": sum(1 for span in spans if span["name"] == "execution"),
+        "execution_seconds": total("execution"),
+        "cached_blocks": sum(1 for span in blocks if span["attributes"].get("cache_hit")),
+        "blocks": len(blocks),
+        "container_seconds": sum(span["duration_seconds"] for span in spans if span["name"].startswith(("container.", "kernel."))),
+        "artifact_scan_seconds": total("artifacts.scan"),
+        "errors": sum(1 for span in spans if span["status"] == "error"),
+        "messages": messages,
+        "spans": spans,
+    }
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = get_tracer().render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+_metrics_server = None
+
+
+def get_tracer():
+    """
+    Return the process-wide tracer.
+
+    Returns:
+        Tracer shared by every chat, job and batch task in this process
+    """
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+        return _tracer
+
+
+def start_metrics_server(port=None, host=None):
+    """
+    Serve ``/metrics`` in the Prometheus text format on a daemon thread (once per process).
+
+    Args:
+        port: Port to listen on; defaults to ``$METRICS_PORT`` or ``METRICS_PORT`` (0 disables)
+        host: Interface to bind; defaults to ``$METRICS_HOST`` or ``METRICS_HOST`` (loopback)
+
+    Returns:
+        The port being served, or None when disabled or the port is taken
+    """
+    global _metrics_server
+    port = int(os.getenv("METRICS_PORT", METRICS_PORT) if port is None else port)
+    host = os.getenv("METRICS_HOST", METRICS_HOST) if host is None else host
+    with _tracer_lock:
+        if _metrics_server is not None:
+            return _metrics_server.server_address[1]
+        if not port:
+            return None
+        try:
+            _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            # Another app process on this host already serves the endpoint.
+            print(f"Metrics endpoint not started on {host}:{port}: {e}")
+            return None
+        threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return port
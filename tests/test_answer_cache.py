@@ -0,0 +1,79 @@
+import pytest
+
+from cache.answer_cache import AnswerCache, restore_artifacts
+from cache.disk_cache import DiskCache
+
+COLUMNS = ["PassengerId", "Survived", "Pclass", "Name", "Sex", "Age", "SibSp", "Parch", "Ticket", "Fare", "Cabin", "Embarked"]
+DATASET = "titanic-hash"
+
+
+@pytest.fixture
+def answers(tmp_path):
+    return AnswerCache(DiskCache(str(tmp_path / "answers.sqlite")))
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("survival by class", "survived by pclass"),
+    ("Show the survival rate by class!", "show survival rates by class"),
+])
+def test_same_question_is_served(answers, stored, asked):
+    answers.store(DATASET, stored, COLUMNS, "First class survived most.", [])
+
+    match = answers.find(DATASET, asked, COLUMNS)
+
+    assert match["action"] == "serve"
+    assert match["query"] == stored
+    assert match["final_message"] == "First class survived most."
+
+
+@pytest.mark.parametrize("stored, asked", [
+    ("survival rate of male passengers", "survival rate of female passengers"),
+    ("average fare for first and second class", "average fare for second and third class"),
+    ("survival rate by class excluding children", "survival rate by class including children"),
+    ("top 5 fares", "top 10 fares"),
+])
+def test_near_miss_is_only_offered(answers, stored, asked):
+    answers.store(DATASET, stored, COLUMNS, "stored analysis", [])
+
+    match = answers.find(DATASET, asked, COLUMNS)
+
+    assert match is not None
+    assert match["action"] == "offer"
+    assert match["score"] < 1.0
+
+
+def test_same_question_wins_over_a_closer_scoring_near_miss(answers):
+    answers.store(DATASET, "survival rate of female passengers", COLUMNS, "female", [])
+    answers.store(DATASET, "survival rate of male passengers", COLUMNS, "male", [])
+
+    match = answers.find(DATASET, "survival rates of male passengers", COLUMNS)
+
+    assert (match["action"], match["final_message"]) == ("serve", "male")
+
+
+def test_unrelated_question_or_other_dataset_misses(answers):
+    answers.store(DATASET, "survival by class", COLUMNS, "stored analysis", [])
+
+    assert answers.find(DATASET, "distribution of ticket prices by port of embarkation", COLUMNS) is None
+    assert answers.find("other-hash", "survival by class", COLUMNS) is None
+    assert answers.stats()["misses"] == 2
+
+
+def test_follow_up_is_only_found_in_its_chat(answers):
+    answers.store(DATASET, "now do the same for 2nd class", COLUMNS, "chat a", [], context="chat-a")
+
+    assert answers.find(DATASET, "now do the same for 2nd class", COLUMNS, context="chat-a")["action"] == "serve"
+    assert answers.find(DATASET, "now do the same for 2nd class", COLUMNS, context="chat-b") is None
+    assert answers.find(DATASET, "now do the same for 2nd class", COLUMNS) is None
+
+
+def test_artifacts_round_trip(answers, tmp_path):
+    chart = tmp_path / "run" / "output.png"
+    chart.parent.mkdir()
+    chart.write_bytes(b"\x89PNG chart")
+    answers.store(DATASET, "survival by class", COLUMNS, "stored analysis", [str(chart), str(tmp_path / "missing.png")])
+
+    match = answers.find(DATASET, "survived by pclass", COLUMNS)
+
+    assert restore_artifacts(match, str(tmp_path / "restored")) == ["output.png"]
+    assert (tmp_path / "restored" / "output.png").read_bytes() == b"\x89PNG chart"
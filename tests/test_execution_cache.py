@@ -0,0 +1,134 @@
+import asyncio
+import uuid
+
+from autogen_core import CancellationToken
+from autogen_core.code_executor import CodeBlock, CodeExecutor
+
+from cache.disk_cache import DiskCache
+from config.artifact_manifest import ManifestCodeResult, ManifestRecorder
+from config.cached_executor import CachingCodeExecutor, normalize_code
+
+
+class FakeExecutor(CodeExecutor):
+    """Records the blocks it runs; a block writes the files named in ``writes`` into the work dir."""
+
+    reports_manifest = True
+
+    def __init__(self, work_dir, writes=None, namespace_id=None):
+        self.work_dir = work_dir
+        self.writes = writes or {}
+        self.runs = []
+        self.namespace_id = namespace_id
+        self.launched_namespace = namespace_id
+
+    async def execute_code_blocks(self, code_blocks, cancellation_token):
+        artifacts = []
+        for code_block in code_blocks:
+            self.runs.append(code_block.code)
+            for name, content in self.writes.items():
+                (self.work_dir / name).write_text(content)
+                artifacts.append({"name": name, "size": len(content), "sha256": "", "mtime": 0})
+        return ManifestCodeResult(exit_code=0, output=f"ran {len(code_blocks)}\n", artifacts=artifacts)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def restart(self):
+        pass
+
+
+def run(executor, *codes):
+    blocks = [CodeBlock(code=code, language="python") for code in codes]
+    return asyncio.run(executor.execute_code_blocks(blocks, CancellationToken()))
+
+
+def make_cache(tmp_path):
+    return DiskCache(str(tmp_path / "executions.sqlite"))
+
+
+def test_formatting_and_comments_do_not_change_the_key(tmp_path):
+    caching = CachingCodeExecutor(FakeExecutor(tmp_path), tmp_path, cache=make_cache(tmp_path))
+
+    assert normalize_code("x = 1  # one\nprint( x )") == normalize_code("x=1\n\nprint(x)")
+    assert caching._cache_key("x = 1  # one\nprint( x )") == caching._cache_key("x=1\n\nprint(x)")
+    assert caching._cache_key("print(1)") != caching._cache_key("print(2)")
+
+
+def test_changed_input_file_changes_the_key(tmp_path):
+    caching = CachingCodeExecutor(FakeExecutor(tmp_path), tmp_path, cache=make_cache(tmp_path))
+    code = "import pandas as pd\nprint(pd.read_csv('data.csv').shape)"
+    (tmp_path / "data.csv").write_text("a\n1\n")
+    before = caching._cache_key(code)
+
+    (tmp_path / "data.csv").write_text("a\n1\n2\n")
+
+    assert caching._cache_key(code) != before
+
+
+def test_written_file_does_not_change_the_key(tmp_path):
+    caching = CachingCodeExecutor(FakeExecutor(tmp_path), tmp_path, cache=make_cache(tmp_path))
+    code = "df.to_csv('out.csv')"
+    before = caching._cache_key(code)
+
+    (tmp_path / "out.csv").write_text("overwritten by the previous run")
+
+    assert caching._cache_key(code) == before
+
+
+def test_kernel_key_includes_the_namespace_history(tmp_path):
+    cache = make_cache(tmp_path)
+    first = CachingCodeExecutor(FakeExecutor(tmp_path, namespace_id=uuid.uuid4().hex), tmp_path,
+                                stateful=True, cache=cache)
+    second = CachingCodeExecutor(FakeExecutor(tmp_path, namespace_id=uuid.uuid4().hex), tmp_path,
+                                 stateful=True, cache=cache)
+    code = "print(df.describe())"
+    fresh_key = first._cache_key(code)
+
+    # A follow-up turn in the second kernel after the preloaded df was filtered
+    run(second, "df = df[df.age > 30]")
+
+    assert second._cache_key(code) != fresh_key
+    assert first._cache_key(code) == fresh_key
+
+
+def test_kernel_block_reading_unknown_names_is_not_cached(tmp_path):
+    caching = CachingCodeExecutor(FakeExecutor(tmp_path, namespace_id=uuid.uuid4().hex), tmp_path,
+                                  stateful=True, cache=make_cache(tmp_path))
+
+    assert caching._cache_key("print(summary)") is None
+    assert caching._cache_key("print(df.shape)") is not None
+
+
+def test_cache_hit_restores_and_reports_artifacts(tmp_path):
+    cache = make_cache(tmp_path)
+    code = "df.groupby('group').size().to_csv('o.csv')"
+    executor = FakeExecutor(tmp_path, writes={"o.csv": "group,size\na,1\n"})
+    run(ManifestRecorder(CachingCodeExecutor(executor, tmp_path, cache=cache)), code)
+    (tmp_path / "o.csv").unlink()
+
+    # Every block of the repeated run is a hit: nothing runs, yet the file is back and reported
+    recorder = ManifestRecorder(CachingCodeExecutor(executor, tmp_path, cache=cache))
+    result = run(recorder, code)
+
+    assert executor.runs == [code]
+    assert result.exit_code == 0 and result.output == "ran 1\n"
+    assert (tmp_path / "o.csv").read_text() == "group,size\na,1\n"
+    assert [entry["name"] for entry in recorder.artifacts] == ["o.csv"]
+
+
+def test_failed_block_is_not_cached(tmp_path):
+    class FailingExecutor(FakeExecutor):
+        async def execute_code_blocks(self, code_blocks, cancellation_token):
+            self.runs.extend(code_block.code for code_block in code_blocks)
+            return ManifestCodeResult(exit_code=1, output="ModuleNotFoundError\n", artifacts=[])
+
+    executor = FailingExecutor(tmp_path)
+    caching = CachingCodeExecutor(executor, tmp_path, cache=make_cache(tmp_path))
+
+    run(caching, "import seaborn")
+    run(caching, "import seaborn")
+
+    assert executor.runs == ["import seaborn", "import seaborn"]
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import pytest
+from autogen_core.models import SystemMessage, UserMessage
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from models.record_replay_client import RECORD, REPLAY, RecordReplayChatCompletionClient
+
+MODEL_INFO = {
+    "json_output": False,
+    "function_calling": False,
+    "vision": False,
+    "family": "unknown",
+    "structured_output": False,
+}
+SYSTEM = SystemMessage(content="You are the data analyzer.")
+
+
+def turn(question):
+    return [SYSTEM, UserMessage(content=question, source="user")]
+
+
+async def ask(client, *questions, stream=False):
+    answers = []
+    for question in questions:
+        if stream:
+            chunks = [item async for item in client.create_stream(turn(question))]
+            answers.append(chunks[-1].content)
+        else:
+            answers.append((await client.create(turn(question))).content)
+    return answers
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = RecordReplayChatCompletionClient(
+        RECORD, path, client=ReplayChatCompletionClient(["plan a", "analysis a"], model_info=MODEL_INFO)
+    )
+    assert asyncio.run(ask(recorder, "q1", "q2")) == ["plan a", "analysis a"]
+    return path
+
+
+def replay(cassette):
+    return RecordReplayChatCompletionClient(REPLAY, cassette, model_info=MODEL_INFO)
+
+
+def test_recording_writes_one_entry_per_call(cassette):
+    with open(cassette, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+
+    assert [entry["result"]["content"] for entry in entries] == ["plan a", "analysis a"]
+    assert len({entry["key"] for entry in entries}) == 2
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_cassette_replays_twice_in_one_process(cassette, stream):
+    first = asyncio.run(ask(replay(cassette), "q1", "q2", stream=stream))
+    second = asyncio.run(ask(replay(cassette), "q1", "q2", stream=stream))
+
+    assert first == second == ["plan a", "analysis a"]
+
+
+def test_drifted_requests_follow_the_agents_recorded_order(cassette):
+    client = replay(cassette)
+
+    # Neither request was recorded (e.g. different execution output), so the agent's
+    # recordings are used in order and start over once they are all used
+    answers = asyncio.run(ask(client, "drifted 1", "drifted 2", "drifted 3"))
+
+    assert answers == ["plan a", "analysis a", "plan a"]
+
+
+def test_unknown_agent_is_an_error(cassette):
+    client = replay(cassette)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(client.create([SystemMessage(content="Another agent"), UserMessage(content="q1", source="user")]))